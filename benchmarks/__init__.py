@@ -0,0 +1,3 @@
+"""
+benchmarks  –  Synthetic-universe benchmarks for the workbench (``python -m benchmarks.run``).
+"""
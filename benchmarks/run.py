@@ -0,0 +1,300 @@
+"""
+run.py  –  Time the workbench's data, valuation and backtest paths
+
+Builds a synthetic universe (see ``benchmarks.synthetic``), pushes it through
+the same code the pages use and records wall time and peak traced memory per
+step in a JSON report.  Yahoo Finance is replaced by an offline stub, so the
+numbers are pure computation and runs are reproducible.
+
+    python -m benchmarks.run                                  # workbook-sized
+    python -m benchmarks.run --scale 10 --out bench_10x.json  # 10× the tickers
+    python -m benchmarks.run --workbook --tickers 2000        # include Excel parse
+    python -m benchmarks.run --baseline bench_old.json        # flag regressions
+
+Per-ticker steps (valuation, single-ticker backtest, hit-rate lookups, search) report
+the mean over ``--samples`` random tickers.
+"""
+
+import os
+import tempfile
+
+# Keep the market-data caches in memory and away from the real SQLite files
+os.environ.setdefault("WORKBENCH_INFO_DB", "")
+os.environ.setdefault("WORKBENCH_HISTORY_DB", os.path.join(tempfile.gettempdir(), "workbench-bench-history.sqlite"))
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from workbench import (
+    backtest,
+    backtest_store,
+    bootstrap,
+    bulk_quotes,
+    ingest,
+    market_data,
+    pe_cube,
+    portfolio,
+    screener,
+    sweep,
+    ticker_search,
+    universe,
+    universe_index,
+)
+
+
+REGRESSION_RATIO = 1.25     # --baseline flags steps slower than this
+
+
+# ─── Yahoo stub ──────────────────────────────────────────────────────────────
+class StubTicker:
+    """Stands in for ``yf.Ticker``: deterministic profile and price history."""
+
+    def __init__(self, ticker):
+        self.ticker = ticker
+        self._price = 10 + hash(ticker) % 490
+
+    @property
+    def info(self):
+        return {
+            "longName": f"{self.ticker} Inc.",
+            "website": f"https://www.{self.ticker.lower()}.example",
+            "regularMarketPrice": float(self._price),
+            "marketCap": self._price * 1e9,
+        }
+
+    def history(self, period="1mo", interval="1d", start=None):
+        index = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=250)
+        close = self._price * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.01, len(index))))
+        return pd.DataFrame({"Open": close, "High": close, "Low": close, "Close": close, "Volume": 1e6}, index=index)
+
+
+def _stub_batch(symbols):
+    return {s: market_data.quote_fields(StubTicker(s).info) for s in symbols}
+
+
+@contextmanager
+def stub_yahoo():
+    with mock.patch("yfinance.Ticker", StubTicker):
+        yield
+
+
+# ─── Measurement ─────────────────────────────────────────────────────────────
+class Recorder:
+    def __init__(self, repeat=1):
+        self.repeat = repeat
+        self.steps = {}
+
+    def step(self, name, fn, repeat=None):
+        """Run ``fn`` (best of ``repeat``) and record time and peak memory."""
+        times = []
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        for _ in range(repeat or self.repeat):
+            started = time.perf_counter()
+            out = fn()
+            times.append(time.perf_counter() - started)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        self.steps[name] = {"seconds": min(times), "peak_mb": round(peak / 2**20, 3)}
+        print(f"  {name:<28} {min(times) * 1000:10.2f} ms  {peak / 2**20:9.1f} MB")
+        return out
+
+    def per_call(self, name, fn, samples):
+        """Mean time of ``fn(sample)`` over ``samples``."""
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        for sample in samples:
+            fn(sample)
+        elapsed = (time.perf_counter() - started) / max(len(samples), 1)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+        self.steps[name] = {"seconds_per_call": elapsed, "calls": len(samples),
+                            "peak_mb": round(peak / 2**20, 3)}
+        print(f"  {name:<28} {elapsed * 1e6:10.1f} µs/call")
+
+
+# ─── The page's code paths ───────────────────────────────────────────────────
+def load_data(cache_dir):
+    """What the page's ``load_data`` does, minus Streamlit's cache."""
+    return universe.load_universe(cache_dir).as_tuple()
+
+
+def valuation_advisor(row, data, index, cube):
+    company, eps, *_ = data
+    ticker = index.tickers[row]
+    market_data.get_info(ticker)
+    gsubind = company["gsubind"].iat[row]
+    index.peers(gsubind)
+    year = eps.columns[-1]
+    eps_latest = eps[year].iat[row]
+    cube.lookup(gsubind, year)
+    cube.implied_range(gsubind, year, eps_latest, avg_pe=index.median_pe_row(gsubind)[-1])
+
+
+def ticker_backtest(row, data):
+    _, eps, _, tickers, gsubinds, median_pe_map, actual = data
+    result = backtest.backtest_universe(
+        eps.iloc[[row]], tickers.iloc[[row]], gsubinds.iloc[[row]], median_pe_map, actual
+    )
+    return backtest.ticker_frame(result, 0)
+
+
+def hit_rate_lookup(row, data, stats):
+    ticker_stats = stats["tickers"].iloc[row]
+    group = stats["gsubind"].loc[ticker_stats["gsubind"]]
+    return (
+        backtest.hit_rate(int(ticker_stats["hits"]), int(ticker_stats["total"])),
+        backtest.hit_rate(int(group["hits"]), int(group["total"])),
+        backtest.hit_rate(stats["global"]["hits"], stats["global"]["total"]),
+    )
+
+
+def run(n_tickers=4455, n_years=15, n_subindustries=150, seed=0, workbook=False,
+        samples=200, repeat=3):
+    """Run every step once (best of ``repeat`` where cheap); return the report."""
+    rec = Recorder(repeat)
+    tracemalloc.start()
+    with tempfile.TemporaryDirectory() as tmp, stub_yahoo():
+        tmp = Path(tmp)
+        print(f"Universe: {n_tickers} tickers × {n_years} years × {n_subindustries} sub-industries")
+        tables = rec.step("generate", lambda: synthetic.make_tables(n_tickers, n_years, n_subindustries, seed), 1)
+
+        if workbook:
+            path = rec.step("write_workbook", lambda: synthetic.write_workbook(tables, tmp / "synthetic.xlsx"), 1)
+            rec.step("parse_workbook", lambda: ingest.parse_workbook(path), 1)
+
+        cache_dir, store_dir = tmp / "cache", tmp / "store"
+        version = f"synthetic-{n_tickers}x{n_years}x{n_subindustries}-{seed}"
+        meta = {"schema_version": ingest.SCHEMA_VERSION, "deltas": [], "data_version": version}
+        rec.step("write_cache", lambda: ingest.write_tables(tables, meta, cache_dir), 1)
+        data = rec.step("load_data", lambda: load_data(cache_dir))
+        rec.step("write_universe_mmap", lambda: universe.ensure_universe(version, cache_dir, tmp / "universe"), 1)
+        rec.step("open_universe_mmap", lambda: universe.ensure_universe(version, cache_dir, tmp / "universe"))
+        company, eps, price, tickers, gsubinds, median_pe_map, _ = data
+
+        index = rec.step(
+            "build_universe_index",
+            lambda: universe_index.build_index(tickers, gsubinds, median_pe_map, eps.shape[1]),
+        )
+        stats = rec.step("backtest_store_build", lambda: backtest_store.build_store(version, cache_dir, store_dir), 1)
+        rec.step("backtest_store_load", lambda: backtest_store.load_store(version, cache_dir, store_dir))
+        cube = rec.step(
+            "build_pe_cube",
+            lambda: pe_cube.build_cube(price, eps, index, stats["gsubind"]["median_error"]),
+        )
+
+        rows = np.random.default_rng(seed).integers(0, n_tickers, samples)
+        rec.per_call("valuation_advisor", lambda r: valuation_advisor(r, data, index, cube), rows)
+        rec.per_call("ticker_backtest", lambda r: ticker_backtest(r, data), rows)
+        rec.per_call("hit_rate_lookups", lambda r: hit_rate_lookup(r, data, stats), rows)
+
+        search = rec.step("build_search_index", lambda: ticker_search.build_index(tickers, company["conm"]))
+        queries = [tickers[r][:3] for r in rows[: samples // 2]] + [company["conm"][r][-5:] for r in rows[samples // 2:]]
+        rec.per_call("ticker_search", lambda q: search.search(q, 10), queries)
+
+        rec.step("bulk_quote_prefetch", lambda: bulk_quotes.prefetch_quotes(
+            tickers.tolist(), bucket=bulk_quotes.TokenBucket(rate=1e9, capacity=1e9),
+            fetch=_stub_batch), 1)
+        screen = rec.step("screener_build", lambda: screener.build_screen(company, eps, price, index, cube))
+        rec.step("screener_query", lambda: screener.query(screen, sort_by="Gap %", page=3))
+        rec.step("sweep_60_configs", lambda: sweep.sweep(
+            tables, horizons=[1, 2, (1, 2)], aggregators=["mean", "median"],
+            min_gaps=[0, 0.1, 0.2, 0.3, 0.5], min_eps=[0, 0.5]), 1)
+        rec.step("portfolio_16_rules", lambda: portfolio.simulate(tables, [
+            portfolio.Rule(weighting, short, gap, hold)
+            for weighting in portfolio.WEIGHTINGS for short in (False, True)
+            for gap in (0, 0.25) for hold in (1, 2)]))
+        for block in bootstrap.BLOCKS:
+            rec.step(f"bootstrap_{block}", lambda: bootstrap.build_intervals(
+                version, block, cache_dir=cache_dir, store_dir=store_dir), 1)
+        rec.step("bootstrap_load", lambda: bootstrap.load_intervals(version, cache_dir=cache_dir, store_dir=store_dir))
+    tracemalloc.stop()
+
+    return {
+        "params": {"tickers": n_tickers, "years": n_years, "subindustries": n_subindustries,
+                   "seed": seed, "workbook": workbook, "samples": samples, "repeat": repeat},
+        "environment": _environment(),
+        "max_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "steps": rec.steps,
+    }
+
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(report, baseline):
+    """``{step: new / old time}`` for steps present in both reports."""
+    ratios = {}
+    for name, new in report["steps"].items():
+        old = baseline.get("steps", {}).get(name)
+        if not old:
+            continue
+        key = "seconds" if "seconds" in new else "seconds_per_call"
+        if old.get(key):
+            ratios[name] = new[key] / old[key]
+    return ratios
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the workbench on a synthetic universe.")
+    parser.add_argument("--tickers", type=int, default=4455)
+    parser.add_argument("--years", type=int, default=15)
+    parser.add_argument("--subindustries", type=int, default=150)
+    parser.add_argument("--scale", type=int, default=1, help="multiply --tickers")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--workbook", action="store_true", help="also write and parse an .xlsx")
+    parser.add_argument("--out", default="bench_report.json")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    args = parser.parse_args(argv)
+
+    report = run(args.tickers * args.scale, args.years, args.subindustries, args.seed,
+                 args.workbook, args.samples, args.repeat)
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("params") != report["params"]:
+            print("Warning: baseline was run with different parameters")
+        ratios = compare(report, baseline)
+        slower = {k: r for k, r in ratios.items() if r > REGRESSION_RATIO}
+        for name, ratio in sorted(ratios.items(), key=lambda kv: -kv[1]):
+            flag = "  ← slower" if name in slower else ""
+            print(f"  {name:<28} {ratio:6.2f}×{flag}")
+        if slower:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
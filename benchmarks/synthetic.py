@@ -0,0 +1,108 @@
+"""
+synthetic.py  –  Synthetic universes shaped like the master workbook
+
+``make_tables`` produces the same tables ``workbench.ingest`` parses out of
+the workbook (company / eps / price / actual_price, plus the derived
+median_pe) for any number of tickers, years and sub-industries.  EPS follow
+a noisy growth path with some losses and gaps; prices are EPS × a
+sub-industry P/E level × company noise, so peer P/E statistics and the
+backtest behave like the real data.
+
+``write_workbook`` lays the tables out as "Company Dta" / "Analysis" sheets
+so the Excel parse path can be timed too (slow to write beyond ~50k rows).
+"""
+
+import numpy as np
+import pandas as pd
+
+from workbench.ingest import COMPANY_COLUMNS
+from workbench.median_pe import derive_median_pe
+
+
+FIRST_YEAR = 2010
+
+
+def make_tables(n_tickers=4455, n_years=15, n_subindustries=150, seed=0):
+    rng = np.random.default_rng(seed)
+    years = list(range(FIRST_YEAR, FIRST_YEAR + n_years))
+
+    # Sub-industries: GICS-like 8-digit codes, each with its own P/E level
+    codes = 10101010 + np.arange(n_subindustries) * 10
+    group_pe = rng.uniform(8, 45, n_subindustries)
+    group_of_row = rng.integers(0, n_subindustries, n_tickers)
+
+    tickers = [f"T{i:06d}" for i in range(n_tickers)]
+    company = pd.DataFrame(
+        {
+            "Ticker": tickers,
+            "conm": [f"SYNTHETIC CO {i}" for i in range(n_tickers)],
+            "gsubind": codes[group_of_row],
+            "Industry": [f"Industry {g}" for g in group_of_row],
+            "sic": rng.integers(1000, 9999, n_tickers),
+            "Mkt cap (USD Bn)": np.round(rng.lognormal(1.5, 1.5, n_tickers), 2),
+            "gind": codes[group_of_row] // 100,
+            "gsector": codes[group_of_row] // 1000000,
+            "naics": rng.integers(100000, 999999, n_tickers),
+        },
+        columns=COMPANY_COLUMNS,
+    )
+
+    # EPS: random-walk growth from a lognormal base, ~8 % losses, ~3 % gaps
+    base = rng.lognormal(0.5, 0.8, n_tickers)[:, None]
+    growth = np.cumprod(1 + rng.normal(0.06, 0.25, (n_tickers, n_years)), axis=1)
+    eps = base * growth
+    eps[rng.random(eps.shape) < 0.08] *= -1
+    eps[rng.random(eps.shape) < 0.03] = np.nan
+
+    # Prices: |EPS| × peer P/E level × company noise; actual ≈ year-end price
+    pe = group_pe[group_of_row][:, None] * rng.lognormal(0, 0.35, (n_tickers, n_years))
+    price = np.abs(eps) * pe
+    price[rng.random(price.shape) < 0.02] = np.nan
+    actual = price * rng.lognormal(0, 0.05, price.shape)
+
+    eps_frame = pd.DataFrame(np.round(eps, 2), columns=years)
+    price_frame = pd.DataFrame(np.round(price, 2), columns=years)
+    actual_frame = pd.DataFrame(
+        np.round(actual, 2), columns=years, index=pd.Index(tickers, name="Ticker")
+    )
+    return {
+        "company": company,
+        "eps": eps_frame,
+        "price": price_frame,
+        "median_pe": derive_median_pe(eps_frame, price_frame, company["gsubind"]),
+        "actual_price": actual_frame,
+    }
+
+
+def write_workbook(tables, path):
+    """Write ``tables`` in the master workbook's sheet layout."""
+    company, eps, price = tables["company"], tables["eps"], tables["price"]
+    actual = tables["actual_price"]
+    years = list(eps.columns)
+    n_years, n_meta = len(years), len(COMPANY_COLUMNS)
+    dates = [pd.Timestamp(y, 12, 31) for y in years]
+
+    # Company Dta: block labels on row 0, column names / year-ends on row 3
+    header = [[None] * (n_meta + 3 * n_years) for _ in range(4)]
+    for offset, label in enumerate(("EPS", "Price", "P/E Ratio")):
+        header[0][n_meta + offset * n_years] = label
+    header[3] = COMPANY_COLUMNS + dates * 3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pe = price.to_numpy() / eps.to_numpy()
+    body = np.hstack([company.to_numpy(dtype=object), eps.to_numpy(), price.to_numpy(), pe])
+    company_sheet = pd.DataFrame(header + body.tolist())
+
+    # Analysis: labels on row 3, years on row 4, ticker in column 0
+    header = [[None] * (n_meta + 2 * n_years) for _ in range(5)]
+    header[3][n_meta] = "Model Price"
+    header[3][n_meta + n_years] = "Actual Price"
+    header[4] = ["Ticker"] + [None] * (n_meta - 1) + years * 2
+    filler = np.full((len(actual), n_meta - 1), None, dtype=object)
+    model = np.full((len(actual), n_years), None, dtype=object)
+    body = np.hstack([actual.index.to_numpy(dtype=object)[:, None], filler, model, actual.to_numpy()])
+    analysis_sheet = pd.DataFrame(header + body.tolist())
+
+    with pd.ExcelWriter(path, engine="openpyxl") as writer:
+        company_sheet.to_excel(writer, sheet_name="Company Dta", header=False, index=False)
+        analysis_sheet.to_excel(writer, sheet_name="Analysis", header=False, index=False)
+    return path
@@ -3,67 +3,55 @@ streamlit_app.py  –  Equity Insight Workbench
 Cleaned up with consistent 4-space indentation.
 """
 
+import uuid
+
 import streamlit as st
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
 import yfinance as yf
 import plotly.graph_objects as go
-import urllib.parse
 from yfinance.exceptions import YFRateLimitError
 
+from workbench import (
+    backtest,
+    backtest_store,
+    bootstrap,
+    bulk_quotes,
+    charts,
+    compare,
+    concurrent_fetch,
+    diagnostics,
+    ingest,
+    intraday,
+    market_data,
+    pe_cube,
+    screener,
+    ticker_search,
+    universe,
+    universe_index,
+)
+
 
 # ─── Page config ─────────────────────────────────────────────────────────────
 st.set_page_config(page_title="Valuation & Backtest & Snapshot", layout="wide")
+diagnostics.begin_rerun(session=st.session_state.setdefault("session_id", uuid.uuid4().hex[:8]))
 
 # ─── Data Loading ────────────────────────────────────────────────────────────
-file_path = "data/Master data price eps etc.xlsx"
-
-
-@st.cache_data
-def load_data():
-    # Company Dta sheet
-    df = pd.read_excel(file_path, sheet_name="Company Dta", header=None)
-    headers = df.iloc[3]
-    df.columns = headers
-    company_data = df.iloc[4:].reset_index(drop=True)
-
-    # EPS & Price blocks
-    eps_data = company_data.iloc[:, 9:24].apply(pd.to_numeric, errors="coerce")
-    price_data = company_data.iloc[:, 24:39].apply(pd.to_numeric, errors="coerce")
-    eps_data.columns = list(range(2010, 2025))
-    price_data.columns = list(range(2010, 2025))
-
-    # Tickers & sub-industry codes
-    ticker_data = company_data["Ticker"].reset_index(drop=True)
-    gsubind_data = company_data["gsubind"].reset_index(drop=True)
-
-    # Median PE sheet
-    median_pe = pd.read_excel(file_path, sheet_name="Median PE", header=None)
-    median_pe_trim = median_pe.iloc[5:, :18].reset_index(drop=True)
-    median_pe_trim.columns = [None, None, "gsubind"] + list(range(2010, 2025))
-    gsubind_to_median_pe = {
-        row["gsubind"]: row[3:].values for _, row in median_pe_trim.iterrows()
-    }
-
-    # Analysis sheet → actual prices
-    analysis = pd.read_excel(file_path, sheet_name="Analysis", header=None)
-    analysis_trim = analysis.iloc[5:, :40].reset_index(drop=True)
-    actual_price = analysis_trim.iloc[:, 24:39].apply(pd.to_numeric, errors="coerce")
-    actual_price.columns = list(range(2010, 2025))
-    actual_price.index = analysis_trim.iloc[:, 0]
-
-    return (
-        company_data,
-        eps_data,
-        price_data,
-        ticker_data,
-        gsubind_data,
-        gsubind_to_median_pe,
-        actual_price,
-    )
+file_path = ingest.WORKBOOK_PATH
+
 
+@diagnostics.cached(st.cache_resource)
+def load_data(data_version):
+    # One compact, read-only copy of the sheets, memory-mapped so every
+    # session and every server process on the host shares it (see
+    # workbench.universe); ``data_version`` keys the cache on the workbook.
+    # Returns company, EPS, price, tickers, gsubinds, the Median PE lookup
+    # and the Analysis sheet's actual prices.
+    return universe.ensure_universe(data_version).as_tuple()
 
+
+with diagnostics.span("ensure_cache"):
+    data_version = ingest.ensure_cache(file_path)
 (
     company_data,
     eps_data,
@@ -72,11 +60,89 @@ def load_data():
     gsubind_data,
     gsubind_to_median_pe,
     actual_price_data,
-) = load_data()
-years = list(range(2010, 2025))
+) = load_data(data_version)
+# Fiscal years come from the data, so an appended year shows up by itself
+years = list(eps_data.columns)
+latest_year = years[-1]
+
+
+@diagnostics.cached(st.cache_resource)
+def load_backtest_stats(data_version):
+    # Per-ticker / per-gsubind / global hit rates, built once per data version
+    return backtest_store.load_store(data_version)
+
+
+backtest_stats = load_backtest_stats(data_version)
+
+
+@diagnostics.cached(st.cache_resource)
+def load_hit_rate_intervals(data_version, block):
+    # Bootstrap intervals around those hit rates, stored per data version
+    return bootstrap.load_intervals(data_version, block)
+
+
+@diagnostics.cached(st.cache_resource)
+def load_universe_index(data_version):
+    # Ticker → row hash map and gsubind → peer-row groups, shared read-only
+    _, _, _, tickers, gsubinds, median_pe_map, _ = load_data(data_version)
+    return universe_index.build_index(tickers, gsubinds, median_pe_map, len(years))
+
+
+ticker_index = load_universe_index(data_version)
+
+
+@diagnostics.cached(st.cache_resource)
+def load_pe_cube(data_version):
+    # Peer P/E stats per (gsubind, year) plus each gsubind's model error band
+    _, eps, price, *_ = load_data(data_version)
+    model_errors = load_backtest_stats(data_version)["gsubind"]["median_error"]
+    return pe_cube.build_cube(price, eps, load_universe_index(data_version), model_errors)
+
+
+pe_stats = load_pe_cube(data_version)
+
+
+@diagnostics.cached(st.cache_data(ttl=market_data.QUOTE_TTL))
+def load_screen(data_version):
+    # Whole-universe implied prices and gaps; current prices come from the
+    # bulk-quote cache, so the screen is rebuilt when quotes age out
+    return screener.build_screen(company_data, eps_data, price_data, ticker_index, pe_stats)
 
 # ─── Sidebar Ticker Input ────────────────────────────────────────────────────
-ticker_input = st.sidebar.selectbox("Choose a ticker", options=ticker_data.tolist())
+SEARCH_RESULTS = 10
+
+
+@diagnostics.cached(st.cache_resource)
+def load_search_index(data_version):
+    # Prefix / trigram index over symbols and company names, shared read-only
+    return ticker_search.build_index(ticker_data, company_data["conm"])
+
+
+@st.fragment
+def ticker_picker():
+    # Typing reruns only this fragment and only the top matches are sent to
+    # the browser; picking one reruns the page for the new ticker.
+    query = st.text_input(
+        "Search ticker or company", key="ticker_query", type="search", live="200ms",
+        placeholder="e.g. AAPL or Apple",
+    )
+    if not query:
+        return
+    rows = load_search_index(data_version).search(query, SEARCH_RESULTS)
+    if not rows:
+        st.caption("No matches.")
+    for row in rows:
+        ticker = ticker_data[row]
+        if st.button(f"{ticker} · {company_data.at[row, 'conm']}", key=f"pick_{ticker}",
+                     use_container_width=True):
+            st.session_state["ticker"] = ticker
+            st.rerun()
+
+
+ticker_input = st.session_state.setdefault("ticker", ticker_data[0])
+st.sidebar.markdown(f"**Ticker:** {ticker_input}")
+with st.sidebar:
+    ticker_picker()
 
 # ─── How-to banner ───────────────────────────────────────────────────────────
 with st.container():
@@ -89,6 +155,8 @@ with st.container():
 | **Is the stock cheap or rich *right now*?** | **💸 Valuation Advisor** |
 | **Has this model worked in the past?** | **📊 Backtest** |
 | **What’s happening with the company & price today?** | **🏢 Company Snapshot** |
+| **Which names look cheapest across the whole universe?** | **🔎 Screener** |
+| **How do a handful of names stack up against each other?** | **⚖️ Compare** |
 
 1. **Pick a ticker** in the sidebar.  
 2. Jump between tabs to answer the questions above.  
@@ -98,27 +166,42 @@ with st.container():
     )
 
 # ─── Tabs ────────────────────────────────────────────────────────────────────
-tab1, tab2, tab3 = st.tabs(
-    ["💸 Valuation Advisor", "📊 Backtest", "🏢 Company Snapshot"]
+# A selector instead of st.tabs: st.tabs runs every tab's body on every rerun,
+# this way only the tab being viewed does any work.
+TABS = ["💸 Valuation Advisor", "📊 Backtest", "🏢 Company Snapshot", "🔎 Screener", "⚖️ Compare"]
+active_tab = st.segmented_control(
+    "Section", TABS, default=TABS[0], required=True, key="active_tab",
+    label_visibility="collapsed",
 )
 
+
+def ticker_results():
+    """Session-scoped scratch space for the selected ticker and data version.
+
+    Survives tab switches; starts empty when either the ticker or the data
+    version changes.
+    """
+    key = (ticker_input, data_version)
+    if st.session_state.get("ticker_results_key") != key:
+        st.session_state["ticker_results_key"] = key
+        st.session_state["ticker_results"] = {}
+    return st.session_state["ticker_results"]
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # Tab 1 – Valuation Advisor
 # ═════════════════════════════════════════════════════════════════════════════
-with tab1:
+def valuation_advisor():
     st.title("💸 Valuation Advisor")
 
-    if ticker_input in ticker_data.values:
-        idx = ticker_data[ticker_data == ticker_input].index[0]
+    if ticker_input in ticker_index:
+        idx = ticker_index.row(ticker_input)
         company_gsubind = gsubind_data[idx]
+        ticker_obj = yf.Ticker(ticker_input.upper())
         try:
-            ticker_obj = yf.Ticker(ticker_input.upper())
-            info = ticker_obj.info
-            website = info.get("website", "")
-            domain = urllib.parse.urlparse(website).netloc
-            logo_url = info.get("logo_url") or (
-                f"https://logo.clearbit.com/{domain}" if domain else None
-            )
+            with diagnostics.span("profile"):
+                info = market_data.get_info(ticker_input)
+            logo_url = market_data.logo_url(info)
             current_price = info.get("regularMarketPrice", "Not fetched")
         except YFRateLimitError:
             st.error("⚠️ Unable to fetch data from Yahoo Finance due to rate limits. Please try again later.")
@@ -132,14 +215,6 @@ with tab1:
             current_price = "Not fetched"
 
         # ── Logo & header ────────────────────────────────────────────────
-        # ticker_obj = yf.Ticker(ticker_input.upper())
-        # info = ticker_obj.info
-        # website = info.get("website", "")
-        # domain = urllib.parse.urlparse(website).netloc
-        # logo_url = info.get("logo_url") or (
-        #     f"https://logo.clearbit.com/{domain}" if domain else None
-        # )
-
         col1, col2 = st.columns([1, 6])
         with col1:
             if logo_url:
@@ -148,7 +223,7 @@ with tab1:
             st.subheader(f"Details for: {ticker_input}")
 
         # ── Peers & industry ────────────────────────────────────────────
-        peer_indices = gsubind_data[gsubind_data == company_gsubind].index
+        peer_indices = ticker_index.peers(company_gsubind)
         peers = ticker_data.loc[peer_indices].tolist()
         industry = (
             company_data.loc[idx, "Industry"]
@@ -159,41 +234,59 @@ with tab1:
         st.markdown(f"**Industry:** {industry}")
         st.markdown(f"**Competitors:** {', '.join(peers)}")
 
-        # ── Median P/E for peers (2024) ────────────────────────────────
-        pe_ratio = price_data.divide(eps_data)
-        pe_ratio = pe_ratio.mask((pe_ratio <= 0) | pe_ratio.isna())
-        pe_ratio["gsubind"] = gsubind_data.values
-        peer_pe_ratios = pe_ratio.loc[peer_indices]
-        valid_peer_pe = peer_pe_ratios[2024].dropna()
+        # One batched quote request for the whole peer group; when Yahoo is
+        # throttling, whatever the quote cache already holds is shown
+        with diagnostics.span("peer_quotes"):
+            peer_quotes = bulk_quotes.prefetch_quotes_nowait(peers)
+        if peer_quotes:
+            with st.expander("💹 Peer prices"):
+                st.dataframe(
+                    pd.DataFrame(
+                        {
+                            "Ticker": peers,
+                            "Price": [
+                                peer_quotes.get(p, {}).get("regularMarketPrice") for p in peers
+                            ],
+                        }
+                    ),
+                    use_container_width=True,
+                    hide_index=True,
+                )
+
+        # ── Peer P/E range (latest year) from the precomputed cube ────
+        peer_pe_latest = pe_stats.lookup(company_gsubind, latest_year)
+        has_peer_pe = peer_pe_latest["count"] > 0
 
-        eps_2024 = eps_data.loc[idx, 2024]
-        current_price = price_data.loc[idx, 2024]
+        eps_latest = eps_data.loc[idx, latest_year]
+        current_price = price_data.loc[idx, latest_year]
         try:
             current_price = info.get("regularMarketPrice")
             if current_price is None:
-                hist = ticker_obj.history(period="1d")
+                current_price = market_data.get_price(ticker_input)
+            if current_price is None:
+                with diagnostics.external("yahoo.history"):
+                    hist = ticker_obj.history(period="1d")
                 current_price = hist["Close"][-1] if not hist.empty else np.nan
         except Exception:
             current_price = np.nan
 
-        eps_valid = (eps_2024 > 0) and not np.isnan(eps_2024)
+        eps_valid = (eps_latest > 0) and not np.isnan(eps_latest)
 
-        if eps_valid and not valid_peer_pe.empty:
-            # industry_pe_avg = valid_peer_pe.median()
-            pe_2024_array = gsubind_to_median_pe.get(company_gsubind, [np.nan] * len(years))
-            industry_pe_avg = pe_2024_array[-1]
-            implied_price_avg = eps_2024 * industry_pe_avg
-            implied_price_min = eps_2024 * valid_peer_pe.min()
-            implied_price_max = eps_2024 * valid_peer_pe.max()
+        if eps_valid and has_peer_pe:
+            pe_array = ticker_index.median_pe_row(company_gsubind)
+            industry_pe_avg = pe_array[-1]
+            implied_price_min, implied_price_avg, implied_price_max = pe_stats.implied_range(
+                company_gsubind, latest_year, eps_latest, avg_pe=industry_pe_avg
+            )
         else:
             industry_pe_avg = implied_price_avg = implied_price_min = implied_price_max = np.nan
 
         # ── Key inputs ─────────────────────────────────────────────────
         st.subheader("📊 Key Valuation Inputs")
         c1, c2, c3 = st.columns(3)
-        c1.metric("Last Reported EPS", f"{eps_2024:.2f}" if eps_valid else "N/A")
+        c1.metric("Last Reported EPS", f"{eps_latest:.2f}" if eps_valid else "N/A")
         c2.metric(
-            "2024 Median P/E",
+            f"{latest_year} Median P/E",
             f"{industry_pe_avg:.2f}" if not np.isnan(industry_pe_avg) else "N/A",
         )
         c3.metric(
@@ -212,58 +305,14 @@ with tab1:
 
         # ── Valuation range viz ───────────────────────────────────────
         st.subheader("📉 Valuation Range Visualization")
-        if eps_valid and not valid_peer_pe.empty:
-            fig, ax = plt.subplots(figsize=(10, 2.5))
-            ax.hlines(
-                1,
-                implied_price_min,
-                implied_price_max,
-                color="gray",
-                linewidth=10,
-                alpha=0.4,
-            )
-            ax.vlines(
-                implied_price_avg,
-                0.9,
-                1.1,
-                color="blue",
-                linewidth=2,
-                label="Avg Implied Price",
-            )
-            ax.plot(
-                current_price,
-                1,
-                "ro",
-                markersize=10,
-                label="Current Price",
-            )
-            ax.text(
-                implied_price_min,
-                1.15,
-                f"Low:  ${implied_price_min:.2f}",
-                ha="center",
-                fontsize=9,
-            )
-            ax.text(
-                implied_price_avg,
-                1.27,
-                f"Avg:  ${implied_price_avg:.2f}",
-                ha="center",
-                fontsize=9,
-                color="blue",
-            )
-            ax.text(
-                implied_price_max,
-                1.15,
-                f"High: ${implied_price_max:.2f}",
-                ha="center",
-                fontsize=9,
-            )
-            ax.set_xlim(implied_price_min * 0.85, implied_price_max * 1.15)
-            ax.set_ylim(0.8, 1.4)
-            ax.axis("off")
-            ax.legend(loc="upper center", bbox_to_anchor=(0.5, 1.35), ncol=2)
-            st.pyplot(fig)
+        if eps_valid and has_peer_pe:
+            # Built once per ticker / data version / price, shared across sessions
+            with diagnostics.span("valuation_chart"):
+                png = charts.valuation_range_png(
+                    ticker_input, data_version,
+                    implied_price_min, implied_price_avg, implied_price_max, current_price,
+                )
+            st.image(png, width="stretch")
 
             gap = ((implied_price_avg - current_price) / implied_price_avg) * 100
             if gap > 0:
@@ -287,23 +336,19 @@ with tab1:
 # ═════════════════════════════════════════════════════════════════════════════
 # Tab 2 – Backtest
 # ═════════════════════════════════════════════════════════════════════════════
-with tab2:
+def backtest_view():
     st.title("📊 Company Stock Valuation Analysis")
 
-    if ticker_input in ticker_data.values:
-        idx = ticker_data[ticker_data == ticker_input].index[0]
+    if ticker_input in ticker_index:
+        idx = ticker_index.row(ticker_input)
         gsubind = gsubind_data[idx]
         industry = company_data.loc[idx, "Industry"]
 
         # ── Logo & header ────────────────────────────────────────────
         try:
-            ticker_obj = yf.Ticker(ticker_input.upper())
-            info = ticker_obj.info
-            website = info.get("website", "")
-            domain = urllib.parse.urlparse(website).netloc
-            logo_url = info.get("logo_url") or (
-                f"https://logo.clearbit.com/{domain}" if domain else None
-            )
+            with diagnostics.span("profile"):
+                info = market_data.get_info(ticker_input)
+            logo_url = market_data.logo_url(info)
         except YFRateLimitError:
             st.error("⚠️ Unable to fetch data from Yahoo Finance due to rate limits. Please try again later.")
             info = {}
@@ -328,29 +373,29 @@ with tab2:
             st.subheader(f"Details for: {ticker_input}")
         try:
     # Get relevant price data
-            eps_2024 = eps_data.loc[idx, 2024] if 2024 in eps_data.columns else None
+            eps_latest = eps_data.loc[idx, latest_year]
             # Fetch the last value from the Median P/E Array safely
-            median_pe_array = gsubind_to_median_pe.get(gsubind_data[idx], [])
-            median_pe_2024 = None
+            median_pe_array = ticker_index.median_pe_row(gsubind)
+            median_pe_latest = None
             if median_pe_array is not None and len(median_pe_array) > 0:
                 median_pe_array = np.array(median_pe_array, dtype=float)
                 if not np.all(np.isnan(median_pe_array)):
-                    median_pe_2024 = median_pe_array[-1]
+                    median_pe_latest = median_pe_array[-1]
                 
 
     # Calculate model price
-            model_price_2024 = None
-            if eps_2024 is not None and median_pe_2024 is not None:
-                model_price_2024 = float(eps_2024) * float(median_pe_2024)
+            model_price_latest = None
+            if eps_latest is not None and median_pe_latest is not None:
+                model_price_latest = float(eps_latest) * float(median_pe_latest)
 
     # Fetch actual price and current price
-            actual_price_2024 = actual_price_data.loc[ticker_input, 2024] if 2024 in actual_price_data.columns else None
+            actual_price_latest = actual_price_data.loc[ticker_input, latest_year]
             current_price = info.get("regularMarketPrice", "Not fetched")
             # Display metrics
             st.subheader("📊 Key Valuation Inputs")
             c1, c2, c3 = st.columns(3)
-            c1.metric("Actual Price 2024", f"${actual_price_2024:.2f}" if actual_price_2024 else "N/A")
-            c2.metric("Model Price 2025", f"${model_price_2024:.2f}" if model_price_2024 else "N/A")
+            c1.metric(f"Actual Price {latest_year}", f"${actual_price_latest:.2f}" if actual_price_latest else "N/A")
+            c2.metric(f"Model Price {latest_year + 1}", f"${model_price_latest:.2f}" if model_price_latest else "N/A")
             c3.metric("Current Price", f"${current_price:.2f}" if isinstance(current_price, (int, float)) else "N/A")
         except Exception as e:
             st.error("⚠️ Could not calculate key valuation inputs.")
@@ -359,149 +404,89 @@ with tab2:
 
         st.write(f"**Industry:** {industry}")
 
-        all_peers = ticker_data[gsubind_data == gsubind].tolist()
+        all_peers = ticker_data.loc[ticker_index.peers(gsubind)].tolist()
         competitors = [t for t in all_peers if t != ticker_input]
         st.write("**Competitors:**", ", ".join(competitors) or "None")
 
-        eps_row = eps_data.loc[idx].mask(eps_data.loc[idx] <= 0)
-        median_pe_row = pd.Series(
-            gsubind_to_median_pe.get(gsubind, [None] * len(years)), index=years
-        )
-        model_price = eps_row * median_pe_row
-        actual_price = actual_price_data.loc[ticker_input]
-
-        price_df = pd.DataFrame(
-            {
-                "Year": years,
-                "EPS": eps_row.values,
-                "Median PE": median_pe_row.values,
-                "Model Price": model_price.values,
-                "Actual Price": actual_price.values,
-            }
-        )
-        price_df["Prediction"] = np.where(model_price > actual_price, "Up", "Down")
+        # Model series for this ticker only; universe stats come from the store
+        results = ticker_results()
+        if "backtest" not in results:
+            with diagnostics.span("ticker_backtest"):
+                results["backtest"] = backtest.backtest_universe(
+                    eps_data.loc[[idx]],
+                    ticker_data.loc[[idx]],
+                    gsubind_data.loc[[idx]],
+                    gsubind_to_median_pe,
+                    actual_price_data,
+                )
+        bt = results["backtest"]
+        ticker_stats = backtest_stats["tickers"].iloc[idx]
+        gsubind_stats = backtest_stats["gsubind"].loc[gsubind]
+        global_stats = backtest_stats["global"]
+
+        def interval_caption(interval):
+            lo, hi = interval["ci_low"], interval["ci_high"]
+            if pd.isna(lo):
+                return
+            if lo > 50:
+                verdict = "better than a coin flip"
+            elif hi < 50:
+                verdict = "worse than a coin flip"
+            else:
+                verdict = "not distinguishable from a coin flip"
+            st.caption(
+                f"{100 - 100 * bootstrap.ALPHA:g}% bootstrap interval: "
+                f"{lo:.1f}% – {hi:.1f}% · {verdict}"
+            )
+
+        price_df = backtest.ticker_frame(bt, 0)
 
         # ── Interactive price comparison ────────────────────────────
         st.subheader(f"📈 {ticker_input}: Model vs Actual Price (t → t + 1)")
         
-        # x-axis for each series
-        x_actual = price_df["Year"]                      # t
-        y_actual = price_df["Actual Price"]
-        
-        x_model  = x_actual + 1                          # t + 1
-        y_model  = price_df["Model Price"]
-        
-        import plotly.graph_objects as go
-        fig_bt = go.Figure()
-        
-        # Model (predicted for next year)
-        fig_bt.add_trace(
-            go.Scatter(
-                x=x_model,
-                y=y_model,
-                mode="lines+markers",
-                name="Model (predicted t → t+1)",
-                marker=dict(symbol="square"),
-                line=dict(width=2),
-            )
-        )
-        
-        # Actual (realised in year t)
-        fig_bt.add_trace(
-            go.Scatter(
-                x=x_actual,
-                y=y_actual,
-                mode="lines+markers",
-                name="Actual Price (t)",
-                marker=dict(symbol="circle"),
-                line=dict(width=2, dash="dash"),
-            )
-        )
-        
-        # Layout tweaks
-        fig_bt.update_layout(
-            height=450,
-            xaxis_title="Fiscal Year",
-            yaxis_title="Share Price ($)",
-            hovermode="x unified",
-            xaxis=dict(dtick=1),                 # one tick per year
-            legend=dict(
-                orientation="h",
-                yanchor="bottom",
-                y=1.02,
-                xanchor="right",
-                x=1,
-            ),
-            margin=dict(l=40, r=40, t=40, b=40),
-        )
-        
+        fig_bt = charts.model_vs_actual(ticker_input, data_version, price_df)
         st.plotly_chart(fig_bt, use_container_width=True)
 
         # ── Hit-rate calculation ────────────────────────────────────
-        total_predictions = correct_predictions = 0
-        for year in range(2010, 2024):
-            if pd.isna(model_price.get(year)):
-                continue
-            model_pred = "Up" if model_price[year] > actual_price[year] else "Down"
-
-            if (year + 1 in actual_price.index) and pd.notna(actual_price.get(year + 1)):
-                m1 = "Up" if actual_price[year + 1] > actual_price[year] else "Down"
-                if model_pred == m1:
-                    correct_predictions += 1
-                total_predictions += 1
-
-            if (year + 2 in actual_price.index) and pd.notna(actual_price.get(year + 2)):
-                m2 = "Up" if actual_price[year + 2] > actual_price[year] else "Down"
-                if model_pred == m2:
-                    correct_predictions += 1
-                total_predictions += 1
-
-        overall_hit_rate = (
-            correct_predictions / total_predictions * 100 if total_predictions else np.nan
-        )
+        total_predictions = int(ticker_stats["total"])
+        correct_predictions = int(ticker_stats["hits"])
+
+        overall_hit_rate = backtest.hit_rate(correct_predictions, total_predictions)
 
         st.subheader("🎯 Overall Prediction Hit Rate Analysis")
+        by_year = st.toggle(
+            "Resample whole years for the confidence intervals",
+            key="ci_by_year",
+            help="Off: ticker-years are resampled independently. On: whole fiscal years are "
+                 "resampled, so market-wide years are not counted as independent evidence.",
+        )
+        with diagnostics.span("hit_rate_intervals"):
+            intervals = load_hit_rate_intervals(data_version, "year" if by_year else "ticker_year")
         st.markdown(f"**Total Valid Predictions:** {total_predictions}")
         st.markdown(f"**Correct Predictions:** {correct_predictions}")
         if not np.isnan(overall_hit_rate):
             st.success(f"✅ Overall Average Hit Rate: **{overall_hit_rate:.2f}%**")
+            interval_caption(intervals["tickers"].iloc[idx])
         else:
             st.warning("Not enough data to calculate hit rate.")
 
         st.dataframe(price_df, use_container_width=True)
 
-        # ── Final prediction for 2024 + context ──────────────────────
+        # ── Final prediction for the latest year + context ───────────
         price_df.set_index("Year", inplace=True)
-        if 2024 in price_df.index and not pd.isna(price_df.loc[2024, "Prediction"]):
-            pred_2024 = price_df.loc[2024, "Prediction"]
-            st.success(f"🔮 Final Prediction for 2024: **{pred_2024}**")
+        if latest_year in price_df.index and not pd.isna(price_df.loc[latest_year, "Prediction"]):
+            pred_latest = price_df.loc[latest_year, "Prediction"]
+            st.success(f"🔮 Final Prediction for {latest_year}: **{pred_latest}**")
 
             # 1️⃣ Gap %
-            model_24 = price_df.loc[2024, "Model Price"]
-            actual_24 = price_df.loc[2024, "Actual Price"]
-            gap_pct = (model_24 - actual_24) / actual_24 * 100
+            model_latest = price_df.loc[latest_year, "Model Price"]
+            actual_latest = price_df.loc[latest_year, "Actual Price"]
+            gap_pct = (model_latest - actual_latest) / actual_latest * 100
             st.markdown(f"• **Model vs Actual Gap:** {gap_pct:.1f}%")
 
             # 2️⃣ Typical sub-industry error
-            errors = []
-            for peer_idx in peer_indices:
-                peer_actual = actual_price_data.loc[ticker_data[peer_idx]]
-                peer_eps = eps_data.loc[peer_idx].mask(eps_data.loc[peer_idx] <= 0)
-                peer_model = peer_eps * pd.Series(
-                    gsubind_to_median_pe[gsubind], index=years
-                )
-                for yr in range(2010, 2024):
-                    if (
-                        pd.notna(peer_model.get(yr))
-                        and (yr + 1 in peer_actual.index)
-                        and pd.notna(peer_actual.get(yr + 1))
-                    ):
-                        err = abs(
-                            (peer_model[yr] - peer_actual[yr + 1]) / peer_actual[yr + 1]
-                        ) * 100
-                        errors.append(err)
-            if errors:
-                conf_band = np.nanmedian(errors)
+            conf_band = pe_stats.error_band(gsubind)
+            if not np.isnan(conf_band):
                 st.markdown(f"• **Typical {industry} model error:** ±{conf_band:.1f}%")
             else:
                 st.markdown(
@@ -513,51 +498,17 @@ with tab2:
                 "Consider forward-looking estimates, volatility, and macro factors before making any trade.*"
             )
         else:
-            st.warning("Prediction for 2024 not available.")
+            st.warning(f"Prediction for {latest_year} not available.")
 
         # ── Industry average hit rate ─────────────────────────────────
-        peer_indices = gsubind_data[gsubind_data == gsubind].index
-        gsubind_total = gsubind_correct = 0
-        for peer_idx in peer_indices:
-            peer_tkr = ticker_data[peer_idx]
-            if peer_tkr not in actual_price_data.index:
-                continue
-            peer_eps = eps_data.loc[peer_idx].mask(eps_data.loc[peer_idx] <= 0)
-            peer_actual = actual_price_data.loc[peer_tkr]
-            peer_median = pd.Series(
-                gsubind_to_median_pe.get(gsubind, [None] * len(years)), index=years
-            )
-            peer_model = peer_eps * peer_median
-            for year in range(2010, 2024):
-                if pd.isna(peer_model.get(year)):
-                    continue
-                peer_pred = "Up" if peer_model[year] > peer_actual[year] else "Down"
-
-                if (
-                    year + 1 in peer_actual.index
-                    and pd.notna(peer_actual.get(year + 1))
-                ):
-                    n1 = "Up" if peer_actual[year + 1] > peer_actual[year] else "Down"
-                    if peer_pred == n1:
-                        gsubind_correct += 1
-                    gsubind_total += 1
-
-                if (
-                    year + 2 in peer_actual.index
-                    and pd.notna(peer_actual.get(year + 2))
-                ):
-                    n2 = "Up" if peer_actual[year + 2] > peer_actual[year] else "Down"
-                    if peer_pred == n2:
-                        gsubind_correct += 1
-                    gsubind_total += 1
-
-        gsubind_hit_rate = (
-            gsubind_correct / gsubind_total * 100 if gsubind_total else np.nan
-        )
+        gsubind_total = int(gsubind_stats["total"])
+        gsubind_correct = int(gsubind_stats["hits"])
+        gsubind_hit_rate = backtest.hit_rate(gsubind_correct, gsubind_total)
         st.subheader(f"🏆 {industry} Industry Hit Rate Comparison")
         st.markdown(f"**Your Stock Hit Rate:** {overall_hit_rate:.2f}%")
         if not np.isnan(gsubind_hit_rate):
             st.success(f"🏆 Industry Average Hit Rate: **{gsubind_hit_rate:.2f}%**")
+            interval_caption(intervals["gsubind"].loc[gsubind])
         else:
             st.warning("Not enough data for gsubind hit rate.")
         st.markdown(
@@ -570,57 +521,15 @@ A higher value here means the model tends to work well for this industry; a lowe
         )
 
         # ── Global model accuracy ─────────────────────────────────────
-        global_total = global_correct = 0
-        for peer_idx in range(len(ticker_data)):
-            peer_tkr = ticker_data[peer_idx]
-            peer_sub = gsubind_data[peer_idx]
-            if peer_tkr not in actual_price_data.index:
-                continue
-            peer_eps = eps_data.loc[peer_idx].mask(eps_data.loc[peer_idx] <= 0)
-            peer_actual = actual_price_data.loc[peer_tkr]
-            peer_median = pd.Series(
-                gsubind_to_median_pe.get(peer_sub, [None] * len(years)), index=years
-            )
-            peer_model = peer_eps * peer_median
-            for year in range(2010, 2024):
-                if pd.isna(peer_model.get(year)):
-                    continue
-                peer_pred = "Up" if peer_model[year] > peer_actual[year] else "Down"
-
-                if (
-                    year + 1 in peer_actual.index
-                    and pd.notna(peer_actual.get(year + 1))
-                ):
-                    nn1 = (
-                        "Up"
-                        if peer_actual[year + 1] > peer_actual[year]
-                        else "Down"
-                    )
-                    if peer_pred == nn1:
-                        global_correct += 1
-                    global_total += 1
-
-                if (
-                    year + 2 in peer_actual.index
-                    and pd.notna(peer_actual.get(year + 2))
-                ):
-                    nn2 = (
-                        "Up"
-                        if peer_actual[year + 2] > peer_actual[year]
-                        else "Down"
-                    )
-                    if peer_pred == nn2:
-                        global_correct += 1
-                    global_total += 1
-
-        global_hit_rate = (
-            global_correct / global_total * 100 if global_total else np.nan
-        )
+        global_total = global_stats["total"]
+        global_correct = global_stats["hits"]
+        global_hit_rate = backtest.hit_rate(global_correct, global_total)
         st.subheader(
             "🌍 Overall Model Accuracy (All Stocks considered in the Prototype Universe)"
         )
         if not np.isnan(global_hit_rate):
             st.success(f"🌟 Global Model Accuracy: **{global_hit_rate:.2f}%**")
+            interval_caption(intervals["global"])
         else:
             st.warning("Not enough data to calculate global model accuracy.")
         st.markdown(
@@ -636,69 +545,56 @@ price-direction model would have correctly predicted next-year (and two-year) mo
 # ═════════════════════════════════════════════════════════════════════════════
 # Tab 3 – Company Snapshot
 # ═════════════════════════════════════════════════════════════════════════════
-with tab3:
+def company_snapshot():
     st.title("🏢 Company Snapshot")
 
-    if ticker_input in ticker_data.values:
-        try:
-            ticker = yf.Ticker(ticker_input.upper())
-            info = ticker.info
-            company_name = info.get("longName", ticker_input.upper())
-            website = info.get("website", "")
-            domain = urllib.parse.urlparse(website).netloc
-            logo_url = info.get("logo_url") or (
-                f"https://logo.clearbit.com/{domain}" if domain else None
-            )
-        except YFRateLimitError:
-            st.error("⚠️ Unable to fetch company data due to rate limits. Please try again later.")
-            info = {}
-            logo_url = None
-            company_name = ticker_input.upper()
-            website = "Not fetched"
-        except Exception as e:
-            st.error(f"⚠️ An unexpected error occurred: {str(e)}")
-            info = {}
-            logo_url = None
-            company_name = ticker_input.upper()
-            website = "Not fetched"
-
-        # Display company logo and name
-        col1, col2 = st.columns([1, 10])
-        with col1:
-            if logo_url:
-                st.image(logo_url, width=50)
-        with col2:
-            st.subheader(f"{company_name} ({ticker_input.upper()})")
-
-        # Display website and earnings date
-        st.markdown(f"**Website:** {website or 'Not fetched'}")
-        st.markdown(f"📅 **Next Earnings Date:** {info.get('earningsDate', ['N/A'])[0]}")
+    if ticker_input in ticker_index:
+        # Header is filled in once the concurrent fetches below are back
+        header = st.container()
+
+        interval_map = {
+            "1 Day": "1d",
+            "5 Days": "5d",
+            "1 Month": "1mo",
+            "6 Months": "6mo",
+            "YTD": "ytd",
+            "1 Year": "1y",
+            "5 Years": "5y",
+            "Max": "max",
+        }
+        # The range selectbox lives in the chart fragment below; its last
+        # value decides which history is prefetched with the profile.
+        prefetch_label = st.session_state.get("snapshot_range", "1 Day")
+
+        # Profile (+ logo) and price history are fetched in parallel
+        with diagnostics.span("snapshot_fetch"):
+            snap = concurrent_fetch.fetch_snapshot(ticker_input, interval_map[prefetch_label])
+        info = snap["info"] or {}
+        company_name = info.get("longName", ticker_input.upper())
+        website = info.get("website", "")
+
+        with header:
+            if isinstance(snap["info_error"], YFRateLimitError):
+                st.error("⚠️ Unable to fetch company data due to rate limits. Please try again later.")
+                website = "Not fetched"
+            elif snap["info_error"] is not None:
+                st.error(f"⚠️ An unexpected error occurred: {str(snap['info_error'])}")
+                website = "Not fetched"
+
+            # Display company logo and name
+            col1, col2 = st.columns([1, 10])
+            with col1:
+                if snap["logo"]:
+                    st.image(snap["logo"], width=50)
+            with col2:
+                st.subheader(f"{company_name} ({ticker_input.upper()})")
+
+            # Display website and earnings date
+            st.markdown(f"**Website:** {website or 'Not fetched'}")
+            st.markdown(f"📅 **Next Earnings Date:** {info.get('earningsDate', ['N/A'])[0]}")
 
         # Handle stock price chart
-        try:
-            interval_map = {
-                "1 Day": "1d",
-                "5 Days": "5d",
-                "1 Month": "1mo",
-                "6 Months": "6mo",
-                "YTD": "ytd",
-                "1 Year": "1y",
-                "5 Years": "5y",
-                "Max": "max",
-            }
-            interval_label = st.selectbox(
-                "📈 Select Time Range", list(interval_map.keys()), index=0
-            )
-            selected_interval = interval_map[interval_label]
-
-            # Fetch historical price data
-            hist = (
-                ticker.history(period="1d", interval="5m")
-                if selected_interval == "1d"
-                else ticker.history(period=selected_interval)
-            )
-
-            # Plot stock price chart
+        def price_chart(hist, interval_label):
             fig_snap = go.Figure()
             fig_snap.add_trace(
                 go.Scatter(
@@ -713,14 +609,59 @@ with tab3:
                 height=350,
                 xaxis_title="Date",
                 yaxis_title="Price ($)",
+                uirevision=ticker_input,    # keep zoom/pan across live ticks
             )
             st.plotly_chart(fig_snap, use_container_width=True)
-        except YFRateLimitError:
-            st.error("⚠️ Too many requests to Yahoo Finance. Please try again later.")
 
-        except Exception as e:
-            st.error("⚠️ Could not load stock price data.")
-            st.exception(e)
+        @st.fragment(run_every=intraday.POLL_SECONDS)
+        def live_chart(interval_label):
+            # Only this fragment reruns per tick; the feed fetches new bars only.
+            # st.plotly_chart cannot extend a drawn figure, so each tick still
+            # sends the whole session (at most ~80 bars); uirevision keeps zoom.
+            try:
+                bars, _ = intraday.get_feed(ticker_input).poll()
+                price_chart(bars, interval_label)
+                if not bars.empty:
+                    st.caption(f"Live · last bar {bars.index[-1]:%H:%M} · {len(bars)} bars today")
+            except YFRateLimitError:
+                st.error("⚠️ Too many requests to Yahoo Finance. Please try again later.")
+            except Exception as e:
+                st.error("⚠️ Could not load stock price data.")
+                st.exception(e)
+
+        @st.fragment
+        def price_section():
+            # Changing the range (or Live) reruns this section only – the
+            # profile, metrics and overview around it are left alone.
+            interval_label = st.selectbox(
+                "📈 Select Time Range", list(interval_map.keys()), index=0, key="snapshot_range"
+            )
+            selected_interval = interval_map[interval_label]
+            live = selected_interval == "1d" and st.toggle(
+                "🔴 Live",
+                help=f"Append new 5-minute bars every {intraday.POLL_SECONDS:.0f}s while this view is open",
+            )
+
+            if live:
+                live_chart(interval_label)
+                return
+            try:
+                if interval_label == prefetch_label:
+                    if snap["history_error"] is not None:
+                        raise snap["history_error"]
+                    hist = snap["history"]
+                else:
+                    with diagnostics.span("history"):
+                        hist = concurrent_fetch.fetch_history(ticker_input, selected_interval)
+                price_chart(hist, interval_label)
+            except YFRateLimitError:
+                st.error("⚠️ Too many requests to Yahoo Finance. Please try again later.")
+
+            except Exception as e:
+                st.error("⚠️ Could not load stock price data.")
+                st.exception(e)
+
+        price_section()
 
         # Display key metrics
         try:
@@ -781,3 +722,194 @@ with tab3:
 
     else:
         st.error("❌ Ticker not found. Please check your selection.")
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# Tab 4 – Screener
+# ═════════════════════════════════════════════════════════════════════════════
+def screener_view():
+    st.title("🔎 Undervaluation Screener")
+    st.caption(
+        f"Implied prices use {latest_year} EPS × the sub-industry's peer P/E range, "
+        "exactly as in the Valuation Advisor. Current prices come from the bulk "
+        "quote cache, falling back to the workbook price."
+    )
+
+    @st.fragment
+    def screen_table():
+        # Filters, sorting and paging rerun this table only; just the visible
+        # page of rows is sent to the browser.
+        screen = load_screen(data_version)
+        c1, c2, c3, c4 = st.columns([3, 2, 2, 2])
+        industries = c1.multiselect("Industry", sorted(screen["Industry"].dropna().unique()))
+        in_industries = screen["Industry"].isin(industries) if industries else slice(None)
+        gsubinds = c2.multiselect(
+            "Sub-industry (gsubind)", sorted(screen.loc[in_industries, "gsubind"].dropna().unique()),
+        )
+        sort_by = c3.selectbox("Sort by", screener.SORTABLE)
+        order = c4.selectbox("Order", ["Descending", "Ascending"])
+        signal = st.radio("Show", ["All", "Undervalued", "Overvalued"], horizontal=True)
+
+        page_size = 50
+        filters = dict(
+            gsubinds=gsubinds,
+            industries=industries,
+            signal=None if signal == "All" else signal,
+            sort_by=sort_by,
+            ascending=order == "Ascending",
+            page_size=page_size,
+        )
+        _, n_matches = screener.query(screen, page=1, **filters)
+        n_pages = max(1, -(-n_matches // page_size))
+        page = st.number_input("Page", min_value=1, max_value=n_pages, value=1, step=1)
+        rows, _ = screener.query(screen, page=page, **filters)
+
+        money = st.column_config.NumberColumn(format="$%.2f")
+        st.dataframe(
+            rows.drop(columns=["gsubind"]),
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                "EPS": st.column_config.NumberColumn(format="%.2f"),
+                "Implied Low": money,
+                "Implied Avg": money,
+                "Implied High": money,
+                "Price": money,
+                "Gap %": st.column_config.NumberColumn(format="%.1f%%"),
+            },
+        )
+        st.caption(f"{n_matches} matching companies · page {page} of {n_pages}")
+
+        if st.button("🔄 Refresh prices", help="Bulk-fetch current quotes for the whole universe"):
+            with st.spinner("Fetching quotes…"):
+                bulk_quotes.prefetch_quotes(ticker_data.tolist())
+            load_screen.clear()
+            st.rerun(scope="fragment")
+
+    screen_table()
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# Tab 5 – Compare
+# ═════════════════════════════════════════════════════════════════════════════
+def compare_view():
+    st.title("⚖️ Compare Tickers")
+
+    # Default: the sidebar ticker and its first few peers
+    default = [ticker_input]
+    if ticker_input in ticker_index:
+        peers = ticker_data.loc[ticker_index.peers(gsubind_data[ticker_index.row(ticker_input)])]
+        default += [t for t in peers if t != ticker_input][:3]
+    text = st.text_input(
+        "Tickers to compare (comma or space separated)", value=" ".join(default),
+        key="compare_tickers", help=f"Up to {compare.MAX_TICKERS} tickers",
+    )
+    tickers, unknown = compare.parse_tickers(text, ticker_index)
+    if unknown:
+        st.warning(f"⚠️ Not in the universe: {', '.join(unknown)}")
+    if not tickers:
+        st.info("ℹ️ Enter at least one ticker from the universe.")
+        return
+
+    # One quote request, one screen pass and one engine run for all of them
+    with diagnostics.span("compare"):
+        result = compare.compare(
+            tickers, company_data, eps_data, price_data, gsubind_to_median_pe,
+            actual_price_data, ticker_index, pe_stats, backtest_stats,
+        )
+    summary = result["summary"]
+
+    def money(value):
+        return f"${value:,.2f}" if not pd.isna(value) else "N/A"
+
+    # ── Side-by-side cards ──────────────────────────────────────────
+    per_row = 4
+    for start in range(0, len(summary), per_row):
+        for col, row in zip(st.columns(per_row), summary.iloc[start:start + per_row].to_dict("records")):
+            with col:
+                st.markdown(f"**{row['Ticker']}** · {row['Company']}")
+                st.metric(
+                    "Current Price", money(row["Price"]),
+                    delta=f"{row['Gap %']:.1f}% to implied avg" if not pd.isna(row["Gap %"]) else None,
+                )
+                st.metric("Implied Avg", money(row["Implied Avg"]))
+                st.metric(
+                    "Hit Rate", f"{row['Hit Rate %']:.1f}%" if not pd.isna(row["Hit Rate %"]) else "N/A",
+                    delta=(
+                        f"{row['Hit Rate %'] - row['Industry Hit Rate %']:+.1f} pts vs industry"
+                        if not pd.isna(row["Hit Rate %"]) and not pd.isna(row["Industry Hit Rate %"]) else None
+                    ),
+                )
+                if row["Signal"] == "Undervalued":
+                    st.success("📈 Likely Undervalued")
+                elif row["Signal"] == "Overvalued":
+                    st.warning("📉 Likely Overvalued")
+                else:
+                    st.info("ℹ️ Not enough data")
+
+    # ── Charts & table ──────────────────────────────────────────────
+    st.subheader("📉 Implied Valuation Ranges")
+    st.plotly_chart(charts.compare_ranges(summary), use_container_width=True)
+
+    st.subheader("📈 Model vs Actual Price (t → t + 1)")
+    st.plotly_chart(
+        charts.compare_series(tickers, data_version, result["series"]), use_container_width=True
+    )
+
+    pct = st.column_config.NumberColumn(format="%.1f%%")
+    price_col = st.column_config.NumberColumn(format="$%.2f")
+    st.dataframe(
+        summary.drop(columns=["gsubind"]),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            "EPS": st.column_config.NumberColumn(format="%.2f"),
+            "Implied Low": price_col,
+            "Implied Avg": price_col,
+            "Implied High": price_col,
+            "Price": price_col,
+            "Gap %": pct,
+            "Hit Rate %": pct,
+            "Industry Hit Rate %": pct,
+            "Model Error %": pct,
+        },
+    )
+
+
+# ─── Render the selected tab ─────────────────────────────────────────────────
+render_tab = {
+    TABS[0]: valuation_advisor,
+    TABS[1]: backtest_view,
+    TABS[2]: company_snapshot,
+    TABS[3]: screener_view,
+    TABS[4]: compare_view,
+}[active_tab]
+with diagnostics.span(render_tab.__name__):
+    render_tab()
+
+
+# ─── Diagnostics panel ───────────────────────────────────────────────────────
+rerun_report = diagnostics.end_rerun(tab=render_tab.__name__, ticker=ticker_input)
+if st.sidebar.toggle("🩺 Diagnostics", key="show_diagnostics"):
+    with st.sidebar:
+        totals = diagnostics.metrics.snapshot()
+        n_calls = sum(c["count"] for c in rerun_report["calls"].values())
+        st.caption(f"This rerun: {rerun_report['ms']:.0f} ms · {n_calls} external calls")
+        st.dataframe(pd.DataFrame(rerun_report["spans"]), hide_index=True, use_container_width=True)
+
+        st.markdown("**External calls** (this process)")
+        if totals["calls"]:
+            calls = pd.DataFrame.from_dict(totals["calls"], orient="index")
+            calls["mean_ms"] = calls["seconds"] / calls["count"] * 1000
+            st.dataframe(
+                calls[["count", "errors", "rate_limited", "mean_ms", "p50_ms", "p95_ms"]].round(1),
+                use_container_width=True,
+            )
+        else:
+            st.caption("None yet.")
+
+        st.markdown("**Cache hit rates**")
+        st.dataframe(
+            pd.DataFrame.from_dict(diagnostics.cache_table(totals), orient="index").round(1),
+            use_container_width=True,
+        )
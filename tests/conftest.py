@@ -0,0 +1,23 @@
+"""Shared fixtures: the committed workbook, parsed into a temporary cache."""
+
+from pathlib import Path
+
+import pytest
+
+from workbench import ingest
+
+
+ROOT = Path(__file__).resolve().parent.parent
+WORKBOOK = ROOT / ingest.WORKBOOK_PATH
+
+
+@pytest.fixture(scope="session")
+def workbook_cache(tmp_path_factory):
+    cache_dir = tmp_path_factory.mktemp("cache")
+    ingest.build_cache(WORKBOOK, cache_dir, cache_dir / "deltas")     # no stored deltas
+    return cache_dir
+
+
+@pytest.fixture(scope="session")
+def tables(workbook_cache):
+    return ingest.read_cache(workbook_cache)
@@ -0,0 +1,124 @@
+"""The vectorized engine against the Backtest tab's original per-ticker loops."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.conftest import WORKBOOK
+from workbench import backtest
+
+
+GLOBAL_HITS, GLOBAL_TOTAL = 2324, 4234
+
+
+@pytest.fixture(scope="module")
+def sheet_median_pe():
+    """``{gsubind: row}`` read from the "Median PE" sheet the way the original tab read it."""
+    median_pe = pd.read_excel(WORKBOOK, sheet_name="Median PE", header=None)
+    median_pe_trim = median_pe.iloc[5:, :18].reset_index(drop=True)
+    median_pe_trim.columns = [None, None, "gsubind"] + list(range(2010, 2025))
+    return {row["gsubind"]: row.iloc[3:].to_numpy() for _, row in median_pe_trim.iterrows()}
+
+
+def original_loops(tables, gsubind_to_median_pe):
+    """Per company row ``(hits, totals, model errors)`` from the tab's original loops."""
+    eps_data, actual_price_data = tables["eps"], tables["actual_price"]
+    ticker_data, gsubind_data = tables["company"]["Ticker"], tables["company"]["gsubind"]
+    years = list(eps_data.columns)
+
+    hits, totals, errors = [], [], []
+    for peer_idx in range(len(ticker_data)):
+        peer_tkr, peer_sub = ticker_data[peer_idx], gsubind_data[peer_idx]
+        correct = total = 0
+        peer_errors = []
+        if peer_tkr in actual_price_data.index:
+            peer_eps = eps_data.loc[peer_idx].mask(eps_data.loc[peer_idx] <= 0)
+            peer_actual = actual_price_data.loc[peer_tkr]
+            peer_median = pd.Series(gsubind_to_median_pe.get(peer_sub, [None] * len(years)), index=years)
+            peer_model = peer_eps * peer_median
+            for year in range(2010, 2024):
+                if pd.isna(peer_model.get(year)):
+                    continue
+                peer_pred = "Up" if peer_model[year] > peer_actual[year] else "Down"
+                for h in (1, 2):
+                    if year + h in peer_actual.index and pd.notna(peer_actual.get(year + h)):
+                        move = "Up" if peer_actual[year + h] > peer_actual[year] else "Down"
+                        correct += peer_pred == move
+                        total += 1
+                if year + 1 in peer_actual.index and pd.notna(peer_actual.get(year + 1)):
+                    peer_errors.append(abs((peer_model[year] - peer_actual[year + 1]) / peer_actual[year + 1]) * 100)
+        hits.append(correct)
+        totals.append(total)
+        errors.append(peer_errors)
+    return np.array(hits), np.array(totals), errors
+
+
+def run_engine(tables, gsubind_to_median_pe):
+    company = tables["company"]
+    return backtest.backtest_universe(
+        tables["eps"], company["Ticker"], company["gsubind"], gsubind_to_median_pe, tables["actual_price"]
+    )
+
+
+def cached_median_pe(tables):
+    median_pe = tables["median_pe"]
+    return dict(zip(median_pe["gsubind"], median_pe.drop(columns="gsubind").to_numpy()))
+
+
+# In a one-company sub-industry the model price is the price itself.  Two such
+# cells, AMZN 2017 and PBR 2020, are ties and predict "Down"; the original
+# loops saw the sheet's medians put them a hair above the price ("Up").
+TIE_CELLS = {("AMZN", 2017), ("PBR", 2020)}
+TIE_HITS = {"AMZN": (7, 5), "PBR": (6, 8)}       # (original loops, engine)
+
+
+def tie_rows(tables):
+    tickers = tables["company"]["Ticker"].to_numpy()
+    return np.isin(tickers, list(TIE_HITS))
+
+
+def test_engine_matches_original_loops_except_ties(tables, sheet_median_pe):
+    hits, totals, _ = original_loops(tables, sheet_median_pe)
+    result = run_engine(tables, sheet_median_pe)
+
+    ties = tie_rows(tables)
+    np.testing.assert_array_equal(result.hits[~ties], hits[~ties])
+    np.testing.assert_array_equal(result.totals, totals)
+    tickers = tables["company"]["Ticker"].to_numpy()
+    for ticker, expected in TIE_HITS.items():
+        row = np.flatnonzero(tickers == ticker)[0]
+        assert (hits[row], result.hits[row]) == expected
+    assert (hits.sum(), totals.sum()) == (GLOBAL_HITS, GLOBAL_TOTAL)
+    assert (result.hits.sum(), result.totals.sum()) == (GLOBAL_HITS, GLOBAL_TOTAL)
+
+
+def test_sheet_and_derived_median_pe_give_the_same_calls(tables, sheet_median_pe):
+    result = run_engine(tables, cached_median_pe(tables))
+    baseline = run_engine(tables, sheet_median_pe)
+
+    np.testing.assert_array_equal(result.pred_up, baseline.pred_up)
+    np.testing.assert_array_equal(result.hits, baseline.hits)
+
+    tickers = tables["company"]["Ticker"].to_numpy()
+    rows, cols = np.nonzero(np.isclose(result.model_price, result.actual, rtol=backtest.TIE_RTOL, atol=0))
+    assert TIE_CELLS <= {(tickers[r], result.years[c]) for r, c in zip(rows, cols)}
+    assert not result.pred_up[rows, cols].any()
+
+
+def test_near_ties_predict_down():
+    actual = np.array([100.0, 100.0, 100.0, 100.0, np.nan])
+    model = np.array([100.0, 100.0 + 1e-7, 100.0 + 1e-5, 99.0, 101.0])
+    np.testing.assert_array_equal(backtest.predicts_up(model, actual), [False, False, True, False, False])
+
+
+def test_sub_industry_totals_and_bands_match_original_loops(tables, sheet_median_pe):
+    _, totals, errors = original_loops(tables, sheet_median_pe)
+    result = run_engine(tables, sheet_median_pe)
+
+    codes = tables["company"]["gsubind"].to_numpy()
+    for code in np.unique(codes):
+        rows = np.flatnonzero(codes == code)
+        assert result.totals[rows].sum() == totals[rows].sum()
+        band = [e for row in rows for e in errors[row]]
+        expected = np.median(band) if band else np.nan
+        np.testing.assert_allclose(backtest.median_error(result, rows), expected, rtol=1e-12)
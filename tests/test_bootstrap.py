@@ -0,0 +1,38 @@
+"""Bootstrap intervals are reproducible and independent of the worker count."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from workbench import backtest, bootstrap
+
+
+def _intervals(tables, block, workers):
+    company = tables["company"]
+    result = backtest.backtest_tables(tables)
+    return bootstrap.hit_rate_intervals(
+        result, company["Ticker"], company["gsubind"], block=block, n_resamples=300, workers=workers
+    )
+
+
+@pytest.mark.parametrize("block", bootstrap.BLOCKS)
+def test_same_intervals_for_any_worker_count(tables, block):
+    serial = _intervals(tables, block, workers=0)
+    pooled = _intervals(tables, block, workers=3)
+
+    pd.testing.assert_frame_equal(serial["tickers"], pooled["tickers"])
+    pd.testing.assert_frame_equal(serial["gsubind"], pooled["gsubind"])
+    assert serial["global"] == pooled["global"]
+
+
+@pytest.mark.parametrize("block", bootstrap.BLOCKS)
+def test_intervals_bracket_the_point_estimate(tables, block):
+    intervals = _intervals(tables, block, workers=0)
+    result = backtest.backtest_tables(tables)
+
+    glob = intervals["global"]
+    assert glob["hit_rate"] == pytest.approx(result.hits.sum() / result.totals.sum() * 100)
+    assert glob["ci_low"] <= glob["hit_rate"] <= glob["ci_high"]
+    tickers = intervals["tickers"].dropna()
+    assert (tickers["ci_low"] <= tickers["ci_high"]).all()
+    assert np.isnan(intervals["tickers"].loc[result.totals == 0, "ci_low"]).all()
@@ -0,0 +1,135 @@
+"""Token bucket and batched quote prefetch, against a fake clock and a fake fetch."""
+
+import pytest
+from yfinance.exceptions import YFRateLimitError
+
+from workbench import bulk_quotes, market_data
+
+
+class FakeClock:
+    """Stands in for the ``time`` module: ``sleep`` only advances the clock."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    time = monotonic
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class FakeFetch:
+    """Quotes every symbol; the first ``rate_limited`` calls raise a 429."""
+
+    def __init__(self, rate_limited=0):
+        self.batches = []
+        self.rate_limited = rate_limited
+
+    def __call__(self, symbols):
+        self.batches.append(list(symbols))
+        if self.rate_limited:
+            self.rate_limited -= 1
+            raise YFRateLimitError()
+        return {s: {"regularMarketPrice": float(len(s))} for s in symbols}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(bulk_quotes, "time", clock)
+    monkeypatch.setattr(bulk_quotes.random, "random", lambda: 1.0)     # no jitter
+    return clock
+
+
+@pytest.fixture
+def quotes(monkeypatch):
+    cache = market_data.QuoteCache(db_path="")
+    monkeypatch.setattr(market_data, "default_quotes", lambda: cache)
+    return cache
+
+
+# ─── TokenBucket ─────────────────────────────────────────────────────────────
+def test_bucket_bursts_to_capacity_then_waits_for_refill(clock):
+    bucket = bulk_quotes.TokenBucket(rate=2.0, capacity=3)
+    for _ in range(3):
+        bucket.acquire()
+    assert clock.sleeps == []
+
+    bucket.acquire()
+    assert clock.sleeps == [0.5]
+    assert not bucket.try_acquire()
+
+    clock.now += 10
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+
+
+def test_drain_empties_the_bucket(clock):
+    bucket = bulk_quotes.TokenBucket(rate=1.0, capacity=5)
+    bucket.drain()
+    assert not bucket.try_acquire()
+    clock.now += 1
+    assert bucket.try_acquire()
+
+
+# ─── prefetch_quotes ─────────────────────────────────────────────────────────
+def test_batches_and_skips_current_quotes(clock, quotes):
+    quotes.put_many({"AA": {"regularMarketPrice": 9.0}})
+    fetch = FakeFetch()
+
+    got = bulk_quotes.prefetch_quotes(
+        ["aa", "bbb", "cc", "BBB", "dddd", "e"], batch_size=2, bucket=bulk_quotes.TokenBucket(), fetch=fetch
+    )
+
+    assert fetch.batches == [["BBB", "CC"], ["DDDD", "E"]]
+    prices = {t: q["regularMarketPrice"] for t, q in got.items()}
+    assert prices == {"AA": 9.0, "BBB": 3.0, "CC": 2.0, "DDDD": 4.0, "E": 1.0}
+
+
+def test_rate_limit_backs_off_and_retries(clock, quotes):
+    fetch = FakeFetch(rate_limited=2)
+    bucket = bulk_quotes.TokenBucket(rate=1.0, capacity=5)
+
+    got = bulk_quotes.prefetch_quotes(["AA"], bucket=bucket, fetch=fetch)
+
+    assert len(fetch.batches) == 3
+    # backoff 2 s then 4 s; each retry then finds the drained bucket refilled
+    assert clock.sleeps == [bulk_quotes.BACKOFF_BASE, bulk_quotes.BACKOFF_BASE * 2]
+    assert got == {"AA": {"regularMarketPrice": 2.0}}
+
+
+def test_gives_up_after_max_retries(clock, quotes):
+    fetch = FakeFetch(rate_limited=10)
+    got = bulk_quotes.prefetch_quotes(["AA"], bucket=bulk_quotes.TokenBucket(), fetch=fetch, max_retries=2)
+    assert len(fetch.batches) == 3
+    assert got == {}
+
+
+# ─── prefetch_quotes_nowait ──────────────────────────────────────────────────
+def test_nowait_serves_stale_quotes_when_the_budget_is_spent(clock, quotes):
+    quotes.put_many({"AA": {"regularMarketPrice": 1.0}}, fetched_at=1.0)       # long expired
+    bucket = bulk_quotes.TokenBucket(rate=1.0, capacity=1)
+    bucket.drain()
+    fetch = FakeFetch()
+
+    got = bulk_quotes.prefetch_quotes_nowait(["AA", "BB"], bucket=bucket, fetch=fetch)
+
+    assert fetch.batches == []
+    assert clock.sleeps == []
+    assert got == {"AA": {"regularMarketPrice": 1.0}}
+
+
+def test_nowait_neither_retries_nor_sleeps_on_a_rate_limit(clock, quotes):
+    fetch = FakeFetch(rate_limited=1)
+    bucket = bulk_quotes.TokenBucket(rate=1.0, capacity=5)
+
+    got = bulk_quotes.prefetch_quotes_nowait(["AA", "BB", "CC"], batch_size=2, bucket=bucket, fetch=fetch)
+
+    # the 429 drains the bucket, so the second batch is not even tried
+    assert fetch.batches == [["AA", "BB"]]
+    assert clock.sleeps == []
+    assert got == {}
@@ -0,0 +1,76 @@
+"""Applying a delta in place gives the same cache and backtest store as a full rebuild."""
+
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from tests.conftest import WORKBOOK
+from workbench import backtest_store, deltas, ingest
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    cache_dir, delta_dir, store_dir = tmp_path / "cache", tmp_path / "deltas", tmp_path / "backtest"
+    version = ingest.ensure_cache(WORKBOOK, cache_dir, delta_dir)
+    backtest_store.build_store(version, cache_dir, store_dir)
+    return {"workbook": WORKBOOK, "cache_dir": cache_dir, "delta_dir": delta_dir, "store_dir": store_dir}
+
+
+def _assert_matches_rebuild(dirs, version, tmp_path):
+    rebuilt_cache, rebuilt_store = tmp_path / "rebuilt", tmp_path / "rebuilt_backtest"
+    assert ingest.build_cache(dirs["workbook"], rebuilt_cache, dirs["delta_dir"])["data_version"] == version
+    backtest_store.build_store(version, rebuilt_cache, rebuilt_store)
+
+    incremental, rebuilt = ingest.read_cache(dirs["cache_dir"]), ingest.read_cache(rebuilt_cache)
+    for name in ingest.TABLES:
+        pd.testing.assert_frame_equal(incremental[name], rebuilt[name], check_exact=False, rtol=1e-10)
+    for name in ("tickers", "gsubind"):
+        pd.testing.assert_frame_equal(
+            pd.read_parquet(dirs["store_dir"] / f"{name}.parquet"),
+            pd.read_parquet(rebuilt_store / f"{name}.parquet"),
+        )
+    with open(dirs["store_dir"] / "meta.json") as f, open(rebuilt_store / "meta.json") as g:
+        assert json.load(f)["global"] == json.load(g)["global"]
+
+
+def test_new_year_matches_rebuild(dirs, tmp_path):
+    tables = ingest.read_cache(dirs["cache_dir"])
+    latest = tables["eps"].columns[-1]
+    tickers = tables["company"]["Ticker"].iloc[:30].to_numpy()
+    eps = pd.Series(tables["eps"][latest].iloc[:30].to_numpy() * 1.1, index=tickers)
+    price = pd.Series(tables["price"][latest].iloc[:30].to_numpy() * 0.9, index=tickers)
+    actual = tables["actual_price"].reindex(tickers)[latest] * 1.05
+
+    version = deltas.append_year(latest + 1, eps, price, actual, **dirs)
+
+    merged = ingest.read_cache(dirs["cache_dir"])
+    assert list(merged["eps"].columns)[-1] == latest + 1
+    assert merged["eps"][latest + 1].notna().sum() == eps.notna().sum()
+    _assert_matches_rebuild(dirs, version, tmp_path)
+
+
+def test_new_and_moved_companies_match_rebuild(dirs, tmp_path):
+    company = ingest.read_cache(dirs["cache_dir"])["company"]
+    years = list(ingest.read_cache(dirs["cache_dir"])["eps"].columns)
+    moved = company.iloc[[0]].copy()
+    moved["gsubind"] = company["gsubind"].iloc[-1]
+    added = company.iloc[[1]].copy()
+    added["Ticker"], added["conm"] = "ZZNEW", "NEW CO"
+    history = pd.DataFrame([np.linspace(1, 3, len(years))], index=["ZZNEW"], columns=years)
+
+    version = deltas.append_companies(
+        pd.concat([moved, added]), eps=history, price=history * 20, actual_price=history * 21, **dirs
+    )
+
+    merged = ingest.read_cache(dirs["cache_dir"])["company"]
+    assert merged["Ticker"].iloc[-1] == "ZZNEW"
+    assert merged["gsubind"].iloc[0] == company["gsubind"].iloc[-1]
+    _assert_matches_rebuild(dirs, version, tmp_path)
+
+
+def test_unknown_ticker_is_rejected(tables):
+    values = pd.DataFrame({"Ticker": ["NOPE"], "table": ["eps"], "year": [2030], "value": [1.0]})
+    with pytest.raises(ValueError, match="Unknown ticker"):
+        ingest.merge_delta(tables, values=values)
@@ -0,0 +1,34 @@
+"""The intraday feed backs off only once polls keep coming back empty."""
+
+import pandas as pd
+
+from workbench import intraday
+
+
+def bars(*minutes):
+    index = pd.DatetimeIndex([pd.Timestamp("2026-10-16 09:30") + pd.Timedelta(minutes=m) for m in minutes])
+    return pd.DataFrame({"Close": range(len(minutes))}, index=index, dtype=float)
+
+
+def test_backs_off_after_idle_polls_and_resets_on_a_new_bar():
+    replies = [bars(0, 5)] + [bars(5)] * 5 + [bars(5, 10)]
+    feed = intraday.IntradayFeed("abc", fetch=lambda ticker, start: replies.pop(0),
+                                 poll_seconds=60, max_poll_seconds=300, idle_polls=3)
+
+    intervals = []
+    for _ in range(7):
+        _, added = feed.poll(force=True)
+        intervals.append(feed._interval)
+    assert intervals == [60, 60, 60, 120, 240, 300, 60]
+    assert added == 1 and list(feed.bars.index.minute) == [30, 35, 40]
+
+
+def test_feeds_are_evicted_least_recently_used_first(monkeypatch):
+    monkeypatch.setattr(intraday, "MAX_FEEDS", 2)
+    monkeypatch.setattr(intraday, "_feeds", intraday.OrderedDict())
+
+    first = intraday.get_feed("aaa")
+    intraday.get_feed("bbb")
+    assert intraday.get_feed("AAA") is first
+    intraday.get_feed("ccc")
+    assert list(intraday._feeds) == ["AAA", "CCC"]
@@ -0,0 +1,57 @@
+"""Derived sub-industry P/E: matches the workbook and stays exact under incremental updates."""
+
+import numpy as np
+import pandas as pd
+
+from tests.conftest import WORKBOOK
+from workbench.median_pe import MedianPETable, derive_median_pe, recompute_cells
+
+
+def _assert_same_table(actual, expected):
+    pd.testing.assert_frame_equal(actual, expected, check_exact=False, rtol=1e-10, atol=1e-10)
+
+
+def test_matches_median_pe_sheet(tables):
+    years = list(tables["eps"].columns)
+    sheet = pd.read_excel(WORKBOOK, sheet_name="Median PE", header=None).iloc[5:, :18]
+    sheet.columns = [None, None, "gsubind"] + years
+    sheet = sheet.dropna(subset=["gsubind"]).astype({"gsubind": "int64"}).set_index("gsubind")[years]
+
+    derived = tables["median_pe"].set_index("gsubind").reindex(sheet.index)
+    np.testing.assert_allclose(derived.to_numpy(dtype=float), sheet.to_numpy(dtype=float), rtol=0, atol=3e-8)
+
+
+def test_incremental_updates_match_full_recompute(tables):
+    eps, price, gsubinds = tables["eps"], tables["price"], tables["company"]["gsubind"]
+    years = list(eps.columns)
+    table = MedianPETable.from_frames(eps, price, gsubinds)
+    rng = np.random.default_rng(7)
+
+    eps_rows, price_rows, codes = eps.to_numpy().copy(), price.to_numpy().copy(), list(gsubinds)
+    for row in rng.choice(len(codes), 40, replace=False):
+        year = years[rng.integers(len(years))]
+        new_eps = float(rng.normal(2, 3))
+        table.update_cell(row, year, eps=new_eps)
+        eps_rows[row, years.index(year)] = new_eps
+    for row in rng.choice(len(codes), 10, replace=False):
+        codes[row] = codes[(row + 1) % len(codes)]
+        table.update_company(row, gsubind=codes[row])
+    new_eps, new_price = rng.lognormal(0.5, 0.5, len(years)), rng.lognormal(3, 0.5, len(years))
+    table.add_company(new_eps, new_price, 99999999)
+    eps_rows, price_rows = np.vstack([eps_rows, new_eps]), np.vstack([price_rows, new_price])
+    codes.append(99999999)
+
+    expected = derive_median_pe(
+        pd.DataFrame(eps_rows, columns=years), pd.DataFrame(price_rows, columns=years), pd.Series(codes)
+    )
+    _assert_same_table(table.to_frame(), expected)
+
+
+def test_recompute_cells_matches_full_recompute(tables):
+    eps, price, gsubinds = tables["eps"].copy(), tables["price"], tables["company"]["gsubind"]
+    stored = derive_median_pe(eps, price, gsubinds)
+    rows, year = [3, 50, 51], eps.columns[4]
+    eps.loc[rows, year] = [0.5, -1.0, 12.0]
+
+    cells = {(gsubinds[row], year) for row in rows}
+    _assert_same_table(recompute_cells(stored, eps, price, gsubinds, cells), derive_median_pe(eps, price, gsubinds))
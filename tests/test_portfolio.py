@@ -0,0 +1,80 @@
+"""Portfolio backtest on a four-name universe small enough to check by hand."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from workbench import portfolio
+from workbench.portfolio import Rule
+
+
+YEARS = [2020, 2021, 2022]
+
+
+@pytest.fixture
+def tables():
+    """Median P/E 10 everywhere, so the model price is 10 × EPS.
+
+    A  model 20, price 10 → 11 → 12.1      long both years, +10% a year
+    B  model 10, price 20 → 18 → 9         short both years, −10% then −50%
+    C  model 30, price 10 → 40 → 44        4× in 2021 is split-like; short in 2021, +10%
+    D  model 20, price 10 → 10 → 10        long both years, flat
+    """
+    tickers = ["A", "B", "C", "D"]
+    company = pd.DataFrame({"Ticker": tickers, "gsubind": 1, portfolio.MKT_CAP_COLUMN: [12.1, 9.0, 44.0, 30.0]})
+    eps = pd.DataFrame([[2.0] * 3, [1.0] * 3, [3.0] * 3, [2.0] * 3], columns=YEARS)
+    actual = pd.DataFrame(
+        [[10, 11, 12.1], [20, 18, 9], [10, 40, 44], [10, 10, 10]], index=tickers, columns=YEARS, dtype=float
+    )
+    median_pe = pd.DataFrame([[1, 10.0, 10.0, 10.0]], columns=["gsubind", *YEARS])
+    return {"company": company, "eps": eps, "actual_price": actual, "median_pe": median_pe}
+
+
+def run(tables, rule, **kwargs):
+    returns, _ = portfolio.simulate(tables, rules=[rule], **kwargs)
+    return returns
+
+
+def test_split_like_jump_sits_the_year_out(tables):
+    returns = run(tables, Rule())
+    assert returns["Year"].tolist() == [2021, 2022]
+    assert returns["n_split_like"].tolist() == [1, 0]
+    np.testing.assert_allclose(returns["return"], [0.05, 0.05])            # A and D; C left out
+
+    kept = run(tables, Rule(), split_jump=None)
+    assert kept["n_split_like"].tolist() == [0, 0]
+    np.testing.assert_allclose(kept["return"], [(0.1 + 3.0 + 0.0) / 3, 0.05])
+
+
+def test_cap_weights_scale_todays_cap_back_along_the_price(tables):
+    market = portfolio.market_arrays(tables)
+    # A: 12.1 / 1.21 and 12.1 / 1.1;  C: its 4× year counts as flat, so 44 / 1.1 both years
+    np.testing.assert_allclose(market.cap[[0, 2, 3]], [[10, 11], [40, 40], [30, 30]])
+
+    returns = run(tables, Rule(weighting="cap"))
+    np.testing.assert_allclose(returns["return"], [10 / 40 * 0.1, 11 / 41 * 0.1])
+
+
+def test_long_short_subtracts_the_short_leg(tables):
+    returns = run(tables, Rule(short=True))
+    np.testing.assert_allclose(returns["long_return"], [0.05, 0.05])
+    np.testing.assert_allclose(returns["short_return"], [-0.1, (-0.5 + 0.1) / 2])
+    np.testing.assert_allclose(returns["return"], [0.15, 0.25])
+    np.testing.assert_allclose(returns["cumulative"], [1.15, 1.15 * 1.25])
+    assert returns["n_short"].tolist() == [1, 2]
+
+
+def test_turnover_is_measured_against_the_drifted_book(tables):
+    # long: 50/50 drifts to 11/21 A, rebalanced back to 1/2 → 1/42
+    np.testing.assert_allclose(run(tables, Rule())["turnover"], [np.nan, 1 / 42])
+    # short: B alone, then half B half C adds 1/2
+    np.testing.assert_allclose(run(tables, Rule(short=True))["turnover"], [np.nan, 1 / 42 + 1 / 2])
+
+
+def test_drawdown_from_the_running_peak():
+    cumulative, drawdown = portfolio._drawdown(np.array([0.1, -0.5, 0.2]))
+    np.testing.assert_allclose(cumulative, [1.1, 0.55, 0.66])
+    np.testing.assert_allclose(drawdown, [0.0, -0.5, -0.4])
+
+    _, drawdown = portfolio._drawdown(np.array([-0.2, 0.1]))
+    np.testing.assert_allclose(drawdown, [-0.2, -0.12])                    # against the starting 1.0
@@ -0,0 +1,85 @@
+"""Local daily-bar store: delta fetches, full re-download on adjustments, empty TTL."""
+
+import pandas as pd
+import pytest
+
+from workbench import price_history
+
+
+def daily(start, closes, **adjustments):
+    index = pd.date_range(start, periods=len(closes), freq="B", tz="America/New_York")
+    bars = pd.DataFrame({c: closes for c in price_history.COLUMNS}, index=index, dtype=float)
+    bars["Dividends"] = adjustments.get("dividends", 0.0)
+    bars["Stock Splits"] = adjustments.get("splits", 0.0)
+    return bars
+
+
+class FakeDownload:
+    """Serves queued replies and records each call's ``start``."""
+
+    def __init__(self, *replies):
+        self.replies = list(replies)
+        self.starts = []
+
+    def __call__(self, ticker, start=None):
+        self.starts.append(start)
+        return self.replies.pop(0)
+
+
+def make_store(tmp_path, fetch, **kwargs):
+    return price_history.HistoryStore(db_path=tmp_path / "bars.sqlite", fetch=fetch, **kwargs)
+
+
+def test_later_syncs_fetch_only_the_delta(tmp_path):
+    fetch = FakeDownload(daily("2026-10-05", [10, 11, 12]), daily("2026-10-07", [12.5, 13, 14]))
+    store = make_store(tmp_path, fetch, refresh_after=0)
+
+    store.sync("abc")
+    bars = store.sync("abc")
+
+    assert fetch.starts == [None, "2026-10-07"]
+    assert bars["Close"].tolist() == [10, 11, 12.5, 13, 14]       # the partial last bar is replaced
+    assert bars.index[0] == pd.Timestamp("2026-10-05")
+
+
+def test_no_fetch_within_the_refresh_window(tmp_path):
+    fetch = FakeDownload(daily("2026-10-05", [10, 11]))
+    store = make_store(tmp_path, fetch, refresh_after=3600)
+
+    store.sync("abc")
+    assert store.history("abc", "5d")["Close"].tolist() == [10, 11]
+    assert fetch.starts == [None]
+
+
+@pytest.mark.parametrize("adjustment", [{"dividends": [0, 0.5]}, {"splits": [0, 2.0]}])
+def test_split_or_dividend_triggers_a_full_download(tmp_path, adjustment):
+    readjusted = daily("2026-10-05", [5, 5.5, 6, 6.5])
+    fetch = FakeDownload(daily("2026-10-05", [10, 11, 12]), daily("2026-10-07", [12, 13], **adjustment), readjusted)
+    store = make_store(tmp_path, fetch, refresh_after=0)
+
+    store.sync("abc")
+    bars = store.sync("abc")
+
+    assert fetch.starts == [None, "2026-10-07", None]
+    assert bars["Close"].tolist() == [5, 5.5, 6, 6.5]
+
+
+def test_empty_download_is_not_retried_within_its_ttl(tmp_path):
+    fetch = FakeDownload(daily("2026-10-05", []), daily("2026-10-05", [10]))
+    store = make_store(tmp_path, fetch, empty_ttl=3600)
+
+    assert store.sync("gone").empty
+    assert store.sync("gone").empty
+    assert fetch.starts == [None]
+
+    assert store.sync("gone", force=True)["Close"].tolist() == [10]
+    assert fetch.starts == [None, None]
+
+
+def test_empty_download_is_retried_once_its_ttl_has_passed(tmp_path):
+    fetch = FakeDownload(daily("2026-10-05", []), daily("2026-10-05", [10]))
+    store = make_store(tmp_path, fetch, empty_ttl=0)
+
+    assert store.sync("gone").empty
+    assert store.sync("gone")["Close"].tolist() == [10]
+    assert fetch.starts == [None, None]
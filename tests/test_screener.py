@@ -0,0 +1,65 @@
+"""Screener: one-lookup current prices and the filter / sort / page query."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from workbench import market_data, screener
+
+
+@pytest.fixture
+def screen():
+    return pd.DataFrame(
+        {
+            "Ticker": ["AAA", "BBB", "CCC", "DDD", "EEE"],
+            "Company": ["A Co", "B Co", "C Co", "D Co", "E Co"],
+            "gsubind": [10, 10, 20, 20, 30],
+            "Industry": ["Tech", "Tech", "Retail", "Retail", "Energy"],
+            "EPS": [1.0, 2.0, 3.0, -1.0, 5.0],
+            "Price": [10.0, 20.0, 30.0, 40.0, 50.0],
+            "Implied Avg": [12.0, 15.0, 45.0, np.nan, 50.0],
+            "Gap %": [16.7, -33.3, 33.3, np.nan, 0.0],
+            "Signal": ["Undervalued", "Overvalued", "Undervalued", "", "Overvalued"],
+        }
+    )
+
+
+def tickers(rows):
+    return rows["Ticker"].tolist()
+
+
+def test_filters_combine(screen):
+    rows, n = screener.query(screen, industries=["Tech", "Retail"], signal="Undervalued")
+    assert (tickers(rows), n) == (["CCC", "AAA"], 2)
+
+    rows, n = screener.query(screen, gsubinds=[20, 30])
+    assert (tickers(rows), n) == (["CCC", "EEE", "DDD"], 3)
+
+
+def test_rows_without_a_gap_sort_last_either_way(screen):
+    assert tickers(screener.query(screen)[0]) == ["CCC", "AAA", "EEE", "BBB", "DDD"]
+    assert tickers(screener.query(screen, ascending=True)[0]) == ["BBB", "EEE", "AAA", "CCC", "DDD"]
+    assert tickers(screener.query(screen, sort_by="Ticker", ascending=True)[0])[0] == "AAA"
+
+
+def test_pages_slice_the_sorted_matches(screen):
+    pages = [screener.query(screen, sort_by="Price", page=p, page_size=2) for p in (1, 2, 3, 4)]
+    assert [tickers(rows) for rows, _ in pages] == [["EEE", "DDD"], ["CCC", "BBB"], ["AAA"], []]
+    assert {n for _, n in pages} == {5}
+
+
+def test_unknown_sort_column_is_rejected(screen):
+    with pytest.raises(ValueError, match="Cannot sort"):
+        screener.query(screen, sort_by="Signal")
+
+
+def test_current_prices_fall_back_past_the_max_age(monkeypatch):
+    quotes = market_data.QuoteCache(db_path="")
+    quotes.put_many({"AAA": {"regularMarketPrice": 11.0}})
+    quotes.put_many({"BBB": {"regularMarketPrice": 22.0}}, fetched_at=1.0)       # long expired
+    monkeypatch.setattr(market_data, "default_quotes", lambda: quotes)
+
+    prices, source = screener.current_prices(["AAA", "BBB", "CCC", "DDD"], [1.0, 2.0, 3.0, np.nan])
+
+    np.testing.assert_array_equal(prices, [11.0, 2.0, 3.0, np.nan])
+    assert source.tolist() == ["quote", "workbook", "workbook", ""]
@@ -0,0 +1,31 @@
+"""The parameter sweep: its default grid point reproduces the Backtest tab; bad aggregators are rejected."""
+
+import pytest
+
+from workbench import backtest, sweep
+
+
+def test_default_grid_point_matches_backtest(tables):
+    result = backtest.backtest_tables(tables)
+
+    row = sweep.sweep(tables).iloc[0]
+    assert (row["hits"], row["total"]) == (result.hits.sum(), result.totals.sum())
+
+
+def test_worker_pool_matches_serial(tables):
+    grid = dict(horizons=((1,), (1, 2)), aggregators=("mean", "median"), min_gaps=(0.0, 0.2))
+    serial = sweep.sweep(tables, **grid)
+    pooled = sweep.sweep(tables, workers=2, **grid)
+    assert serial.equals(pooled)
+
+
+@pytest.mark.parametrize("spec", ["trimmed_mean:0.5", "trimmed_mean:-0.1", "percentile:101", "percentile:-1",
+                                  "percentile:nan", "trimmed_mean", "mode"])
+def test_bad_aggregators_are_rejected(spec):
+    with pytest.raises(ValueError):
+        sweep.parse_aggregator(spec)
+
+
+def test_aggregator_bounds_are_inclusive_where_valid():
+    assert sweep.parse_aggregator("trimmed_mean:0") == ("trimmed_mean", 0.0)
+    assert sweep.parse_aggregator("percentile:100") == ("percentile", 100.0)
@@ -0,0 +1,55 @@
+"""Ticker search: each ranking tier, and symbols with punctuation."""
+
+import pytest
+
+from workbench.ticker_search import SearchIndex
+
+
+TICKERS = ["BRK.B", "BRK.A", "AAPL", "AA", "MSFT", "XYZ-W"]
+NAMES = ["Berkshire Hathaway B", "Berkshire Hathaway A", "Apple Inc.", "Alcoa Corp", "Microsoft Corp",
+         "Big Apple Holdings"]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return SearchIndex(TICKERS, NAMES)
+
+
+def found(index, query, k=10):
+    return [TICKERS[r] for r in index.search(query, k)]
+
+
+@pytest.mark.parametrize("query", ["brk.b", "BRK-B", "brkb", "BRK B"])
+def test_symbol_punctuation_is_ignored(index, query):
+    assert found(index, query) == ["BRK.B"]
+
+
+def test_symbol_prefix_tier_is_alphabetical(index):
+    assert found(index, "brk") == ["BRK.A", "BRK.B"]
+
+
+def test_name_prefix_tier(index):
+    assert found(index, "micro") == ["MSFT"]
+
+
+def test_name_word_tier(index):
+    assert found(index, "corp") == ["AA", "MSFT"]
+
+
+def test_tiers_rank_in_order_without_repeats(index):
+    # symbols AA, AAPL; names Alcoa, Apple (already in); words A, Alcoa, Apple, Apple
+    assert found(index, "a") == ["AA", "AAPL", "BRK.A", "XYZ-W"]
+    assert found(index, "a", k=2) == ["AA", "AAPL"]
+
+
+def test_substring_tier(index):
+    assert found(index, "soft") == ["MSFT"]
+    assert found(index, "thaw") == ["BRK.B", "BRK.A"]           # workbook order
+    assert found(index, "yz-w") == ["XYZ-W"]                    # inside a symbol, punctuation dropped
+
+
+def test_short_or_empty_queries(index):
+    assert found(index, "oft") == ["MSFT"]
+    assert found(index, "of") == []
+    assert found(index, " .. ") == []
+    assert found(index, "a", k=0) == []
@@ -0,0 +1,89 @@
+"""Memory-mapped universe: write / map round trip, version checks and pruning."""
+
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from workbench import universe
+
+
+@pytest.fixture
+def mapped(workbook_cache, tmp_path):
+    return universe.ensure_universe("v1", workbook_cache, tmp_path)
+
+
+def test_round_trip_matches_the_in_memory_universe(workbook_cache, mapped):
+    built = universe.load_universe(workbook_cache)
+
+    assert mapped.years == built.years
+    for name in ("eps", "price", "actual_price"):
+        pd.testing.assert_frame_equal(getattr(mapped, name), getattr(built, name), check_index_type=False)
+    assert mapped.median_pe.keys() == built.median_pe.keys()
+    for code, row in built.median_pe.items():
+        np.testing.assert_array_equal(mapped.median_pe[code], row)
+    pd.testing.assert_frame_equal(mapped.company, built.company, check_dtype=False)
+
+
+def test_categorical_columns_keep_their_codes(workbook_cache, mapped):
+    built = universe.load_universe(workbook_cache)
+    for col in universe.CATEGORICAL_COLUMNS:
+        assert isinstance(mapped.company[col].dtype, pd.CategoricalDtype)
+        np.testing.assert_array_equal(mapped.company[col].cat.codes, built.company[col].cat.codes)
+        assert mapped.company[col].cat.categories.tolist() == built.company[col].cat.categories.tolist()
+
+
+def test_mapped_arrays_are_read_only(mapped):
+    values = mapped.eps.to_numpy()
+    assert not values.flags.writeable
+    assert not next(iter(mapped.median_pe.values())).flags.writeable
+    with pytest.raises(ValueError):
+        values[0, 0] = 1.0
+
+
+def test_version_and_schema_mismatches_are_rejected(mapped, tmp_path):
+    with pytest.raises(ValueError, match="data version"):
+        universe.open_universe(tmp_path / "v1", "v2")
+
+    header_path = tmp_path / "v1" / "header.json"
+    header = json.loads(header_path.read_text())
+    header["schema"] = universe.MMAP_SCHEMA - 1
+    header_path.write_text(json.dumps(header))
+    with pytest.raises(ValueError, match="schema"):
+        universe.open_universe(tmp_path / "v1")
+
+
+def test_ensure_universe_rewrites_an_unusable_version(workbook_cache, mapped, tmp_path):
+    header_path = tmp_path / "v1" / "header.json"
+    header = json.loads(header_path.read_text())
+    header["arrays"]["eps"]["shape"][0] += 1
+    header_path.write_text(json.dumps(header))
+
+    again = universe.ensure_universe("v1", workbook_cache, tmp_path)
+    pd.testing.assert_frame_equal(again.eps, mapped.eps)
+
+
+def test_prune_keeps_current_and_newest_superseded_versions(tmp_path):
+    now = time.time()
+    for age, name in [(400, "v0"), (300, "v1"), (200, "v2"), (500, "v3"), (7200, ".v4.1.tmp"), (10, ".v5.2.tmp")]:
+        (tmp_path / name).mkdir()
+        os.utime(tmp_path / name, (now - age, now - age))
+
+    universe.prune_universes(tmp_path, "v3", keep=2, stale_after=3600)
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".v5.2.tmp", "v1", "v2", "v3"]
+
+
+def test_missing_labels_stay_missing(tables, tmp_path):
+    company = tables["company"].copy()
+    company.loc[0, ["Industry", "conm"]] = pd.NA
+    built = universe.build_universe({**tables, "company": company})
+
+    universe.write_universe(built, tmp_path / "v1", "v1")
+    mapped = universe.open_universe(tmp_path / "v1", "v1")
+
+    assert mapped.company.loc[0, ["Industry", "conm"]].isna().all()
+    pd.testing.assert_frame_equal(mapped.company, built.company, check_dtype=False)
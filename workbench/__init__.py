@@ -0,0 +1,3 @@
+"""
+workbench  –  Data & model helpers behind the Equity Insight Workbench pages.
+"""
@@ -0,0 +1,178 @@
+"""
+backtest.py  –  Vectorized EPS × median-PE backtest engine
+
+Works on aligned ``(n_tickers × n_years)`` matrices instead of per-ticker
+pandas lookups.  The rules mirror the original Backtest tab loops exactly:
+
+* model price   = EPS (non-positive EPS masked out) × sub-industry median P/E
+* prediction    = "Up" if model price > actual price in year t, else "Down"
+* realised move = "Up" if actual(t + h) > actual(t), else "Down"
+* a (t, h) pair counts when the model price at t and actual(t + h) exist
+
+Comparisons against a missing actual price evaluate to "Down", exactly as the
+scalar ``>`` did in the loops.  A model price within ``TIE_RTOL`` of the
+actual price is a tie, hence "Down": in a one-company sub-industry the model
+price *is* the price, and the derived median P/E differs from the workbook's
+own P/E block in the ninth digit, which would otherwise decide the call.
+"""
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from workbench.ingest import median_pe_lookup
+
+
+HORIZONS = (1, 2)
+TIE_RTOL = 1e-8             # model ≈ actual within this is a tie ("Down")
+
+
+# ─── Input alignment ─────────────────────────────────────────────────────────
+def median_pe_matrix(gsubind_data, gsubind_to_median_pe, n_years):
+    """One median-P/E row per ticker, looked up by its gsubind (NaN if unknown)."""
+    codes, inverse = np.unique(np.asarray(gsubind_data), return_inverse=True)
+    table = np.full((len(codes), n_years), np.nan)
+    for i, code in enumerate(codes):
+        row = gsubind_to_median_pe.get(code)
+        if row is not None and len(row) == n_years:
+            table[i] = np.asarray(row, dtype=float)
+    return table[inverse]
+
+
+def align_inputs(eps_data, ticker_data, gsubind_data, gsubind_to_median_pe, actual_price_data):
+    """Return ``(eps, median_pe, actual)`` float matrices in company-row order.
+
+    Tickers missing from the Analysis sheet get an all-NaN actual-price row,
+    which makes them contribute nothing – the same as the ``continue`` in the
+    old loops.
+    """
+    years = list(eps_data.columns)
+    eps = eps_data.to_numpy(dtype=float)
+    median_pe = median_pe_matrix(gsubind_data, gsubind_to_median_pe, len(years))
+    actual = (
+        actual_price_data.reindex(index=np.asarray(ticker_data), columns=years)
+        .to_numpy(dtype=float)
+    )
+    return eps, median_pe, actual
+
+
+def predicts_up(model_price, actual):
+    """``model > actual``, with near-ties (``TIE_RTOL``) and missing prices "Down"."""
+    with np.errstate(invalid="ignore"):
+        return (model_price > actual) & ~np.isclose(model_price, actual, rtol=TIE_RTOL, atol=0)
+
+
+# ─── Engine ──────────────────────────────────────────────────────────────────
+@dataclass
+class BacktestResult:
+    years: list
+    horizons: tuple
+    eps: np.ndarray                                 # (n, Y) non-positive → NaN
+    median_pe: np.ndarray                           # (n, Y)
+    actual: np.ndarray                              # (n, Y)
+    model_price: np.ndarray                         # (n, Y)
+    pred_up: np.ndarray                             # (n, Y) bool
+    realised_up: dict = field(default_factory=dict)  # h → (n, Y) bool
+    counted: dict = field(default_factory=dict)      # h → (n, Y) bool
+    hit: dict = field(default_factory=dict)          # h → (n, Y) bool
+    model_error: np.ndarray = None                  # (n, Y) abs % error vs t + 1
+
+    @property
+    def hits(self):
+        """Correct predictions per ticker, pooled over horizons."""
+        return sum(self.hit[h].sum(axis=1) for h in self.horizons)
+
+    @property
+    def totals(self):
+        """Valid predictions per ticker, pooled over horizons."""
+        return sum(self.counted[h].sum(axis=1) for h in self.horizons)
+
+
+def run_backtest(eps, median_pe, actual, years, horizons=HORIZONS):
+    """Evaluate the model for every ticker and year in a few array operations."""
+    eps = np.where(eps > 0, eps, np.nan)
+    model_price = eps * median_pe
+    has_model = ~np.isnan(model_price)
+    pred_up = predicts_up(model_price, actual)
+
+    n, n_years = actual.shape
+    realised_up, counted, hit = {}, {}, {}
+    for h in horizons:
+        up = np.zeros((n, n_years), dtype=bool)
+        ok = np.zeros((n, n_years), dtype=bool)
+        if h < n_years:
+            up[:, :-h] = actual[:, h:] > actual[:, :-h]
+            ok[:, :-h] = has_model[:, :-h] & ~np.isnan(actual[:, h:])
+        realised_up[h] = up
+        counted[h] = ok
+        hit[h] = ok & (pred_up == up)
+
+    # |model(t) − actual(t+1)| / actual(t+1), used for the sub-industry band
+    model_error = np.full((n, n_years), np.nan)
+    ok1 = has_model[:, :-1] & ~np.isnan(actual[:, 1:])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        err = np.abs((model_price[:, :-1] - actual[:, 1:]) / actual[:, 1:]) * 100
+    model_error[:, :-1] = np.where(ok1, err, np.nan)
+
+    return BacktestResult(
+        years=list(years),
+        horizons=tuple(horizons),
+        eps=eps,
+        median_pe=median_pe,
+        actual=actual,
+        model_price=model_price,
+        pred_up=pred_up,
+        realised_up=realised_up,
+        counted=counted,
+        hit=hit,
+        model_error=model_error,
+    )
+
+
+def backtest_universe(eps_data, ticker_data, gsubind_data, gsubind_to_median_pe,
+                      actual_price_data, horizons=HORIZONS):
+    eps, median_pe, actual = align_inputs(
+        eps_data, ticker_data, gsubind_data, gsubind_to_median_pe, actual_price_data
+    )
+    return run_backtest(eps, median_pe, actual, eps_data.columns, horizons)
+
+
+def backtest_tables(tables, horizons=HORIZONS):
+    """Run the engine straight from the ``ingest`` tables."""
+    company = tables["company"]
+    return backtest_universe(
+        tables["eps"],
+        company["Ticker"],
+        company["gsubind"],
+        median_pe_lookup(tables["median_pe"]),
+        tables["actual_price"],
+        horizons,
+    )
+
+
+# ─── Summaries ───────────────────────────────────────────────────────────────
+def hit_rate(correct, total):
+    return correct / total * 100 if total else np.nan
+
+
+def median_error(result, rows):
+    """Median absolute model error (%) over ``rows``; NaN if there is none."""
+    errors = result.model_error[np.asarray(rows)]
+    errors = errors[~np.isnan(errors)]
+    return float(np.median(errors)) if errors.size else np.nan
+
+
+def ticker_frame(result, row):
+    """Year-by-year table for one ticker, as shown in the Backtest tab."""
+    frame = pd.DataFrame(
+        {
+            "Year": result.years,
+            "EPS": result.eps[row],
+            "Median PE": result.median_pe[row],
+            "Model Price": result.model_price[row],
+            "Actual Price": result.actual[row],
+        }
+    )
+    frame["Prediction"] = np.where(result.pred_up[row], "Up", "Down")
+    return frame
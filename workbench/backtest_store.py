@@ -0,0 +1,208 @@
+"""
+backtest_store.py  –  Precomputed backtest statistics, one build per data version
+
+Hit counts, totals and median absolute model errors only depend on the
+workbook, never on the ticker a user picks.  They are computed once with the
+vectorized engine and persisted under ``data/.cache/backtest``:
+
+* ``tickers.parquet``  – one row per company row (same order as Company Dta)
+* ``gsubind.parquet``  – one row per sub-industry
+* ``errors.parquet``   – the (row × year) absolute model errors behind the
+                         medians, so a delta can refresh a few rows in place
+* ``meta.json``        – data version, horizons and the global numbers
+
+``update_store`` re-runs the engine for the company rows a delta touched and
+re-aggregates the sub-industry and global numbers from the stored rows.
+
+Run ``python -m workbench.backtest_store`` to build it ahead of time.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from workbench import backtest, ingest
+
+
+STORE_DIR = ingest.CACHE_DIR / "backtest"
+
+
+# ─── Statistics ──────────────────────────────────────────────────────────────
+def _median_by_group(values, codes):
+    """Median of the non-NaN entries of ``values`` (n, Y) grouped by row code."""
+    long = pd.DataFrame(
+        {"code": np.repeat(np.asarray(codes), values.shape[1]), "v": values.ravel()}
+    ).dropna()
+    return long.groupby("code")["v"].median()
+
+
+def _ticker_stats(tickers, gsubinds, hits, totals, model_error):
+    rows = np.arange(len(tickers))
+    ticker_stats = pd.DataFrame(
+        {
+            "Ticker": np.asarray(tickers),
+            "gsubind": np.asarray(gsubinds),
+            "hits": hits,
+            "total": totals,
+        }
+    )
+    ticker_stats["hit_rate"] = np.where(totals > 0, hits / np.maximum(totals, 1) * 100, np.nan)
+    ticker_stats["median_error"] = _median_by_group(model_error, rows).reindex(rows).to_numpy()
+    return ticker_stats
+
+
+def _group_stats(ticker_stats, model_error):
+    group_stats = ticker_stats.groupby("gsubind").agg(
+        n_tickers=("Ticker", "size"), hits=("hits", "sum"), total=("total", "sum")
+    )
+    group_stats["hit_rate"] = np.where(
+        group_stats["total"] > 0,
+        group_stats["hits"] / group_stats["total"].clip(lower=1) * 100,
+        np.nan,
+    )
+    group_stats["median_error"] = _median_by_group(model_error, ticker_stats["gsubind"]).reindex(
+        group_stats.index
+    )
+    return group_stats
+
+
+def _global_stats(ticker_stats, model_error):
+    hits, total = int(ticker_stats["hits"].sum()), int(ticker_stats["total"].sum())
+    errors = model_error[~np.isnan(model_error)]
+    return {
+        "hits": hits,
+        "total": total,
+        "hit_rate": backtest.hit_rate(hits, total),
+        "median_error": float(np.median(errors)) if errors.size else np.nan,
+    }
+
+
+def compute_stats(result, tickers, gsubinds):
+    """Per-ticker, per-gsubind and global statistics from a BacktestResult."""
+    ticker_stats = _ticker_stats(tickers, gsubinds, result.hits, result.totals, result.model_error)
+    return {
+        "tickers": ticker_stats,
+        "gsubind": _group_stats(ticker_stats, result.model_error),
+        "global": _global_stats(ticker_stats, result.model_error),
+    }
+
+
+# ─── Persistence ─────────────────────────────────────────────────────────────
+def _read_meta(store_dir):
+    try:
+        with open(Path(store_dir) / "meta.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_parquet(frame, path):
+    tmp = Path(f"{path}.tmp")
+    frame.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def _write_store(stats, model_error, years, data_version, horizons, store_dir):
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    _write_parquet(stats["tickers"], store_dir / "tickers.parquet")
+    _write_parquet(stats["gsubind"], store_dir / "gsubind.parquet")
+    _write_parquet(pd.DataFrame(model_error, columns=[str(y) for y in years]), store_dir / "errors.parquet")
+
+    meta = {
+        "data_version": data_version,
+        "horizons": list(horizons),
+        "global": stats["global"],
+    }
+    with open(store_dir / "meta.json.tmp", "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(store_dir / "meta.json.tmp", store_dir / "meta.json")
+
+
+def build_store(data_version, cache_dir=ingest.CACHE_DIR, store_dir=STORE_DIR):
+    """Compute the statistics for the cached workbook and write them to disk."""
+    tables = ingest.read_cache(cache_dir)
+    company = tables["company"]
+    result = backtest.backtest_tables(tables)
+    stats = compute_stats(result, company["Ticker"], company["gsubind"])
+    _write_store(stats, result.model_error, result.years, data_version, result.horizons, store_dir)
+    return stats
+
+
+def update_store(data_version, rows, cache_dir=ingest.CACHE_DIR, store_dir=STORE_DIR):
+    """Refresh the statistics of company ``rows`` after a delta was applied.
+
+    ``rows`` must cover every row whose inputs moved, including the members
+    of sub-industries whose median P/E changed.  Falls back to a full build
+    when there is no usable store or the year axis changed.
+    """
+    meta = _read_meta(store_dir)
+    tables = ingest.read_cache(cache_dir)
+    company = tables["company"]
+    years = list(tables["eps"].columns)
+    errors_path = Path(store_dir) / "errors.parquet"
+    if meta is None or not errors_path.exists():
+        return build_store(data_version, cache_dir, store_dir)
+
+    stored_errors = pd.read_parquet(errors_path)
+    if [int(c) for c in stored_errors.columns] != years:
+        return build_store(data_version, cache_dir, store_dir)
+
+    n = len(company)
+    rows = np.unique(np.asarray(sorted(rows), dtype=int))
+    model_error = np.full((n, len(years)), np.nan)
+    model_error[:len(stored_errors)] = stored_errors.to_numpy()[:n]
+    ticker_stats = pd.read_parquet(Path(store_dir) / "tickers.parquet").reindex(range(n))
+
+    if rows.size:
+        result = backtest.backtest_universe(
+            tables["eps"].iloc[rows],
+            company["Ticker"].iloc[rows],
+            company["gsubind"].iloc[rows],
+            ingest.median_pe_lookup(tables["median_pe"]),
+            tables["actual_price"],
+            tuple(meta["horizons"]),
+        )
+        model_error[rows] = result.model_error
+        fresh = _ticker_stats(
+            company["Ticker"].iloc[rows], company["gsubind"].iloc[rows],
+            result.hits, result.totals, result.model_error,
+        )
+        fresh.index = rows
+        ticker_stats.loc[rows] = fresh
+        ticker_stats = ticker_stats.astype({"hits": int, "total": int})
+        ticker_stats["Ticker"] = company["Ticker"].to_numpy()
+        ticker_stats["gsubind"] = company["gsubind"].to_numpy()
+
+    stats = {
+        "tickers": ticker_stats,
+        "gsubind": _group_stats(ticker_stats, model_error),
+        "global": _global_stats(ticker_stats, model_error),
+    }
+    _write_store(stats, model_error, years, data_version, meta["horizons"], store_dir)
+    return stats
+
+
+def load_store(data_version, cache_dir=ingest.CACHE_DIR, store_dir=STORE_DIR):
+    """Return the stored statistics, rebuilding them if the data version moved."""
+    meta = _read_meta(store_dir)
+    if meta is None or meta.get("data_version") != data_version:
+        return build_store(data_version, cache_dir, store_dir)
+    return {
+        "tickers": pd.read_parquet(Path(store_dir) / "tickers.parquet"),
+        "gsubind": pd.read_parquet(Path(store_dir) / "gsubind.parquet"),
+        "global": meta["global"],
+    }
+
+
+if __name__ == "__main__":
+    version = ingest.ensure_cache()
+    stats = build_store(version)
+    g = stats["global"]
+    print(
+        f"Backtest store for data version {version}: "
+        f"{g['hits']}/{g['total']} hits ({g['hit_rate']:.2f}%)"
+    )
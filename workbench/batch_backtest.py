@@ -0,0 +1,212 @@
+"""
+batch_backtest.py  –  Headless EPS × median-PE backtest over the universe
+
+Runs the same engine as the Backtest tab for every company (or a ticker /
+gsubind subset) without Streamlit.  Work is split by sub-industry – a
+company only needs its own row and its gsubind's median P/E – and spread
+over a process pool.  Two tables are written per run:
+
+* ``results``  – one row per (ticker, year): EPS, median P/E, model and
+                 actual price, prediction, the realised t+h moves and hits,
+                 and the absolute model error
+* ``summary``  – one row per ticker: hits / totals (pooled and per horizon),
+                 hit rate and median model error
+
+plus a ``meta.json`` with the data version, filters and global numbers.  Runs
+land in ``backtest_runs/<data version>`` by default, so two data versions can
+be compared with ``--compare``::
+
+    python -m workbench.batch_backtest                        # whole universe
+    python -m workbench.batch_backtest --gsubind 45301020 --format csv
+    python -m workbench.batch_backtest --compare backtest_runs/<a> backtest_runs/<b>
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from workbench import backtest, backtest_store, ingest
+
+
+OUTPUT_ROOT = Path("backtest_runs")
+
+
+# ─── Per-group work ──────────────────────────────────────────────────────────
+def _result_frame(result, tickers, gsubinds):
+    n, n_years = result.eps.shape
+    frame = pd.DataFrame(
+        {
+            "Ticker": np.repeat(np.asarray(tickers), n_years),
+            "gsubind": np.repeat(np.asarray(gsubinds), n_years),
+            "Year": np.tile(result.years, n),
+            "EPS": result.eps.ravel(),
+            "Median PE": result.median_pe.ravel(),
+            "Model Price": result.model_price.ravel(),
+            "Actual Price": result.actual.ravel(),
+            "Prediction": np.where(result.pred_up.ravel(), "Up", "Down"),
+        }
+    )
+    for h in result.horizons:
+        counted = result.counted[h].ravel()
+        frame[f"Outcome t+{h}"] = pd.Series(
+            np.where(result.realised_up[h].ravel(), "Up", "Down"), dtype="string"
+        ).where(counted)
+        frame[f"Hit t+{h}"] = pd.Series(result.hit[h].ravel(), dtype="boolean").where(counted)
+    frame["Model Error %"] = result.model_error.ravel()
+    return frame
+
+
+def _summary_frame(result, tickers, gsubinds):
+    summary = backtest_store.compute_stats(result, tickers, gsubinds)["tickers"]
+    for h in result.horizons:
+        summary[f"hits_t{h}"] = result.hit[h].sum(axis=1)
+        summary[f"total_t{h}"] = result.counted[h].sum(axis=1)
+    return summary
+
+
+def run_group(eps, tickers, gsubinds, median_pe_map, actual, horizons=backtest.HORIZONS):
+    """Backtest one block of companies; returns ``(results, summary)`` frames."""
+    result = backtest.backtest_universe(eps, tickers, gsubinds, median_pe_map, actual, horizons)
+    return _result_frame(result, tickers, gsubinds), _summary_frame(result, tickers, gsubinds)
+
+
+def _jobs(tables, rows):
+    """One job per sub-industry present in ``rows`` (kept in workbook order)."""
+    company = tables["company"]
+    median_pe_map = ingest.median_pe_lookup(tables["median_pe"])
+    tickers, gsubinds = company["Ticker"], company["gsubind"]
+    groups = pd.Series(rows).groupby(gsubinds.iloc[rows].to_numpy(), sort=False, dropna=False)
+    for code, group_rows in groups:
+        group_rows = group_rows.to_numpy()
+        group_tickers = tickers.iloc[group_rows]
+        yield (
+            tables["eps"].iloc[group_rows],
+            group_tickers,
+            gsubinds.iloc[group_rows],
+            {code: median_pe_map.get(code)} if code in median_pe_map else {},
+            tables["actual_price"][tables["actual_price"].index.isin(group_tickers)],
+        )
+
+
+# ─── Universe run ────────────────────────────────────────────────────────────
+def select_rows(company, tickers=None, gsubinds=None):
+    mask = np.ones(len(company), dtype=bool)
+    if tickers:
+        mask &= company["Ticker"].str.upper().isin([t.upper() for t in tickers]).to_numpy()
+    if gsubinds:
+        mask &= company["gsubind"].isin(gsubinds).to_numpy()
+    return np.flatnonzero(mask)
+
+
+def run_batch(tickers=None, gsubinds=None, workers=None, horizons=backtest.HORIZONS,
+              workbook=ingest.WORKBOOK_PATH, cache_dir=ingest.CACHE_DIR):
+    """Backtest the (filtered) universe; return ``(results, summary, meta)``.
+
+    ``workers`` is the process count (default: one per CPU, capped at the
+    number of sub-industries); 0 runs everything in this process.
+    """
+    data_version = ingest.ensure_cache(workbook, cache_dir)
+    tables = ingest.read_cache(cache_dir)
+    rows = select_rows(tables["company"], tickers, gsubinds)
+    jobs = list(_jobs(tables, rows))
+
+    workers = min(os.cpu_count() or 1, len(jobs)) if workers is None else workers
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_group, *job, horizons) for job in jobs]
+            parts = [f.result() for f in futures]
+    else:
+        parts = [run_group(*job, horizons) for job in jobs]
+
+    if parts:
+        results = pd.concat([p[0] for p in parts], ignore_index=True)
+        summary = pd.concat([p[1] for p in parts], ignore_index=True)
+    else:
+        results, summary = pd.DataFrame(), pd.DataFrame()
+
+    hits = int(summary["hits"].sum()) if len(summary) else 0
+    total = int(summary["total"].sum()) if len(summary) else 0
+    errors = results["Model Error %"].dropna() if len(results) else pd.Series(dtype=float)
+    meta = {
+        "data_version": data_version,
+        "tickers": list(tickers or []),
+        "gsubinds": list(gsubinds or []),
+        "horizons": list(horizons),
+        "n_tickers": int(len(summary)),
+        "global": {
+            "hits": hits,
+            "total": total,
+            "hit_rate": backtest.hit_rate(hits, total),
+            "median_error": float(errors.median()) if len(errors) else np.nan,
+        },
+    }
+    return results, summary, meta
+
+
+def write_run(results, summary, meta, out_dir, fmt="parquet"):
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    for name, frame in (("results", results), ("summary", summary)):
+        path = out_dir / f"{name}.{fmt}"
+        if fmt == "csv":
+            frame.to_csv(path, index=False)
+        else:
+            frame.to_parquet(path, index=False)
+    with open(out_dir / "meta.json", "w") as f:
+        json.dump(meta, f, indent=2)
+    return out_dir
+
+
+def _read_summary(run_dir):
+    run_dir = Path(run_dir)
+    parquet = run_dir / "summary.parquet"
+    return pd.read_parquet(parquet) if parquet.exists() else pd.read_csv(run_dir / "summary.csv")
+
+
+def compare_runs(old_dir, new_dir):
+    """Per-ticker hit-rate / error changes between two runs (outer join)."""
+    cols = ["Ticker", "gsubind", "hits", "total", "hit_rate", "median_error"]
+    old = _read_summary(old_dir)[cols].drop_duplicates("Ticker")
+    new = _read_summary(new_dir)[cols].drop_duplicates("Ticker")
+    merged = old.merge(new, on="Ticker", how="outer", suffixes=("_old", "_new"))
+    merged["hit_rate_change"] = merged["hit_rate_new"] - merged["hit_rate_old"]
+    merged["median_error_change"] = merged["median_error_new"] - merged["median_error_old"]
+    return merged
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the EPS × median-PE backtest headless.")
+    parser.add_argument("--ticker", action="append", help="limit to a ticker (repeatable)")
+    parser.add_argument("--gsubind", action="append", type=int, help="limit to a sub-industry (repeatable)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (0 = in-process)")
+    parser.add_argument("--format", choices=("parquet", "csv"), default="parquet")
+    parser.add_argument("--out", help=f"output directory (default {OUTPUT_ROOT}/<data version>)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD_RUN", "NEW_RUN"),
+                        help="compare two run directories instead of running")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        diff = compare_runs(*args.compare)
+        moved = diff[diff["hit_rate_change"].abs() > 0].sort_values("hit_rate_change")
+        print(moved.to_string(index=False) if len(moved) else "No per-ticker hit-rate changes")
+        return
+
+    started = time.time()
+    results, summary, meta = run_batch(args.ticker, args.gsubind, args.workers)
+    out_dir = write_run(results, summary, meta, args.out or OUTPUT_ROOT / meta["data_version"], args.format)
+    g = meta["global"]
+    print(
+        f"{meta['n_tickers']} tickers, {g['hits']}/{g['total']} hits ({g['hit_rate']:.2f}%) "
+        f"→ {out_dir} in {time.time() - started:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
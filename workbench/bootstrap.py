@@ -0,0 +1,324 @@
+"""
+bootstrap.py  –  Bootstrap confidence intervals for the backtest hit rates
+
+The Backtest tab's hit rates are point estimates.  ``hit_rate_intervals``
+puts a percentile bootstrap interval around every one of them – per ticker,
+per sub-industry and global – from the engine's (ticker × year) hit and
+prediction counts (pooled over horizons, like the rates themselves):
+
+* ``block="ticker_year"`` – every scope resamples its own ticker-years with
+                            replacement.  Small groups (tickers) draw all
+                            resamples in one ``(resamples × cells)`` index
+                            array summed per group with ``reduceat``.  A cell
+                            only takes a handful of distinct (hits, total)
+                            values, so large groups (sub-industries, the
+                            universe) draw how often each value comes up from
+                            one multinomial per group instead – the same
+                            distribution at a cost independent of group size.
+* ``block="year"``        – whole fiscal years are resampled, the same draw
+                            for every group, so years in which the whole
+                            market moved together are not counted as
+                            independent evidence.  Each resample is a weight
+                            vector over years and the rates come out of two
+                            matrix products.
+
+Groups are split into fixed-size blocks, each with its own seed spawned from
+``seed``, so results do not depend on ``workers``; ``workers > 1`` spreads
+the blocks over a process pool.
+
+Intervals only depend on the workbook, so ``load_intervals`` keeps them next
+to the backtest store, one set per data version and ``block``.
+
+    python -m workbench.bootstrap --block year --resamples 5000 --workers 4
+"""
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from workbench import backtest, backtest_store, ingest
+
+
+BLOCKS = ("ticker_year", "year")
+N_RESAMPLES = 2000
+ALPHA = 0.05                    # 95% intervals
+SEED = 0
+CHUNK_CELLS = 8192              # ticker-years per job
+MAX_DRAWS = 4_000_000           # resampled cells held in memory per step
+MULTINOMIAL_ABOVE = 32          # mean cells per group beyond which to draw counts
+WORKERS = int(os.environ.get("WORKBENCH_BOOTSTRAP_WORKERS", 0))
+INTERVAL_COLUMNS = ["hit_rate", "ci_low", "ci_high"]
+
+
+# ─── Inputs ──────────────────────────────────────────────────────────────────
+def cell_counts(result):
+    """``(hits, totals)`` per (ticker, year), pooled over the horizons."""
+    hits = sum(result.hit[h].astype(np.int64) for h in result.horizons)
+    totals = sum(result.counted[h].astype(np.int64) for h in result.horizons)
+    return hits, totals
+
+
+def _chunks(sizes, limit=CHUNK_CELLS):
+    """Split groups with ``sizes`` cells into ``[start, stop)`` runs of ≲ ``limit`` cells."""
+    bounds, cells, start = [], 0, 0
+    for g, size in enumerate(sizes):
+        if cells and cells + size > limit:
+            bounds.append((start, g))
+            start, cells = g, 0
+        cells += size
+    if start < len(sizes):
+        bounds.append((start, len(sizes)))
+    return bounds
+
+
+def _percentiles(rates, alpha):
+    """Percentile interval per column; resamples without data (NaN) are skipped."""
+    q = [50 * alpha, 100 - 50 * alpha]
+    bounds = np.percentile(rates, q, axis=0)
+    gaps = np.flatnonzero(np.isnan(rates).any(axis=0))
+    if gaps.size:       # nanpercentile goes column by column, so only where needed
+        with np.errstate(all="ignore"):
+            bounds[:, gaps] = np.nanpercentile(rates[:, gaps], q, axis=0)
+    return bounds[0], bounds[1]
+
+
+# ─── Resampling ──────────────────────────────────────────────────────────────
+def resample_cells(hits, totals, sizes, n_resamples, alpha, seed):
+    """Intervals for consecutive groups of ``sizes`` cells (every cell counted).
+
+    Each resample draws, for every group, as many of its cells as it has,
+    with replacement.
+    """
+    rng = np.random.default_rng(seed)
+    sizes = np.asarray(sizes, dtype=np.intp)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    cell_start = np.repeat(starts, sizes)
+    cell_size = np.repeat(sizes, sizes)
+
+    rates = np.empty((n_resamples, len(sizes)))
+    step = max(1, MAX_DRAWS // max(len(hits), 1))
+    for b in range(0, n_resamples, step):
+        draws = min(step, n_resamples - b)
+        idx = cell_start + (rng.random((draws, len(hits))) * cell_size).astype(np.intp)
+        h = np.add.reduceat(hits[idx], starts, axis=1)
+        t = np.add.reduceat(totals[idx], starts, axis=1)
+        rates[b:b + draws] = h / t * 100
+    return _percentiles(rates, alpha)
+
+
+def resample_counts(counts, cat_hits, cat_totals, n_resamples, alpha, seed):
+    """Intervals for groups with ``(G, K)`` cell counts per distinct (hits, total) value."""
+    rng = np.random.default_rng(seed)
+    sizes = counts.sum(axis=1)
+    draws = rng.multinomial(sizes, counts / sizes[:, None], size=(n_resamples, len(counts)))
+    return _percentiles(draws @ cat_hits / (draws @ cat_totals) * 100, alpha)
+
+
+def resample_years(hits, totals, weights, alpha):
+    """Intervals for groups with ``(G, Y)`` counts under ``(B, Y)`` year weights."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rates = (weights @ hits.T) / (weights @ totals.T) * 100
+    return _percentiles(rates, alpha)
+
+
+def _year_weights(totals, n_resamples, seed):
+    """How often each year is drawn in each resample (years without data stay 0)."""
+    years = np.flatnonzero(totals.sum(axis=0) > 0)
+    weights = np.zeros((n_resamples, totals.shape[1]))
+    if years.size:
+        rng = np.random.default_rng(seed)
+        weights[:, years] = rng.multinomial(years.size, np.full(years.size, 1 / years.size), n_resamples)
+    return weights
+
+
+def _jobs(hits, totals, codes, n_groups, block, n_resamples, alpha, seed, weights):
+    """``(groups, fn, args)`` per block of groups for one scope."""
+    if block == "year":
+        group_hits = np.zeros((n_groups, hits.shape[1]), dtype=np.int64)
+        group_totals = np.zeros_like(group_hits)
+        np.add.at(group_hits, codes, hits)
+        np.add.at(group_totals, codes, totals)
+        has_data = np.flatnonzero(group_totals.sum(axis=1) > 0)
+        sizes = np.full(has_data.size, hits.shape[1])
+        for start, stop in _chunks(sizes):
+            groups = has_data[start:stop]
+            yield groups, resample_years, (group_hits[groups], group_totals[groups], weights, alpha)
+        return
+
+    cell_group = np.repeat(codes, hits.shape[1])
+    counted = totals.ravel() > 0
+    order = np.argsort(cell_group[counted], kind="stable")
+    cell_group = cell_group[counted][order]
+    cell_hits = hits.ravel()[counted][order]
+    cell_totals = totals.ravel()[counted][order]
+    groups, starts, sizes = np.unique(cell_group, return_index=True, return_counts=True)
+
+    # Distinct (hits, total) values and how often each group has them
+    values, cell_value = np.unique(np.stack([cell_hits, cell_totals], axis=1), axis=0, return_inverse=True)
+    group_of_cell = np.repeat(np.arange(len(groups)), sizes)
+    counts = np.zeros((len(groups), len(values)), dtype=np.int64)
+    np.add.at(counts, (group_of_cell, cell_value.ravel()), 1)
+
+    chunks = _chunks(sizes)
+    for (start, stop), job_seed in zip(chunks, seed.spawn(len(chunks))):
+        if sizes[start:stop].mean() > MULTINOMIAL_ABOVE:
+            yield groups[start:stop], resample_counts, (
+                counts[start:stop], values[:, 0], values[:, 1], n_resamples, alpha, job_seed,
+            )
+            continue
+        cells = slice(starts[start], starts[stop - 1] + sizes[stop - 1])
+        yield groups[start:stop], resample_cells, (
+            cell_hits[cells], cell_totals[cells], sizes[start:stop], n_resamples, alpha, job_seed,
+        )
+
+
+def hit_rate_intervals(result, tickers, gsubinds, block="ticker_year", n_resamples=N_RESAMPLES,
+                       alpha=ALPHA, seed=SEED, workers=0):
+    """Per-ticker, per-gsubind and global hit rates with bootstrap intervals.
+
+    Same shape as ``backtest_store.compute_stats`` (``"tickers"`` in company
+    row order, ``"gsubind"`` indexed by code, ``"global"`` a dict), with
+    ``hit_rate``, ``ci_low`` and ``ci_high`` in percent.  Groups without a
+    single counted prediction get NaN.
+    """
+    if block not in BLOCKS:
+        raise ValueError(f"Unknown bootstrap block {block!r}; expected one of {BLOCKS}")
+    hits, totals = cell_counts(result)
+    n = len(hits)
+    gsubind_codes, gsubind_of_row = np.unique(np.asarray(gsubinds), return_inverse=True)
+    scopes = {
+        "tickers": (np.arange(n), n),
+        "gsubind": (gsubind_of_row, len(gsubind_codes)),
+        "global": (np.zeros(n, dtype=np.intp), 1),
+    }
+
+    seeds = np.random.SeedSequence(seed).spawn(len(scopes) + 1)
+    weights = _year_weights(totals, n_resamples, seeds[-1]) if block == "year" else None
+    jobs = [
+        (scope, groups, fn, args)
+        for (scope, (codes, n_groups)), scope_seed in zip(scopes.items(), seeds)
+        for groups, fn, args in _jobs(hits, totals, codes, n_groups, block, n_resamples, alpha,
+                                      scope_seed, weights)
+    ]
+    if workers and workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            futures = [pool.submit(fn, *args) for _, _, fn, args in jobs]
+            bounds = [f.result() for f in futures]
+    else:
+        bounds = [fn(*args) for _, _, fn, args in jobs]
+
+    frames = {}
+    for scope, (codes, n_groups) in scopes.items():
+        group_hits = np.bincount(codes, hits.sum(axis=1), n_groups)
+        group_totals = np.bincount(codes, totals.sum(axis=1), n_groups)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rate = np.where(group_totals > 0, group_hits / group_totals * 100, np.nan)
+        frames[scope] = pd.DataFrame(
+            {"hit_rate": rate, "ci_low": np.full(n_groups, np.nan), "ci_high": np.full(n_groups, np.nan)},
+            columns=INTERVAL_COLUMNS,
+        )
+    for (scope, groups, _, _), (lo, hi) in zip(jobs, bounds):
+        frames[scope].loc[groups, "ci_low"] = lo
+        frames[scope].loc[groups, "ci_high"] = hi
+
+    ticker_frame = frames["tickers"]
+    ticker_frame.insert(0, "Ticker", np.asarray(tickers))
+    ticker_frame.insert(1, "gsubind", np.asarray(gsubinds))
+    group_frame = frames["gsubind"].set_index(pd.Index(gsubind_codes, name="gsubind"))
+    return {
+        "tickers": ticker_frame,
+        "gsubind": group_frame,
+        "global": {k: float(v) for k, v in frames["global"].iloc[0].items()},
+    }
+
+
+# ─── Persistence ─────────────────────────────────────────────────────────────
+def _meta_path(store_dir, block):
+    return Path(store_dir) / f"intervals_{block}.json"
+
+
+def _write_parquet(frame, path):
+    tmp = Path(f"{path}.tmp")
+    frame.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def build_intervals(data_version, block="ticker_year", n_resamples=N_RESAMPLES, alpha=ALPHA,
+                    seed=SEED, workers=WORKERS, cache_dir=ingest.CACHE_DIR,
+                    store_dir=backtest_store.STORE_DIR):
+    """Compute the intervals for the cached workbook and store them."""
+    tables = ingest.read_cache(cache_dir)
+    company = tables["company"]
+    result = backtest.backtest_tables(tables)
+    intervals = hit_rate_intervals(
+        result, company["Ticker"], company["gsubind"], block, n_resamples, alpha, seed, workers
+    )
+
+    store_dir = Path(store_dir)
+    store_dir.mkdir(parents=True, exist_ok=True)
+    _write_parquet(intervals["tickers"], store_dir / f"intervals_{block}_tickers.parquet")
+    _write_parquet(intervals["gsubind"], store_dir / f"intervals_{block}_gsubind.parquet")
+    meta = {
+        "data_version": data_version,
+        "block": block,
+        "n_resamples": n_resamples,
+        "alpha": alpha,
+        "seed": seed,
+        "global": intervals["global"],
+    }
+    tmp = Path(f"{_meta_path(store_dir, block)}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, _meta_path(store_dir, block))
+    return intervals
+
+
+def load_intervals(data_version, block="ticker_year", n_resamples=N_RESAMPLES, alpha=ALPHA,
+                   seed=SEED, workers=WORKERS, cache_dir=ingest.CACHE_DIR,
+                   store_dir=backtest_store.STORE_DIR):
+    """Return the stored intervals, rebuilding them if the data or settings moved."""
+    try:
+        with open(_meta_path(store_dir, block)) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        meta = None
+    wanted = {"data_version": data_version, "n_resamples": n_resamples, "alpha": alpha, "seed": seed}
+    if meta is None or any(meta.get(k) != v for k, v in wanted.items()):
+        return build_intervals(data_version, block, n_resamples, alpha, seed, workers, cache_dir, store_dir)
+    return {
+        "tickers": pd.read_parquet(Path(store_dir) / f"intervals_{block}_tickers.parquet"),
+        "gsubind": pd.read_parquet(Path(store_dir) / f"intervals_{block}_gsubind.parquet"),
+        "global": meta["global"],
+    }
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bootstrap confidence intervals for the hit rates.")
+    parser.add_argument("--block", choices=BLOCKS, nargs="+", default=list(BLOCKS))
+    parser.add_argument("--resamples", type=int, default=N_RESAMPLES)
+    parser.add_argument("--alpha", type=float, default=ALPHA)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    version = ingest.ensure_cache()
+    for block in args.block:
+        started = time.time()
+        intervals = build_intervals(version, block, args.resamples, args.alpha, args.seed, args.workers)
+        g = intervals["global"]
+        print(
+            f"{block}: global hit rate {g['hit_rate']:.2f}% "
+            f"({100 - 100 * args.alpha:g}% CI {g['ci_low']:.2f}–{g['ci_high']:.2f}%), "
+            f"{args.resamples} resamples in {time.time() - started:.2f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+bulk_quotes.py  –  Batched, rate-limit-aware quote prefetch
+
+Prices for a whole peer group (or the whole universe) are pulled from Yahoo's
+multi-symbol quote endpoint, ``BATCH_SIZE`` symbols per request, instead of
+one ``yf.Ticker`` call per name.  Requests draw from a token bucket and back
+off exponentially on ``YFRateLimitError``; results land in the shared quote
+cache of ``workbench.market_data``.
+
+Page renders use ``prefetch_quotes_nowait`` instead: one attempt per batch,
+no backoff sleeps and no waiting for a token, so a throttled rerun shows the
+cached (possibly stale) quotes instead of freezing the tab.
+
+Refresh the full universe from the command line with::
+
+    python -m workbench.bulk_quotes            # only stale / missing quotes
+    python -m workbench.bulk_quotes --all      # everything
+"""
+
+import argparse
+import logging
+import random
+import threading
+import time
+
+from yfinance.data import YfData
+from yfinance.exceptions import YFRateLimitError
+
+from workbench import diagnostics, market_data
+
+
+log = logging.getLogger(__name__)
+
+QUOTE_URL = "https://query1.finance.yahoo.com/v7/finance/quote"
+BATCH_SIZE = 250
+MAX_RETRIES = 5
+BACKOFF_BASE = 2.0          # seconds; doubled on every consecutive 429
+BACKOFF_CAP = 60.0
+
+
+# ─── Request budget ──────────────────────────────────────────────────────────
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate=1.0, capacity=5):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self):
+        """Take a token if one is available right now; never sleeps."""
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def drain(self):
+        """Empty the bucket, e.g. after the server told us to slow down."""
+        with self._lock:
+            self._tokens = 0.0
+            self._updated = time.monotonic()
+
+
+# One budget per process, shared by every caller
+default_bucket = TokenBucket()
+
+
+# ─── Fetching ────────────────────────────────────────────────────────────────
+def fetch_batch(symbols):
+    """One HTTP request for up to ``BATCH_SIZE`` symbols → ``{ticker: quote}``."""
+    with diagnostics.external("yahoo.quotes"):
+        payload = YfData().get_raw_json(
+            QUOTE_URL, params={"symbols": ",".join(symbols), "formatted": "false"}
+        )
+    results = (payload.get("quoteResponse") or {}).get("result") or []
+    return {
+        r["symbol"].upper(): market_data.quote_fields(r)
+        for r in results
+        if r.get("symbol")
+    }
+
+
+def _backoff(attempt):
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)
+    return delay * (0.5 + random.random() / 2)
+
+
+def prefetch_quotes(tickers, batch_size=BATCH_SIZE, bucket=None, fetch=fetch_batch,
+                    only_missing=True, max_retries=MAX_RETRIES, wait=True):
+    """Fill the shared quote cache for ``tickers``; return ``{ticker: quote}``.
+
+    With ``only_missing`` (the default) tickers whose cached quote is still
+    current are skipped, so repeated calls for the same peer group are free.
+    A batch that keeps failing after ``max_retries`` is logged and skipped.
+    ``wait=False`` skips the remaining batches instead of waiting for the
+    bucket.  The result includes stale cached quotes for skipped tickers.
+    """
+    bucket = bucket or default_bucket
+    quotes = market_data.default_quotes()
+    wanted = list(dict.fromkeys(t.upper() for t in tickers))
+    todo = quotes.missing(wanted) if only_missing else wanted
+
+    for start in range(0, len(todo), batch_size):
+        batch = todo[start:start + batch_size]
+        if not wait and not bucket.try_acquire():
+            log.info("Quote budget spent; serving %d symbols from the cache", len(todo) - start)
+            break
+        for attempt in range(max_retries + 1):
+            if wait or attempt:
+                bucket.acquire()
+            try:
+                quotes.put_many(fetch(batch))
+                break
+            except YFRateLimitError:
+                bucket.drain()
+                if attempt == max_retries:
+                    log.warning("Rate limited; giving up on %d symbols", len(batch))
+                    break
+                delay = _backoff(attempt)
+                log.info("Rate limited; retrying batch in %.1fs", delay)
+                time.sleep(delay)
+            except Exception as e:
+                log.warning("Quote batch of %d symbols failed: %s", len(batch), e)
+                break
+
+    return {t: q for t in wanted if (q := quotes.get(t, max_age=float("inf"))) is not None}
+
+
+def prefetch_quotes_nowait(tickers, **kwargs):
+    """``prefetch_quotes`` for render paths: one try per batch, never sleeps."""
+    return prefetch_quotes(tickers, max_retries=0, wait=False, **kwargs)
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    from workbench import ingest
+
+    parser = argparse.ArgumentParser(description="Refresh cached quotes for the universe.")
+    parser.add_argument("--all", action="store_true", help="refetch even current quotes")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    tickers = ingest.load_tables()["company"]["Ticker"].tolist()
+    started = time.time()
+    got = prefetch_quotes(tickers, batch_size=args.batch_size, only_missing=not args.all)
+    print(f"{len(got)}/{len(tickers)} quotes cached in {time.time() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+charts.py  –  Cached, leak-free chart rendering
+
+Charts that only depend on a ticker's workbook data (plus, for the valuation
+strip, the current price) are built once and kept in a bounded LRU shared by
+every session, keyed by ``(ticker, data version, chart type, inputs)``:
+
+* ``valuation_range_png`` – the Valuation Advisor's implied-range strip.  It
+                            is drawn on a bare ``matplotlib.figure.Figure``
+                            (never registered with pyplot, so nothing piles up
+                            in pyplot's figure manager), saved as PNG bytes and
+                            released before returning.  The live price is
+                            snapped to 1/``PRICE_STEPS`` of the axis so ticks
+                            too small to see don't each add an entry.
+* ``model_vs_actual``     – the Backtest tab's Plotly figure
+* ``compare_series``      – the Compare tab's model-vs-actual figure for a set
+                            of tickers (``compare_ranges`` depends on live
+                            prices and is cheap, so it is not cached)
+
+The Plotly figures are handed out as copies, so callers may restyle them
+without touching the cached one.
+
+Configuration (environment variables):
+
+* ``WORKBENCH_CHART_CACHE`` – number of charts kept (default 256)
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import plotly.colors
+import plotly.graph_objects as go
+from matplotlib.figure import Figure
+
+from workbench import diagnostics
+
+
+CHART_CACHE_SIZE = int(os.environ.get("WORKBENCH_CHART_CACHE", 256))
+PNG_DPI = 200                   # what st.pyplot renders at
+PRICE_STEPS = 500               # current-price positions per valuation strip
+
+
+class ChartCache:
+    """Thread-safe LRU of built charts."""
+
+    def __init__(self, maxsize=CHART_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Cached chart for ``key``, else ``build()`` (stored, oldest evicted)."""
+        diagnostics.metrics.record_cache("charts", miss=False)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        diagnostics.metrics.record_cache("charts", miss=True)
+        chart = build()
+        with self._lock:
+            self._entries[key] = chart
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return chart
+
+    def __len__(self):
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+default_cache = ChartCache()
+
+
+def _key_value(x):
+    # NaNs never compare equal, so they would never hit the cache
+    x = float(x)
+    return None if np.isnan(x) else round(x, 6)
+
+
+# ─── Valuation Advisor ───────────────────────────────────────────────────────
+def _valuation_xlim(low, high):
+    return low * 0.85, high * 1.15
+
+
+def _snap_price(current, low, high):
+    # Nearest of PRICE_STEPS positions across the axis – finer than the PNG resolves
+    lo, hi = _valuation_xlim(low, high)
+    step = (hi - lo) / PRICE_STEPS
+    if not step > 0 or np.isnan(current):
+        return current
+    return lo + round((current - lo) / step) * step
+
+
+def _draw_valuation_range(low, avg, high, current):
+    fig = Figure(figsize=(10, 2.5))
+    ax = fig.subplots()
+    ax.hlines(1, low, high, color="gray", linewidth=10, alpha=0.4)
+    ax.vlines(avg, 0.9, 1.1, color="blue", linewidth=2, label="Avg Implied Price")
+    ax.plot(current, 1, "ro", markersize=10, label="Current Price")
+    ax.text(low, 1.15, f"Low:  ${low:.2f}", ha="center", fontsize=9)
+    ax.text(avg, 1.27, f"Avg:  ${avg:.2f}", ha="center", fontsize=9, color="blue")
+    ax.text(high, 1.15, f"High: ${high:.2f}", ha="center", fontsize=9)
+    ax.set_xlim(*_valuation_xlim(low, high))
+    ax.set_ylim(0.8, 1.4)
+    ax.axis("off")
+    ax.legend(loc="upper center", bbox_to_anchor=(0.5, 1.35), ncol=2)
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png", dpi=PNG_DPI, bbox_inches="tight")
+    fig.clear()
+    return buf.getvalue()
+
+
+def valuation_range_png(ticker, data_version, low, avg, high, current, cache=default_cache):
+    """PNG of the implied low / avg / high strip with the current price."""
+    current = _snap_price(float(current), low, high)
+    key = (ticker, data_version, "valuation_range", *map(_key_value, (low, avg, high, current)))
+    return cache.get(key, lambda: _draw_valuation_range(low, avg, high, current))
+
+
+# ─── Backtest ────────────────────────────────────────────────────────────────
+def _build_model_vs_actual(price_df):
+    # Model price made at t is plotted at t + 1, against the actual price at t
+    x_actual = price_df["Year"]
+    fig = go.Figure()
+    fig.add_trace(
+        go.Scatter(
+            x=x_actual + 1,
+            y=price_df["Model Price"],
+            mode="lines+markers",
+            name="Model (predicted t → t+1)",
+            marker=dict(symbol="square"),
+            line=dict(width=2),
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=x_actual,
+            y=price_df["Actual Price"],
+            mode="lines+markers",
+            name="Actual Price (t)",
+            marker=dict(symbol="circle"),
+            line=dict(width=2, dash="dash"),
+        )
+    )
+    fig.update_layout(
+        height=450,
+        xaxis_title="Fiscal Year",
+        yaxis_title="Share Price ($)",
+        hovermode="x unified",
+        xaxis=dict(dtick=1),                 # one tick per year
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=40, r=40, t=40, b=40),
+    )
+    return fig
+
+
+def model_vs_actual(ticker, data_version, price_df, cache=default_cache):
+    """Plotly figure of model vs actual price for one ticker's backtest frame."""
+    fig = cache.get((ticker, data_version, "model_vs_actual"), lambda: _build_model_vs_actual(price_df))
+    return go.Figure(fig)
+
+
+# ─── Compare ─────────────────────────────────────────────────────────────────
+def compare_ranges(summary):
+    """Implied low–high bar, implied avg and current price, one row per ticker."""
+    fig = go.Figure()
+    bounds = zip(summary["Ticker"], summary["Implied Low"], summary["Implied High"])
+    for i, (ticker, low, high) in enumerate(bounds):
+        fig.add_trace(
+            go.Scatter(
+                x=[low, high],
+                y=[ticker, ticker],
+                mode="lines",
+                line=dict(color="gray", width=10),
+                opacity=0.4,
+                name="Implied range",
+                legendgroup="range",
+                showlegend=i == 0,
+            )
+        )
+    fig.add_trace(
+        go.Scatter(
+            x=summary["Implied Avg"], y=summary["Ticker"], mode="markers",
+            marker=dict(symbol="line-ns-open", size=18, color="blue", line=dict(width=3)),
+            name="Avg Implied Price",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=summary["Price"], y=summary["Ticker"], mode="markers",
+            marker=dict(color="red", size=10), name="Current Price",
+        )
+    )
+    fig.update_layout(
+        height=120 + 40 * len(summary),
+        xaxis_title="Price ($)",
+        yaxis=dict(autorange="reversed"),
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="right", x=1),
+        margin=dict(l=40, r=40, t=40, b=40),
+    )
+    return fig
+
+
+def _build_compare_series(series):
+    fig = go.Figure()
+    palette = plotly.colors.qualitative.Plotly
+    for i, (ticker, frame) in enumerate(series.groupby("Ticker", sort=False)):
+        color = palette[i % len(palette)]
+        fig.add_trace(
+            go.Scatter(
+                x=frame["Year"], y=frame["Actual Price"], mode="lines+markers",
+                name=f"{ticker} actual", legendgroup=ticker, line=dict(color=color, width=2),
+            )
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=frame["Year"] + 1, y=frame["Model Price"], mode="lines",
+                name=f"{ticker} model (t → t+1)", legendgroup=ticker,
+                line=dict(color=color, width=1.5, dash="dot"),
+            )
+        )
+    fig.update_layout(
+        height=450,
+        xaxis_title="Fiscal Year",
+        yaxis_title="Share Price ($)",
+        hovermode="x unified",
+        xaxis=dict(dtick=1),
+        margin=dict(l=40, r=40, t=40, b=40),
+    )
+    return fig
+
+
+def compare_series(tickers, data_version, series, cache=default_cache):
+    """Actual (solid) and model (dotted) price per ticker, one colour each."""
+    fig = cache.get((tuple(tickers), data_version, "compare_series"), lambda: _build_compare_series(series))
+    return go.Figure(fig)
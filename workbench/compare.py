@@ -0,0 +1,85 @@
+"""
+compare.py  –  Several tickers side by side, computed in one batch
+
+``compare`` gathers everything the Compare tab shows for a list of tickers
+with one call per step, instead of one page load per ticker:
+
+* one grouped quote request for all of them
+  (``bulk_quotes.prefetch_quotes_nowait`` – a throttled request is not
+  retried; cached or stale quotes, else the workbook price, fill in)
+* implied low / avg / high, price, gap and signal from the screener's array
+  rule restricted to the chosen rows
+* model-vs-actual series from a single engine run over those rows
+* ticker and sub-industry hit rates from the precomputed backtest store, plus
+  each sub-industry's typical model error from the P/E cube
+"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+from workbench import backtest, bulk_quotes, screener
+
+
+MAX_TICKERS = 12
+SUMMARY_COLUMNS = screener.SCREEN_COLUMNS + [
+    "Hit Rate %", "Predictions", "Industry Hit Rate %", "Model Error %",
+]
+
+
+def parse_tickers(text, index, limit=MAX_TICKERS):
+    """``"aapl, msft nvda"`` → ``(known tickers, unknown tickers)``.
+
+    Duplicates are dropped and at most ``limit`` known tickers are kept.
+    """
+    known, unknown = [], []
+    for ticker in dict.fromkeys(t for t in re.split(r"[\s,;]+", text.upper()) if t):
+        (known if ticker in index else unknown).append(ticker)
+    return known[:limit], unknown
+
+
+def _rates(hits, totals):
+    hits = np.asarray(hits, dtype=float)
+    totals = np.asarray(totals, dtype=float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(totals > 0, hits / totals * 100, np.nan)
+
+
+def compare(tickers, company, eps_data, price_data, median_pe_map, actual_price_data,
+            index, cube, stats, prices=None):
+    """Return ``{"summary": one row per ticker, "series": long Year × Ticker frame}``.
+
+    ``tickers`` must all be in ``index``.  ``prices`` (one per ticker) skips
+    the quote request, e.g. for offline use.
+    """
+    rows = np.array([index.row(t) for t in tickers], dtype=int)
+    if prices is None and len(tickers):
+        bulk_quotes.prefetch_quotes_nowait(list(tickers))
+    summary = screener.build_screen(company, eps_data, price_data, index, cube, prices, rows)
+
+    ticker_stats = stats["tickers"].iloc[rows]
+    group_stats = stats["gsubind"].reindex(summary["gsubind"].to_numpy())
+    summary["Hit Rate %"] = _rates(ticker_stats["hits"], ticker_stats["total"])
+    summary["Predictions"] = ticker_stats["total"].to_numpy()
+    summary["Industry Hit Rate %"] = _rates(group_stats["hits"], group_stats["total"])
+    summary["Model Error %"] = cube.model_error[index.group_of_row[rows]]
+
+    result = backtest.backtest_universe(
+        eps_data.iloc[rows],
+        company["Ticker"].iloc[rows],
+        company["gsubind"].iloc[rows],
+        median_pe_map,
+        actual_price_data,
+    )
+    n_years = len(result.years)
+    series = pd.DataFrame(
+        {
+            "Ticker": np.repeat(np.asarray(tickers, dtype=object), n_years),
+            "Year": np.tile(np.asarray(result.years), len(rows)),
+            "Model Price": result.model_price.ravel(),
+            "Actual Price": result.actual.ravel(),
+            "Prediction": np.where(result.pred_up.ravel(), "Up", "Down"),
+        }
+    )
+    return {"summary": summary[SUMMARY_COLUMNS], "series": series}
@@ -0,0 +1,98 @@
+"""
+concurrent_fetch.py  –  Parallel I/O for one Company Snapshot render
+
+The profile (``.info``), the price history and the company logo are fetched
+on a shared thread pool instead of one after another, each with its own
+timeout.  The logo needs the profile's website, so it is chained onto the
+profile task; the render waits for ``max(profile + logo, history)`` rather
+than the sum of all three.  Anything that fails or times out comes back as
+``None`` plus the exception so the page can fall back gracefully.
+
+Daily ranges are served from the local bar store (``workbench.price_history``)
+and the intraday "1d" view from the shared polled feed (``workbench.intraday``).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from workbench import diagnostics, intraday, market_data, price_history
+
+
+INFO_TIMEOUT = 10.0
+HISTORY_TIMEOUT = 10.0
+LOGO_TIMEOUT = 3.0
+LOGO_CACHE_SIZE = 512
+
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="workbench-fetch")
+_logos = OrderedDict()      # url → bytes (or None if the URL had no image)
+_logos_lock = threading.Lock()
+
+
+# ─── Individual fetches ──────────────────────────────────────────────────────
+def fetch_history(ticker, period):
+    if period == "1d":
+        return intraday.get_feed(ticker).poll()[0]
+    return price_history.get_history(ticker, period)
+
+
+def fetch_logo(url, timeout=LOGO_TIMEOUT):
+    """Logo image bytes for ``url`` (memoised), or None if unavailable."""
+    diagnostics.metrics.record_cache("logo", miss=False)
+    with _logos_lock:
+        if url in _logos:
+            _logos.move_to_end(url)
+            return _logos[url]
+    diagnostics.metrics.record_cache("logo", miss=True)
+    with diagnostics.external("clearbit.logo"):
+        resp = requests.get(url, timeout=timeout)
+    content = resp.content if resp.ok and resp.headers.get("content-type", "").startswith("image") else None
+    with _logos_lock:
+        _logos[url] = content
+        while len(_logos) > LOGO_CACHE_SIZE:
+            _logos.popitem(last=False)
+    return content
+
+
+def _info_then_logo(ticker, logo_timeout):
+    info = market_data.get_info(ticker)
+    url = market_data.logo_url(info)
+    if not url:
+        return info, None, None
+    try:
+        return info, fetch_logo(url, logo_timeout), None
+    except Exception as e:
+        return info, None, e
+
+
+# ─── Snapshot bundle ─────────────────────────────────────────────────────────
+def fetch_snapshot(ticker, period, info_timeout=INFO_TIMEOUT,
+                   history_timeout=HISTORY_TIMEOUT, logo_timeout=LOGO_TIMEOUT):
+    """Fetch profile, logo and price history for ``ticker`` concurrently.
+
+    Returns a dict with ``info``, ``logo``, ``history`` and matching
+    ``*_error`` entries (None when the fetch succeeded).
+    """
+    started = time.monotonic()
+    profile_future = _executor.submit(diagnostics.in_context(_info_then_logo), ticker, logo_timeout)
+    history_future = _executor.submit(diagnostics.in_context(fetch_history), ticker, period)
+
+    out = {"info": None, "info_error": None, "logo": None, "logo_error": None,
+           "history": None, "history_error": None}
+
+    try:
+        remaining = info_timeout + logo_timeout - (time.monotonic() - started)
+        out["info"], out["logo"], out["logo_error"] = profile_future.result(timeout=max(remaining, 0))
+    except Exception as e:  # includes the future's TimeoutError
+        out["info_error"] = e
+
+    try:
+        remaining = history_timeout - (time.monotonic() - started)
+        out["history"] = history_future.result(timeout=max(remaining, 0))
+    except Exception as e:
+        out["history_error"] = e
+
+    return out
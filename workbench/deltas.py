@@ -0,0 +1,151 @@
+"""
+deltas.py  –  Incremental ingestion of new fiscal years and companies
+
+New data no longer needs a workbook edit and a full reload.  A delta – one
+fiscal year's EPS / prices, or a batch of newly covered companies – is stored
+under ``data/deltas`` and applied to the columnar cache in place:
+
+* the raw tables gain the new year column / company rows
+* only the (gsubind, year) median-P/E cells whose inputs moved are recomputed
+* only the company rows whose inputs moved are re-backtested; sub-industry
+  and global numbers are re-aggregated from the stored per-row results
+
+The cache's data version moves to ``<workbook hash>+<delta id>``, so the pages
+pick up the new year automatically.  A later workbook rebuild replays every
+stored delta, so nothing is lost when the cache is wiped.
+
+From the command line (CSV files, one row per ticker)::
+
+    python -m workbench.deltas year 2025 fy2025.csv      # Ticker,EPS,Price[,Actual Price]
+    python -m workbench.deltas companies new.csv         # Company Dta columns [+ EPS/Price years]
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from workbench import backtest_store, ingest
+from workbench.median_pe import recompute_cells
+
+
+def _long_values(table, frame):
+    """(Ticker × year) frame → long delta rows for ``table``."""
+    frame = frame.copy()
+    frame.index = frame.index.astype(str).rename("Ticker")
+    frame.columns = [int(c) for c in frame.columns]
+    long = frame.stack().dropna().rename("value").reset_index()
+    long.columns = ["Ticker", "year", "value"]
+    long.insert(1, "table", table)
+    return long
+
+
+def apply(companies=None, values=None, workbook=ingest.WORKBOOK_PATH,
+          cache_dir=ingest.CACHE_DIR, delta_dir=ingest.DELTA_DIR,
+          store_dir=backtest_store.STORE_DIR):
+    """Store a delta and fold it into the cache; return the new data version.
+
+    ``values`` is a long frame with ``Ticker``, ``table`` (``eps``, ``price``
+    or ``actual_price``), ``year`` and ``value`` columns; ``companies`` holds
+    new or changed Company Dta rows.
+    """
+    meta = ingest.cached_meta(workbook, cache_dir, delta_dir)
+    if meta is None:
+        ingest.build_cache(workbook, cache_dir, delta_dir)
+        meta = ingest.cached_meta(workbook, cache_dir, delta_dir)
+    tables = ingest.read_cache(cache_dir)
+
+    if values is None:
+        values = pd.DataFrame(columns=["Ticker", "table", "year", "value"])
+    values = values.astype({"Ticker": str, "table": str, "year": int, "value": float})
+    # validate before anything touches disk
+    tables, changes = ingest.merge_delta(tables, companies, values)
+    delta_id = ingest.write_delta(companies, values, delta_dir)
+
+    company = tables["company"]
+    tables["median_pe"] = recompute_cells(
+        tables["median_pe"], tables["eps"], tables["price"], company["gsubind"], changes["cells"]
+    )
+
+    deltas = meta["deltas"] + [delta_id]
+    meta = {**meta, "deltas": deltas, "data_version": ingest.data_version_for(meta["sha256"], deltas)}
+    ingest.write_tables(tables, meta, cache_dir)
+
+    # Re-backtest the rows whose own inputs or peer median moved
+    rows = set(changes["rows"])
+    touched_codes = {code for code, _ in changes["cells"]}
+    rows.update(np.flatnonzero(company["gsubind"].isin(touched_codes).to_numpy()).tolist())
+    backtest_store.update_store(meta["data_version"], rows, cache_dir, store_dir)
+    return meta["data_version"]
+
+
+def append_year(year, eps, price, actual_price=None, **kwargs):
+    """Add (or correct) one fiscal year.
+
+    ``eps``, ``price`` and ``actual_price`` map ticker → value (dict or
+    Series); tickers must already be in the universe.
+    """
+    parts = [
+        _long_values(name, pd.Series(data, dtype=float).to_frame(year))
+        for name, data in (("eps", eps), ("price", price), ("actual_price", actual_price))
+        if data is not None
+    ]
+    return apply(values=pd.concat(parts, ignore_index=True), **kwargs)
+
+
+def append_companies(companies, eps=None, price=None, actual_price=None, **kwargs):
+    """Add new companies (or update existing ones' Company Dta fields).
+
+    ``eps``, ``price`` and ``actual_price`` are optional (Ticker × year)
+    frames with the new companies' history.
+    """
+    parts = [
+        _long_values(name, frame)
+        for name, frame in (("eps", eps), ("price", price), ("actual_price", actual_price))
+        if frame is not None
+    ]
+    values = pd.concat(parts, ignore_index=True) if parts else None
+    return apply(companies=companies, values=values, **kwargs)
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def _year_frames(frame, label):
+    """``EPS 2023``-style columns of a CSV → (Ticker × year) frame or None."""
+    cols = {c: int(c.split()[-1]) for c in frame.columns if c.startswith(f"{label} ") and c.split()[-1].isdigit()}
+    if not cols:
+        return None
+    return frame.set_index("Ticker")[list(cols)].rename(columns=cols)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Append data to the workbench universe.")
+    sub = parser.add_subparsers(dest="kind", required=True)
+    year_cmd = sub.add_parser("year", help="add one fiscal year (Ticker,EPS,Price[,Actual Price])")
+    year_cmd.add_argument("year", type=int)
+    year_cmd.add_argument("csv")
+    companies_cmd = sub.add_parser("companies", help="add companies (Company Dta columns, "
+                                                     "optional 'EPS <year>' / 'Price <year>' columns)")
+    companies_cmd.add_argument("csv")
+    args = parser.parse_args(argv)
+
+    frame = pd.read_csv(args.csv, dtype={"Ticker": str})
+    if args.kind == "year":
+        frame = frame.set_index("Ticker")
+        version = append_year(
+            args.year,
+            frame["EPS"],
+            frame["Price"],
+            frame["Actual Price"] if "Actual Price" in frame else None,
+        )
+    else:
+        version = append_companies(
+            frame[[c for c in ingest.COMPANY_COLUMNS if c in frame]],
+            eps=_year_frames(frame, "EPS"),
+            price=_year_frames(frame, "Price"),
+            actual_price=_year_frames(frame, "Actual Price"),
+        )
+    print(f"Applied {args.csv} → data version {version}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+diagnostics.py  –  Timing spans, external-call counters and cache hit rates
+
+Lightweight instrumentation for the hot paths of a page render:
+
+* ``span(name)``          – times a section of the current rerun (context
+                            manager or decorator); spans nest by name
+* ``external(service)``   – times one call to Yahoo / Clearbit and counts
+                            errors and rate-limit hits per service
+* ``cached(decorator)``   – wraps ``st.cache_data`` / ``st.cache_resource``
+                            so lookups and misses (body executions) are counted
+
+Counters are process-wide and thread-safe, and include background
+revalidation.  A page calls ``begin_rerun`` at the top and ``end_rerun`` at
+the bottom; the latter returns the rerun's spans plus the calls and cache
+lookups made by that rerun alone – tallied through a context variable, so
+other sessions' reruns running at the same time don't leak in.  Work handed
+to a thread pool is attributed only if submitted through ``in_context``.
+The report is logged as one JSON line on the ``workbench.metrics`` logger at
+INFO (external calls at DEBUG); the logger has no handler of its own unless
+``WORKBENCH_METRICS_LOG`` names a file to append those JSON lines to.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from yfinance.exceptions import YFRateLimitError
+
+
+log = logging.getLogger("workbench.metrics")
+
+METRICS_LOG = os.environ.get("WORKBENCH_METRICS_LOG")
+LATENCY_WINDOW = 200        # latencies kept per service for the percentiles
+
+log.setLevel(logging.INFO)
+if METRICS_LOG:
+    _handler = logging.FileHandler(METRICS_LOG)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(_handler)
+
+
+def _emit(level, event, **fields):
+    if log.isEnabledFor(level):
+        log.log(level, json.dumps({"event": event, "ts": round(time.time(), 3), **fields}, default=str))
+
+
+def is_rate_limit(exc):
+    if isinstance(exc, YFRateLimitError):
+        return True
+    response = getattr(exc, "response", None)
+    return getattr(response, "status_code", None) == 429
+
+
+# ─── Process-wide counters ───────────────────────────────────────────────────
+_rerun = contextvars.ContextVar("workbench_rerun", default=None)
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(lambda: {"count": 0, "errors": 0, "rate_limited": 0, "seconds": 0.0})
+        self._latencies = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self._cache = defaultdict(lambda: {"lookups": 0, "misses": 0})
+
+    def record_call(self, service, seconds, error=None):
+        rerun = _rerun.get()
+        with self._lock:
+            for calls in (self._calls, rerun["calls"]) if rerun else (self._calls,):
+                entry = calls[service]
+                entry["count"] += 1
+                entry["seconds"] += seconds
+                if error is not None:
+                    entry["errors"] += 1
+                    entry["rate_limited"] += is_rate_limit(error)
+            self._latencies[service].append(seconds)
+
+    def record_cache(self, name, miss):
+        rerun = _rerun.get()
+        with self._lock:
+            self._cache[name]["misses" if miss else "lookups"] += 1
+            if rerun:
+                rerun["cache"][name]["misses" if miss else "lookups"] += 1
+
+    def snapshot(self):
+        """Copies of ``{"calls": {service: …}, "cache": {name: …}}``."""
+        with self._lock:
+            calls = {}
+            for service, entry in self._calls.items():
+                latencies = sorted(self._latencies[service])
+                calls[service] = {
+                    **entry,
+                    "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else None,
+                    "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else None,
+                }
+            cache = {name: dict(entry) for name, entry in self._cache.items()}
+        return {"calls": calls, "cache": cache}
+
+
+metrics = Metrics()
+
+
+def cache_table(snapshot):
+    """``{name: {lookups, hits, misses, hit_rate}}`` from a snapshot."""
+    table = {}
+    for name, entry in snapshot["cache"].items():
+        hits = max(entry["lookups"] - entry["misses"], 0)
+        table[name] = {
+            "lookups": entry["lookups"],
+            "hits": hits,
+            "misses": entry["misses"],
+            "hit_rate": hits / entry["lookups"] * 100 if entry["lookups"] else None,
+        }
+    return table
+
+
+# ─── Instrumentation ─────────────────────────────────────────────────────────
+def in_context(func):
+    """``func`` bound to the caller's context, for ``executor.submit``.
+
+    Pool threads don't inherit the submitting thread's context, so without
+    this their calls count process-wide but not towards the current rerun.
+    """
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+@contextmanager
+def external(service):
+    """Time one external call; exceptions are counted and re-raised."""
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.record_call(service, seconds, error)
+        if error is not None and is_rate_limit(error):
+            _emit(logging.WARNING, "rate_limited", service=service)
+        _emit(logging.DEBUG, "external_call", service=service, ms=round(seconds * 1000, 1),
+              error=type(error).__name__ if error is not None else None)
+
+
+@contextmanager
+def span(name):
+    """Time a section of the current rerun (a no-op outside one and on pool threads)."""
+    rerun = _rerun.get()
+    if rerun is None or rerun["thread"] != threading.get_ident():
+        yield
+        return
+    path = "/".join([*rerun["stack"], name])
+    rerun["stack"].append(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        rerun["stack"].pop()
+        rerun["spans"].append({"name": path, "ms": round((time.perf_counter() - started) * 1000, 2)})
+
+
+def cached(cache_decorator):
+    """Apply a Streamlit cache decorator and count lookups / misses.
+
+    Usage: ``@diagnostics.cached(st.cache_data(ttl=60))`` instead of
+    ``@st.cache_data(ttl=60)``.  The cached function keeps ``.clear()``.
+    """
+    def wrap(func):
+        name = func.__name__
+
+        @functools.wraps(func)
+        def body(*args, **kwargs):
+            metrics.record_cache(name, miss=True)
+            return func(*args, **kwargs)
+
+        cached_body = cache_decorator(body)
+
+        @functools.wraps(func)
+        def lookup(*args, **kwargs):
+            metrics.record_cache(name, miss=False)
+            with span(name):
+                return cached_body(*args, **kwargs)
+
+        lookup.clear = cached_body.clear
+        return lookup
+    return wrap
+
+
+# ─── Reruns ──────────────────────────────────────────────────────────────────
+def begin_rerun(**context):
+    """Start collecting spans and counters for the script run on this thread."""
+    _rerun.set({
+        "context": context,
+        "thread": threading.get_ident(),
+        "started": time.perf_counter(),
+        "calls": defaultdict(lambda: {"count": 0, "errors": 0, "rate_limited": 0, "seconds": 0.0}),
+        "cache": defaultdict(lambda: {"lookups": 0, "misses": 0}),
+        "spans": [],
+        "stack": [],
+    })
+
+
+def end_rerun(**context):
+    """Finish the rerun, log it as JSON and return the report (None if none).
+
+    ``context`` adds to what was passed to ``begin_rerun`` (tab, ticker, …).
+    """
+    rerun = _rerun.get()
+    if rerun is None:
+        return None
+    _rerun.set(None)
+    with metrics._lock:
+        calls = {name: dict(entry) for name, entry in rerun["calls"].items()}
+        cache = {name: dict(entry) for name, entry in rerun["cache"].items()}
+    report = {
+        **rerun["context"],
+        **context,
+        "ms": round((time.perf_counter() - rerun["started"]) * 1000, 2),
+        "spans": rerun["spans"],
+        "calls": calls,
+        "cache": cache,
+    }
+    _emit(logging.INFO, "rerun", **report)
+    return report
@@ -0,0 +1,427 @@
+"""
+ingest.py  –  Columnar cache for the master workbook
+
+The two sheets we use ("Company Dta" and "Analysis") are parsed once and
+stored as Parquet files under ``data/.cache``.  The sub-industry median P/E
+table is derived from the Company Dta EPS / price blocks (see
+``workbench.median_pe``) rather than read from the "Median PE" sheet.  A small
+``meta.json`` records the workbook's mtime, size and SHA-256 so the cache
+rebuilds itself automatically whenever the workbook changes.
+
+Year columns and block positions are read from the sheets' header rows, so a
+workbook with an extra fiscal year needs no code change.  Company Dta's
+descriptive columns are picked by their header names (a missing one is an
+error); any further columns are kept, with other year blocks such as
+"P/E Ratio" flattened to ``"P/E Ratio 2010"``-style names.  Data that arrives
+between workbook releases (a new year's EPS / prices, newly covered
+companies) is kept as delta files under ``data/deltas`` and layered on top of
+the workbook – see ``workbench.deltas``.
+
+Run ``python -m workbench.ingest`` to (re)build the cache ahead of time.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from workbench.median_pe import derive_median_pe
+
+
+# ─── Paths & schema ──────────────────────────────────────────────────────────
+WORKBOOK_PATH = Path("data/Master data price eps etc.xlsx")
+CACHE_DIR = Path("data/.cache")
+DELTA_DIR = Path("data/deltas")
+SCHEMA_VERSION = 5
+
+COMPANY_COLUMNS = [
+    "Ticker",
+    "conm",
+    "gsubind",
+    "Industry",
+    "sic",
+    "Mkt cap (USD Bn)",
+    "gind",
+    "gsector",
+    "naics",
+]
+NUMERIC_COMPANY_COLUMNS = [c for c in COMPANY_COLUMNS if c not in ("Ticker", "conm", "Industry")]
+TABLES = ("company", "eps", "price", "median_pe", "actual_price")
+VALUE_TABLES = ("eps", "price", "actual_price")
+
+
+# ─── Fingerprinting ──────────────────────────────────────────────────────────
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _stat_key(path):
+    st = os.stat(path)
+    return {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+
+
+def _read_meta(cache_dir):
+    try:
+        with open(Path(cache_dir) / "meta.json", "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json_atomic(path, payload):
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp, path)
+
+
+def data_version_for(sha, deltas):
+    """Workbook hash prefix, plus the latest delta id once any are applied."""
+    return f"{sha[:12]}+{deltas[-1]}" if deltas else sha[:12]
+
+
+def cached_meta(workbook=WORKBOOK_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR):
+    """Return the cache metadata if it matches ``workbook``, else None.
+
+    A matching mtime/size is trusted as-is; otherwise the workbook is hashed
+    so that a touched-but-unchanged file does not force a rebuild.  The cache
+    must also have applied exactly the deltas present in ``delta_dir``.
+    """
+    meta = _read_meta(cache_dir)
+    if not meta or meta.get("schema_version") != SCHEMA_VERSION:
+        return None
+    if meta.get("deltas") != delta_ids(delta_dir):
+        return None
+    if not all((Path(cache_dir) / f"{name}.parquet").exists() for name in TABLES):
+        return None
+
+    stat_key = _stat_key(workbook)
+    if meta.get("mtime_ns") == stat_key["mtime_ns"] and meta.get("size") == stat_key["size"]:
+        return meta
+
+    if meta.get("sha256") == file_sha256(workbook):
+        meta.update(stat_key)
+        _write_json_atomic(Path(cache_dir) / "meta.json", meta)
+        return meta
+    return None
+
+
+# ─── Workbook parsing ────────────────────────────────────────────────────────
+def _as_year(value):
+    if hasattr(value, "year"):
+        return int(value.year)
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _year_block(sheet, label_row, year_row, label):
+    """Column positions and fiscal years of the block headed ``label``.
+
+    A block runs from its label to the next label on ``label_row``; only the
+    columns whose ``year_row`` cell holds a year (or a year-end date) count.
+    """
+    labels = sheet.iloc[label_row].ffill()
+    positions, years = [], []
+    for pos in np.flatnonzero((labels == label).to_numpy()):
+        year = _as_year(sheet.iat[year_row, pos])
+        if year is not None:
+            positions.append(pos)
+            years.append(year)
+    if not positions:
+        raise ValueError(f"No {label!r} year columns found in the workbook")
+    return positions, years
+
+
+def _company_frame(sheet, label_row, header_row, skip):
+    """Company Dta's non-EPS/Price columns, selected by their header names.
+
+    The ``COMPANY_COLUMNS`` come first; every other column is kept after
+    them – columns of a year block under their label and year, the rest
+    under their own header.  ``skip`` holds the EPS / Price positions.
+    """
+    headers = sheet.iloc[header_row]
+    labels = sheet.iloc[label_row].ffill()
+    body = sheet.iloc[header_row + 1:].reset_index(drop=True)
+
+    names = {}
+    for pos, header in enumerate(headers):
+        if pos in skip or pd.isna(header):
+            continue
+        year = _as_year(header) if not isinstance(header, str) else None
+        name = f"{labels.iat[pos]} {year}" if year is not None and pd.notna(labels.iat[pos]) else str(header).strip()
+        names.setdefault(name, pos)
+
+    missing = [c for c in COMPANY_COLUMNS if c not in names]
+    if missing:
+        raise ValueError(f"Company Dta is missing the expected header(s) {missing} on row {header_row}")
+    extra = [n for n in names if n not in COMPANY_COLUMNS]
+    columns = COMPANY_COLUMNS + extra
+
+    company = pd.DataFrame({name: body.iloc[:, names[name]].to_numpy() for name in columns}, columns=columns)
+    for col in ("Ticker", "conm", "Industry"):
+        company[col] = company[col].astype("string")       # a blank cell stays NA, not "nan"
+    for col in NUMERIC_COMPANY_COLUMNS:
+        company[col] = pd.to_numeric(company[col], errors="coerce")
+    for col in extra:
+        numeric = pd.to_numeric(company[col], errors="coerce")
+        # Numeric when every filled cell parses, text otherwise
+        filled = company[col].notna()
+        company[col] = numeric if numeric[filled].notna().all() else company[col].astype("string")
+    return company
+
+
+def parse_workbook(workbook=WORKBOOK_PATH):
+    """Parse the workbook into tidy frames (one pass over the file)."""
+    with pd.ExcelFile(workbook) as xls:
+        # Company Dta sheet: block labels on row 0, year-end dates on row 3
+        df = pd.read_excel(xls, sheet_name="Company Dta", header=None)
+        eps_cols, eps_years = _year_block(df, 0, 3, "EPS")
+        price_cols, price_years = _year_block(df, 0, 3, "Price")
+        company_raw = df.iloc[4:].reset_index(drop=True)
+        company = _company_frame(df, 0, 3, set(eps_cols) | set(price_cols))
+
+        # EPS & Price blocks
+        eps = company_raw.iloc[:, eps_cols].apply(pd.to_numeric, errors="coerce")
+        price = company_raw.iloc[:, price_cols].apply(pd.to_numeric, errors="coerce")
+        eps.columns = eps_years
+        price.columns = price_years
+
+        # Analysis sheet → actual prices (labels on row 3, years on row 4)
+        analysis = pd.read_excel(xls, sheet_name="Analysis", header=None)
+        actual_cols, actual_years = _year_block(analysis, 3, 4, "Actual Price")
+        analysis = analysis.iloc[5:].reset_index(drop=True)
+        actual_price = analysis.iloc[:, actual_cols].apply(pd.to_numeric, errors="coerce")
+        actual_price.columns = actual_years
+        actual_price.index = analysis.iloc[:, 0].astype(str).rename("Ticker")
+
+    # Every value table shares one year axis (the union, ascending)
+    years = sorted(set(eps_years) | set(price_years) | set(actual_years))
+    eps, price, actual_price = (f.reindex(columns=years) for f in (eps, price, actual_price))
+
+    return {
+        "company": company,
+        "eps": eps,
+        "price": price,
+        "median_pe": derive_median_pe(eps, price, company["gsubind"]),
+        "actual_price": actual_price,
+    }
+
+
+# ─── Deltas ──────────────────────────────────────────────────────────────────
+# A delta is ``<id>.values.parquet`` – long rows of (Ticker, table, year, value)
+# with ``table`` one of VALUE_TABLES – plus an optional
+# ``<id>.companies.parquet`` with new or changed Company Dta rows.  Ids are
+# zero-padded sequence numbers, applied in order; later values win.
+def delta_ids(delta_dir=DELTA_DIR):
+    return sorted(p.name.split(".")[0] for p in Path(delta_dir).glob("*.values.parquet"))
+
+
+def write_delta(companies, values, delta_dir=DELTA_DIR):
+    """Persist a delta and return its id."""
+    delta_dir = Path(delta_dir)
+    delta_dir.mkdir(parents=True, exist_ok=True)
+    existing = delta_ids(delta_dir)
+    delta_id = f"{int(existing[-1]) + 1 if existing else 1:04d}"
+    if companies is not None and len(companies):
+        companies.to_parquet(delta_dir / f"{delta_id}.companies.parquet", index=False)
+    # the values file marks the delta as complete, so it goes last
+    tmp = delta_dir / f"{delta_id}.values.parquet.tmp"
+    values.to_parquet(tmp, index=False)
+    os.replace(tmp, delta_dir / f"{delta_id}.values.parquet")
+    return delta_id
+
+
+def read_delta(delta_id, delta_dir=DELTA_DIR):
+    """``(companies or None, values)`` of one stored delta."""
+    delta_dir = Path(delta_dir)
+    companies_path = delta_dir / f"{delta_id}.companies.parquet"
+    companies = pd.read_parquet(companies_path) if companies_path.exists() else None
+    return companies, pd.read_parquet(delta_dir / f"{delta_id}.values.parquet")
+
+
+def _normalise_companies(companies):
+    companies = companies.reindex(columns=COMPANY_COLUMNS).copy()
+    for col in ("Ticker", "conm", "Industry"):
+        companies[col] = companies[col].astype(str)
+    for col in NUMERIC_COMPANY_COLUMNS:
+        companies[col] = pd.to_numeric(companies[col], errors="coerce")
+    return companies.drop_duplicates("Ticker", keep="last").reset_index(drop=True)
+
+
+def _first_rows(tickers):
+    """``{ticker: first company row id}``, as the page resolves tickers."""
+    tickers = pd.Series(np.asarray(tickers))
+    return dict(zip(tickers[~tickers.duplicated()], np.flatnonzero(~tickers.duplicated())))
+
+
+def merge_delta(tables, companies=None, values=None):
+    """Apply one delta to the raw tables (everything but ``median_pe``).
+
+    Returns ``(tables, changes)`` where ``changes`` holds
+
+    * ``rows``      – company rows whose own EPS / price / actual price or
+                      sub-industry changed, or that are new
+    * ``cells``     – ``(gsubind, year)`` median-P/E cells whose inputs moved
+    * ``new_years`` – fiscal years the delta added to the year axis
+    """
+    company = tables["company"].copy()
+    eps, price, actual = tables["eps"], tables["price"], tables["actual_price"]
+    old_years = list(eps.columns)
+    old_codes = company["gsubind"].to_numpy().copy()    # not a view the updates below write through
+    rows, cells = set(), set()
+
+    # New or changed companies
+    if companies is not None and len(companies):
+        companies = _normalise_companies(companies)
+        row_of = _first_rows(company["Ticker"])
+        known = companies["Ticker"].isin(row_of.keys()).to_numpy()
+        if known.any():
+            changed = companies[known]
+            target = changed["Ticker"].map(row_of).to_numpy()
+            for col in COMPANY_COLUMNS:
+                company.loc[target, col] = changed[col].to_numpy()
+        added = companies[~known]
+        if len(added):
+            start = len(company)
+            company = pd.concat([company, added], ignore_index=True)
+            blank = pd.DataFrame(np.nan, index=range(start, len(company)), columns=old_years)
+            eps, price = pd.concat([eps, blank]), pd.concat([price, blank])
+            rows.update(range(start, len(company)))
+
+    # Sub-industry moves touch every year of the old and the new group
+    codes = company["gsubind"].to_numpy()
+    for row in np.flatnonzero(codes[:len(old_codes)] != old_codes):
+        rows.add(int(row))
+        cells.update((code, year) for code in (old_codes[row], codes[row]) for year in old_years)
+
+    # Extend the shared year axis
+    values = values if values is not None else pd.DataFrame(columns=["Ticker", "table", "year", "value"])
+    years = sorted(set(old_years) | {int(y) for y in values["year"]})
+    new_years = [y for y in years if y not in old_years]
+    eps, price, actual = (f.reindex(columns=years) for f in (eps, price, actual))
+    cells.update((code, year) for code in set(codes) for year in new_years)
+
+    unknown = set(values["table"]) - set(VALUE_TABLES)
+    if unknown:
+        raise ValueError(f"Unknown delta table(s): {sorted(unknown)}")
+
+    row_of = _first_rows(company["Ticker"])
+    frames = {"eps": eps, "price": price}
+    for (table, year), group in values.groupby(["table", "year"]):
+        year = int(year)
+        tickers = group["Ticker"].astype(str)
+        if table == "actual_price":
+            missing = tickers[~tickers.isin(actual.index)].unique()
+            if len(missing):
+                actual = pd.concat([actual, pd.DataFrame(np.nan, index=pd.Index(missing, name="Ticker"), columns=years)])
+            actual.loc[tickers.to_numpy(), year] = group["value"].to_numpy(dtype=float)
+            rows.update(np.flatnonzero(company["Ticker"].isin(tickers).to_numpy()).tolist())
+            continue
+
+        target = tickers.map(row_of)
+        if target.isna().any():
+            raise ValueError(
+                f"Unknown ticker(s) {sorted(tickers[target.isna()].unique())}; "
+                "add them as companies first"
+            )
+        target = target.to_numpy(dtype=int)
+        frames[table].loc[target, year] = group["value"].to_numpy(dtype=float)
+        rows.update(target.tolist())
+        cells.update((codes[row], year) for row in target)
+
+    tables = {
+        **tables,
+        "company": company,
+        "eps": frames["eps"],
+        "price": frames["price"],
+        "actual_price": actual,
+    }
+    return tables, {"rows": rows, "cells": cells, "new_years": new_years}
+
+
+# ─── Parquet round trip ──────────────────────────────────────────────────────
+# Parquet wants string column names, so year columns are stored as "2010" etc.
+def _to_parquet(frame, path):
+    out = frame.copy()
+    out.columns = [str(c) for c in out.columns]
+    tmp = Path(f"{path}.tmp")
+    out.to_parquet(tmp)
+    os.replace(tmp, path)
+
+
+def _from_parquet(path):
+    frame = pd.read_parquet(path)
+    frame.columns = [int(c) if c.isdigit() else c for c in frame.columns]
+    return frame
+
+
+def write_tables(tables, meta, cache_dir=CACHE_DIR, names=TABLES):
+    """Write ``names`` from ``tables`` and then ``meta`` into the cache."""
+    cache_dir = Path(cache_dir)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        _to_parquet(tables[name], cache_dir / f"{name}.parquet")
+    # meta.json is written last so a half-built cache is never trusted
+    _write_json_atomic(cache_dir / "meta.json", meta)
+    return meta
+
+
+def build_cache(workbook=WORKBOOK_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR):
+    """Parse ``workbook``, replay the stored deltas and (re)write the cache."""
+    sha = file_sha256(workbook)
+    tables = parse_workbook(workbook)
+    deltas = delta_ids(delta_dir)
+    if deltas:
+        for delta_id in deltas:
+            tables, _ = merge_delta(tables, *read_delta(delta_id, delta_dir))
+        company = tables["company"]
+        tables["median_pe"] = derive_median_pe(tables["eps"], tables["price"], company["gsubind"])
+
+    meta = {
+        "schema_version": SCHEMA_VERSION,
+        "workbook": str(workbook),
+        "sha256": sha,
+        "deltas": deltas,
+        "data_version": data_version_for(sha, deltas),
+        **_stat_key(workbook),
+    }
+    return write_tables(tables, meta, cache_dir)
+
+
+def ensure_cache(workbook=WORKBOOK_PATH, cache_dir=CACHE_DIR, delta_dir=DELTA_DIR):
+    """Make sure the cache matches the workbook; return its data version."""
+    meta = cached_meta(workbook, cache_dir, delta_dir)
+    if meta is None:
+        meta = build_cache(workbook, cache_dir, delta_dir)
+    return meta["data_version"]
+
+
+def read_cache(cache_dir=CACHE_DIR):
+    cache_dir = Path(cache_dir)
+    return {name: _from_parquet(cache_dir / f"{name}.parquet") for name in TABLES}
+
+
+def median_pe_lookup(median_pe):
+    """``{gsubind: array of median P/E by year}`` from the median_pe table."""
+    year_cols = [c for c in median_pe.columns if c != "gsubind"]
+    return dict(zip(median_pe["gsubind"], median_pe[year_cols].to_numpy()))
+
+
+def load_tables(workbook=WORKBOOK_PATH, cache_dir=CACHE_DIR):
+    """Return the parsed workbook tables, rebuilding the cache if stale."""
+    ensure_cache(workbook, cache_dir)
+    return read_cache(cache_dir)
+
+
+if __name__ == "__main__":
+    meta = build_cache()
+    print(f"Cached {WORKBOOK_PATH} → {CACHE_DIR} (data version {meta['data_version']})")
@@ -0,0 +1,123 @@
+"""
+intraday.py  –  Incrementally polled 5-minute bars for the live "1 Day" chart
+
+One ``IntradayFeed`` per ticker is shared by every session in the process.  A
+poll asks Yahoo only for the bars since the last one received (that last bar
+is re-fetched because it may still have been forming) and appends them to
+the in-memory series; polls closer together than the interval are answered
+from memory.  A 5-minute bar only appears every few polls, so the feed backs
+off only after ``IDLE_POLLS`` empty polls in a row – outside market hours –
+doubling the interval up to ``MAX_POLL_SECONDS``; the next bar drops it back.
+At most ``MAX_FEEDS`` tickers are kept, least recently used first out.
+
+Configuration (environment variables):
+
+* ``WORKBENCH_INTRADAY_POLL``     – base poll interval in seconds (default 60)
+* ``WORKBENCH_INTRADAY_MAX_POLL`` – idle back-off ceiling in seconds
+                                    (default 900)
+* ``WORKBENCH_INTRADAY_IDLE``     – empty polls in a row before backing off
+                                    (default 6, over one bar at 60 s)
+* ``WORKBENCH_INTRADAY_FEEDS``    – tickers kept in memory (default 64)
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+import yfinance as yf
+
+from workbench import diagnostics
+
+
+log = logging.getLogger(__name__)
+
+INTERVAL = "5m"
+POLL_SECONDS = float(os.environ.get("WORKBENCH_INTRADAY_POLL", 60))
+MAX_POLL_SECONDS = float(os.environ.get("WORKBENCH_INTRADAY_MAX_POLL", 900))
+IDLE_POLLS = int(os.environ.get("WORKBENCH_INTRADAY_IDLE", 6))
+MAX_FEEDS = int(os.environ.get("WORKBENCH_INTRADAY_FEEDS", 64))
+
+
+def _download(ticker, start=None):
+    tkr = yf.Ticker(ticker)
+    with diagnostics.external("yahoo.intraday"):
+        if start is None:
+            return tkr.history(period="1d", interval=INTERVAL)
+        return tkr.history(start=start, interval=INTERVAL)
+
+
+class IntradayFeed:
+    """Latest session's 5-minute bars for one ticker, extended on each poll."""
+
+    def __init__(self, ticker, fetch=_download, poll_seconds=POLL_SECONDS,
+                 max_poll_seconds=MAX_POLL_SECONDS, idle_polls=IDLE_POLLS):
+        self.ticker = ticker.upper()
+        self.bars = pd.DataFrame()
+        self.poll_seconds = poll_seconds
+        self.max_poll_seconds = max_poll_seconds
+        self.idle_polls = idle_polls
+        self._fetch = fetch
+        self._interval = poll_seconds
+        self._empty_polls = 0
+        self._polled_at = 0.0
+        self._lock = threading.Lock()
+
+    def _merge(self, fresh):
+        if self.bars.empty:
+            return fresh, len(fresh)
+        last = self.bars.index[-1]
+        added = int((fresh.index > last).sum())
+        bars = pd.concat([self.bars[self.bars.index < fresh.index.min()], fresh])
+        # keep only the most recent session
+        day = bars.index[-1].normalize()
+        return bars[bars.index.normalize() == day], added
+
+    def poll(self, force=False):
+        """Return ``(bars, n_new)``; hits Yahoo at most once per interval.
+
+        Fetch errors are raised only while there are no bars to show.
+        """
+        with self._lock:
+            if not force and time.time() - self._polled_at < self._interval:
+                return self.bars, 0
+            self._polled_at = time.time()
+            start = None if self.bars.empty else self.bars.index[-1]
+            try:
+                fresh = self._fetch(self.ticker, start)
+            except Exception as e:
+                if self.bars.empty:
+                    raise
+                log.warning("Intraday poll for %s failed: %s", self.ticker, e)
+                return self.bars, 0
+
+            added = 0
+            if not fresh.empty:
+                self.bars, added = self._merge(fresh)
+            elif self.bars.empty:
+                self.bars = fresh       # keep the (empty) columns for the chart
+            self._empty_polls = 0 if added else self._empty_polls + 1
+            if self._empty_polls < self.idle_polls:
+                self._interval = self.poll_seconds
+            else:
+                self._interval = min(self._interval * 2, self.max_poll_seconds)
+            return self.bars, added
+
+
+_feeds = OrderedDict()      # ticker → IntradayFeed, least recently used first
+_feeds_lock = threading.Lock()
+
+
+def get_feed(ticker):
+    ticker = ticker.upper()
+    with _feeds_lock:
+        feed = _feeds.get(ticker)
+        if feed is None:
+            feed = _feeds[ticker] = IntradayFeed(ticker)
+            while len(_feeds) > MAX_FEEDS:
+                _feeds.popitem(last=False)
+        else:
+            _feeds.move_to_end(ticker)
+        return feed
@@ -0,0 +1,291 @@
+"""
+market_data.py  –  Shared, TTL-cached Yahoo Finance profile/quote layer
+
+``yf.Ticker(t).info`` is fetched at most once per TTL per ticker and shared by
+every tab and every session in the process.  Entries are optionally backed by
+SQLite so a restart does not trigger a burst of refetches.
+
+Stale-while-revalidate: once an entry is older than the TTL it is still
+served immediately while a background thread refreshes it.  If Yahoo answers
+with ``YFRateLimitError`` (or any other error) the last good value is kept.
+
+Configuration (environment variables):
+
+* ``WORKBENCH_INFO_TTL``  – freshness window in seconds (default 600)
+* ``WORKBENCH_INFO_DB``   – SQLite file for the on-disk copy
+                            (default ``data/.cache/market_data.sqlite``;
+                            set to an empty string to keep it in memory only)
+* ``WORKBENCH_QUOTE_TTL`` – how long a bulk-fetched quote counts as current
+                            (default 300)
+
+Besides full profiles, a lighter ``ticker → quote`` cache holds the price
+snapshots filled in bulk by ``workbench.bulk_quotes`` (and by every profile
+fetch), so pages needing prices for a whole peer group read them from here.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import urllib.parse
+from pathlib import Path
+
+import yfinance as yf
+
+from workbench import diagnostics
+
+
+log = logging.getLogger(__name__)
+
+INFO_TTL = float(os.environ.get("WORKBENCH_INFO_TTL", 600))
+INFO_DB_PATH = os.environ.get("WORKBENCH_INFO_DB", "data/.cache/market_data.sqlite")
+# After a failed fetch with nothing to fall back on, wait this long before
+# asking Yahoo again so three tabs don't triple a rate-limit hit.
+ERROR_COOLDOWN = 30.0
+QUOTE_TTL = float(os.environ.get("WORKBENCH_QUOTE_TTL", 300))
+
+
+# ─── SQLite backing ──────────────────────────────────────────────────────────
+class _SQLiteStore:
+    def __init__(self, path, table="info"):
+        self.path = Path(path)
+        self.table = table
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                " ticker TEXT PRIMARY KEY, fetched_at REAL, payload TEXT)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def get(self, ticker):
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT fetched_at, payload FROM {self.table} WHERE ticker = ?", (ticker,)
+            ).fetchone()
+        return (row[0], json.loads(row[1])) if row else None
+
+    def get_all(self):
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT ticker, fetched_at, payload FROM {self.table}")
+            return {t: (ts, json.loads(p)) for t, ts, p in rows}
+
+    def put(self, ticker, fetched_at, info):
+        self.put_many([(ticker, fetched_at, info)])
+
+    def put_many(self, entries):
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} VALUES (?, ?, ?)",
+                [(t, ts, json.dumps(p, default=str)) for t, ts, p in entries],
+            )
+
+
+# ─── Cache ───────────────────────────────────────────────────────────────────
+class InfoCache:
+    """Process-wide ``ticker → info`` cache with TTL and stale-while-revalidate."""
+
+    def __init__(self, ttl=INFO_TTL, db_path=INFO_DB_PATH, fetch=None):
+        self.ttl = ttl
+        self._fetch = fetch or _fetch_profile
+        self._entries = {}          # ticker → (fetched_at, info)
+        self._failures = {}         # ticker → (failed_at, exception)
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+        self._store = None
+        if db_path:
+            try:
+                self._store = _SQLiteStore(db_path)
+            except (OSError, sqlite3.Error) as e:
+                log.warning("Quote cache running without SQLite backing: %s", e)
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def _lookup(self, ticker):
+        entry = self._entries.get(ticker)
+        if entry is None and self._store is not None:
+            try:
+                entry = self._store.get(ticker)
+            except (sqlite3.Error, ValueError):
+                entry = None
+            if entry is not None:
+                self._entries[ticker] = entry
+        return entry
+
+    def _save(self, ticker, info):
+        entry = (time.time(), info)
+        self._entries[ticker] = entry
+        self._failures.pop(ticker, None)
+        if self._store is not None:
+            try:
+                self._store.put(ticker, *entry)
+            except sqlite3.Error as e:
+                log.warning("Could not persist info for %s: %s", ticker, e)
+        return entry
+
+    def _refresh(self, ticker):
+        try:
+            with self._ticker_lock(ticker):
+                self._save(ticker, self._fetch(ticker))
+        except Exception as e:  # keep serving the stale value
+            log.warning("Background refresh of %s failed: %s", ticker, e)
+            self._failures[ticker] = (time.time(), e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(ticker)
+
+    def _revalidate(self, ticker):
+        failure = self._failures.get(ticker)
+        if failure is not None and time.time() - failure[0] < ERROR_COOLDOWN:
+            return
+        with self._lock:
+            if ticker in self._refreshing:
+                return
+            self._refreshing.add(ticker)
+        threading.Thread(target=self._refresh, args=(ticker,), daemon=True).start()
+
+    def get(self, ticker):
+        """Return ``info`` for ``ticker``.
+
+        Raises the fetch error (e.g. ``YFRateLimitError``) only when there is
+        no previously fetched value to fall back on.
+        """
+        ticker = ticker.upper()
+        diagnostics.metrics.record_cache("info", miss=False)
+        entry = self._lookup(ticker)
+        if entry is not None:
+            if time.time() - entry[0] >= self.ttl:
+                self._revalidate(ticker)
+            return entry[1]
+
+        with self._ticker_lock(ticker):
+            # another session may have fetched it while we waited
+            entry = self._entries.get(ticker)
+            if entry is not None:
+                return entry[1]
+            failure = self._failures.get(ticker)
+            if failure is not None and time.time() - failure[0] < ERROR_COOLDOWN:
+                raise failure[1]
+            diagnostics.metrics.record_cache("info", miss=True)
+            try:
+                return self._save(ticker, self._fetch(ticker))[1]
+            except Exception as e:
+                self._failures[ticker] = (time.time(), e)
+                raise
+
+
+class QuoteCache:
+    """Process-wide ``ticker → quote`` snapshots (price, market cap, …)."""
+
+    def __init__(self, ttl=QUOTE_TTL, db_path=INFO_DB_PATH):
+        self.ttl = ttl
+        self._entries = {}          # ticker → (fetched_at, quote)
+        self._lock = threading.Lock()
+        self._store = None
+        if db_path:
+            try:
+                self._store = _SQLiteStore(db_path, table="quotes")
+                self._entries.update(self._store.get_all())
+            except (OSError, sqlite3.Error, ValueError) as e:
+                log.warning("Quote cache running without SQLite backing: %s", e)
+
+    def put_many(self, quotes, fetched_at=None):
+        fetched_at = fetched_at or time.time()
+        with self._lock:
+            for ticker, quote in quotes.items():
+                self._entries[ticker.upper()] = (fetched_at, quote)
+        if self._store is not None:
+            try:
+                self._store.put_many([(t.upper(), fetched_at, q) for t, q in quotes.items()])
+            except sqlite3.Error as e:
+                log.warning("Could not persist %d quotes: %s", len(quotes), e)
+
+    def get(self, ticker, max_age=None):
+        """Cached quote dict, or None if missing or older than ``max_age``."""
+        entry = self._entries.get(ticker.upper())
+        if entry is None:
+            return None
+        max_age = self.ttl if max_age is None else max_age
+        return entry[1] if time.time() - entry[0] < max_age else None
+
+    def get_many(self, tickers, max_age=None):
+        """``get`` for many tickers in one pass under the lock."""
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        with self._lock:
+            entries = [self._entries.get(t.upper()) for t in tickers]
+        return [None if e is None or now - e[0] >= max_age else e[1] for e in entries]
+
+    def missing(self, tickers, max_age=None):
+        """The subset of ``tickers`` without a current quote."""
+        return [t for t in tickers if self.get(t, max_age) is None]
+
+
+_default_cache = None
+_default_quotes = None
+_default_lock = threading.Lock()
+
+
+def _fetch_profile(ticker):
+    with diagnostics.external("yahoo.info"):
+        return yf.Ticker(ticker).info
+
+
+def _fetch_info(ticker):
+    info = _fetch_profile(ticker)
+    if info.get("regularMarketPrice") is not None:
+        default_quotes().put_many({ticker: quote_fields(info)})
+    return info
+
+
+def default_cache():
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = InfoCache(fetch=_fetch_info)
+        return _default_cache
+
+
+def default_quotes():
+    global _default_quotes
+    with _default_lock:
+        if _default_quotes is None:
+            _default_quotes = QuoteCache()
+        return _default_quotes
+
+
+def get_info(ticker):
+    return default_cache().get(ticker)
+
+
+def get_price(ticker, max_age=None):
+    """Last cached market price for ``ticker`` (no network), or None."""
+    quote = default_quotes().get(ticker, max_age)
+    return None if quote is None else quote.get("regularMarketPrice")
+
+
+def get_prices(tickers, max_age=None):
+    """``get_price`` for many tickers with a single cache lookup."""
+    quotes = default_quotes().get_many(tickers, max_age)
+    return [None if quote is None else quote.get("regularMarketPrice") for quote in quotes]
+
+
+# ─── Helpers ─────────────────────────────────────────────────────────────────
+QUOTE_FIELDS = ("regularMarketPrice", "regularMarketPreviousClose", "marketCap", "currency")
+
+
+def quote_fields(payload):
+    return {k: payload.get(k) for k in QUOTE_FIELDS}
+
+
+def logo_url(info):
+    """Logo from the profile, falling back to Clearbit on the website domain."""
+    domain = urllib.parse.urlparse(info.get("website", "")).netloc
+    return info.get("logo_url") or (f"https://logo.clearbit.com/{domain}" if domain else None)
@@ -0,0 +1,176 @@
+"""
+median_pe.py  –  Sub-industry "median" P/E derived from the raw EPS / price blocks
+
+The workbook's "Median PE" sheet is not a true median: every cell is
+
+    =AVERAGEIFS(P/E column, gsubind = code, P/E > 0, P/E < 200)
+
+i.e. the mean of the sub-industry's P/E ratios inside (0, 200).  This module
+reproduces that rule from Company Dta's EPS and price blocks (P/E = price /
+EPS), so a data refresh no longer needs an Excel round trip.
+
+``MedianPETable`` keeps a running sum and count per (gsubind, year) cell.
+Changing one company's EPS / price, moving it to another sub-industry or
+adding a company only touches the affected cells; nothing else is recomputed.
+``recompute_cells`` does the same for a stored table when only the raw frames
+are at hand (the delta ingestion path).
+"""
+
+import numpy as np
+import pandas as pd
+
+
+PE_FLOOR = 0.0      # exclusive, as in the sheet's ">0"
+PE_CAP = 200.0      # exclusive, as in the sheet's "<200"
+
+
+def _contributions(eps, price):
+    """Per-cell P/E that counts towards the average (0 where it doesn't)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pe = np.asarray(price, dtype=float) / np.asarray(eps, dtype=float)
+    valid = (pe > PE_FLOOR) & (pe < PE_CAP)
+    return np.where(valid, pe, 0.0), valid
+
+
+class MedianPETable:
+    """Incrementally maintained (gsubind × year) average-P/E table."""
+
+    def __init__(self, eps, price, gsubinds, years):
+        self.years = list(years)
+        self.eps = np.array(eps, dtype=float)
+        self.price = np.array(price, dtype=float)
+        self.gsubinds = list(gsubinds)
+
+        self.codes = []
+        self.code_to_group = {}
+        n_years = len(self.years)
+        self._sums = np.zeros((0, n_years))
+        self._counts = np.zeros((0, n_years), dtype=np.int64)
+        groups = np.array([self._group(code) for code in self.gsubinds], dtype=np.int64)
+
+        values, valid = _contributions(self.eps, self.price)
+        if len(groups):
+            np.add.at(self._sums, groups, values)
+            np.add.at(self._counts, groups, valid.astype(np.int64))
+
+    @classmethod
+    def from_frames(cls, eps_data, price_data, gsubind_data):
+        return cls(eps_data.to_numpy(), price_data.to_numpy(), gsubind_data, eps_data.columns)
+
+    def _group(self, code):
+        group = self.code_to_group.get(code)
+        if group is None:
+            group = len(self.codes)
+            self.codes.append(code)
+            self.code_to_group[code] = group
+            self._sums = np.vstack([self._sums, np.zeros((1, len(self.years)))])
+            self._counts = np.vstack([self._counts, np.zeros((1, len(self.years)), dtype=np.int64)])
+        return group
+
+    # ── Reads ───────────────────────────────────────────────────────────
+    def values(self):
+        """Dense ``(n_groups × n_years)`` matrix; NaN where no P/E qualifies."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(self._counts > 0, self._sums / self._counts, np.nan)
+
+    def row(self, gsubind):
+        group = self.code_to_group.get(gsubind)
+        if group is None:
+            return np.full(len(self.years), np.nan)
+        counts = self._counts[group]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(counts > 0, self._sums[group] / counts, np.nan)
+
+    def to_frame(self):
+        """Same layout as the ``median_pe`` table written by ``ingest``."""
+        frame = pd.DataFrame(self.values(), columns=self.years)
+        frame.insert(0, "gsubind", self.codes)
+        return frame.sort_values("gsubind", kind="stable").reset_index(drop=True)
+
+    # ── Incremental updates ─────────────────────────────────────────────
+    def update_company(self, row, eps=None, price=None, gsubind=None):
+        """Replace one company's EPS / price row and/or sub-industry.
+
+        Returns the set of ``(gsubind, year)`` cells whose value was touched.
+        """
+        old_values, old_valid = _contributions(self.eps[row], self.price[row])
+        old_code = self.gsubinds[row]
+
+        if eps is not None:
+            self.eps[row] = np.asarray(eps, dtype=float)
+        if price is not None:
+            self.price[row] = np.asarray(price, dtype=float)
+        if gsubind is not None:
+            self.gsubinds[row] = gsubind
+        new_values, new_valid = _contributions(self.eps[row], self.price[row])
+        new_code = self.gsubinds[row]
+
+        if new_code == old_code:
+            cols = np.flatnonzero((old_values != new_values) | (old_valid != new_valid))
+        else:
+            cols = np.flatnonzero(old_valid | new_valid)
+        if cols.size == 0:
+            return set()
+
+        old_group, new_group = self.code_to_group[old_code], self._group(new_code)
+        self._sums[old_group, cols] -= old_values[cols]
+        self._counts[old_group, cols] -= old_valid[cols]
+        self._sums[new_group, cols] += new_values[cols]
+        self._counts[new_group, cols] += new_valid[cols]
+        # an emptied cell should read exactly zero, not float residue
+        for group in {old_group, new_group}:
+            self._sums[group, cols] = np.where(self._counts[group, cols] > 0, self._sums[group, cols], 0.0)
+
+        years = [self.years[c] for c in cols]
+        return {(code, year) for code in {old_code, new_code} for year in years}
+
+    def update_cell(self, row, year, eps=None, price=None):
+        """Change a single (company, year) EPS and/or price value."""
+        col = self.years.index(year)
+        eps_row, price_row = self.eps[row].copy(), self.price[row].copy()
+        if eps is not None:
+            eps_row[col] = eps
+        if price is not None:
+            price_row[col] = price
+        return self.update_company(row, eps=eps_row, price=price_row)
+
+    def add_company(self, eps, price, gsubind):
+        """Append a company row; returns ``(row id, touched cells)``."""
+        row = len(self.gsubinds)
+        self.eps = np.vstack([self.eps, np.full((1, len(self.years)), np.nan)])
+        self.price = np.vstack([self.price, np.full((1, len(self.years)), np.nan)])
+        self.gsubinds.append(gsubind)
+        self._group(gsubind)
+        return row, self.update_company(row, eps=eps, price=price)
+
+
+def derive_median_pe(eps_data, price_data, gsubind_data):
+    """The Median PE sheet, recomputed from the Company Dta blocks."""
+    return MedianPETable.from_frames(eps_data, price_data, gsubind_data).to_frame()
+
+
+def recompute_cells(median_pe, eps_data, price_data, gsubind_data, cells):
+    """Refresh only ``cells`` – ``(gsubind, year)`` pairs – of a stored table.
+
+    Years and sub-industries not yet in ``median_pe`` are added; every other
+    cell keeps its stored value.
+    """
+    table = median_pe.set_index("gsubind").reindex(columns=list(eps_data.columns))
+    codes = np.asarray(gsubind_data)
+
+    by_year = {}
+    for code, year in cells:
+        by_year.setdefault(year, set()).add(code)
+    table = table.reindex(table.index.union(pd.Index(list({c for cs in by_year.values() for c in cs}))))
+
+    for year, wanted in by_year.items():
+        wanted = list(wanted)
+        members = np.isin(codes, wanted)
+        values, valid = _contributions(eps_data[year].to_numpy()[members], price_data[year].to_numpy()[members])
+        sums = pd.Series(values).groupby(codes[members]).sum().reindex(wanted, fill_value=0.0)
+        counts = pd.Series(valid).groupby(codes[members]).sum().reindex(wanted, fill_value=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table.loc[wanted, year] = np.where(counts > 0, sums / counts, np.nan)
+
+    table.index.name = "gsubind"
+    return table.reset_index().sort_values("gsubind", kind="stable").reset_index(drop=True)
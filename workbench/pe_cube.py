@@ -0,0 +1,107 @@
+"""
+pe_cube.py  –  Per-sub-industry, per-year P/E statistics
+
+One vectorized groupby over the (ticker × year) P/E matrix produces, for
+every (gsubind, year) cell, the count, min, max, median and quartiles of the
+valid peer P/Es.  "Valid" follows the Valuation Advisor: P/E = price / EPS
+with non-positive and missing values dropped.
+
+The cube also carries each gsubind's median absolute model error (the
+"Typical {industry} model error" band of the Backtest tab), so both tabs
+answer their sub-industry questions with a constant-time array lookup.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+
+STATS = ("count", "min", "q1", "median", "q3", "max")
+
+
+@dataclass(frozen=True)
+class PECube:
+    years: list
+    gsubind_to_group: dict
+    stats: dict                 # name → (G, Y) array
+    model_error: np.ndarray     # (G,) median abs model error in %
+
+    def _cell(self, gsubind, year):
+        group = self.gsubind_to_group.get(gsubind)
+        if group is None or year not in self.years:
+            return None, None
+        return group, self.years.index(year)
+
+    def lookup(self, gsubind, year):
+        """``{stat: value}`` for one (gsubind, year) cell; count 0 if unknown."""
+        group, col = self._cell(gsubind, year)
+        if group is None:
+            return {name: (0 if name == "count" else np.nan) for name in STATS}
+        return {name: self.stats[name][group, col] for name in STATS}
+
+    def implied_range(self, gsubind, year, eps, avg_pe=None):
+        """Implied (low, avg, high) price for ``eps`` from the peer P/E range.
+
+        ``avg_pe`` overrides the cube's median for the middle value (the
+        Valuation Advisor passes the derived sub-industry average P/E from
+        ``workbench.median_pe`` there).  All NaN when EPS is not positive or
+        the sub-industry has no valid P/E that year.
+        """
+        cell = self.lookup(gsubind, year)
+        if not (eps > 0) or cell["count"] == 0:
+            return np.nan, np.nan, np.nan
+        avg_pe = cell["median"] if avg_pe is None else avg_pe
+        return eps * cell["min"], eps * avg_pe, eps * cell["max"]
+
+    def error_band(self, gsubind):
+        group = self.gsubind_to_group.get(gsubind)
+        return np.nan if group is None else self.model_error[group]
+
+
+def pe_matrix(price, eps):
+    """Price / EPS with non-positive and missing ratios set to NaN."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pe = np.asarray(price, dtype=float) / np.asarray(eps, dtype=float)
+    return np.where(pe > 0, pe, np.nan)
+
+
+def build_cube(price_data, eps_data, index, median_error_by_gsubind=None):
+    """Build the cube for the groups of a ``UniverseIndex``."""
+    years = list(eps_data.columns)
+    n_groups, n_years = len(index.group_codes), len(years)
+    pe = pe_matrix(price_data.to_numpy(), eps_data.to_numpy())
+
+    long = pd.DataFrame(
+        {
+            "group": np.repeat(index.group_of_row, n_years),
+            "col": np.tile(np.arange(n_years), len(index.group_of_row)),
+            "pe": pe.ravel(),
+        }
+    ).dropna()
+    grouped = long.groupby(["group", "col"])["pe"]
+    table = grouped.agg(["count", "min", "median", "max"])
+    table["q1"] = grouped.quantile(0.25)
+    table["q3"] = grouped.quantile(0.75)
+
+    groups = table.index.get_level_values("group").to_numpy()
+    cols = table.index.get_level_values("col").to_numpy()
+    stats = {}
+    for name in STATS:
+        dense = np.zeros((n_groups, n_years)) if name == "count" else np.full((n_groups, n_years), np.nan)
+        dense[groups, cols] = table[name].to_numpy()
+        stats[name] = dense.astype(int) if name == "count" else dense
+
+    model_error = np.full(n_groups, np.nan)
+    if median_error_by_gsubind is not None:
+        for code, value in median_error_by_gsubind.items():
+            group = index.gsubind_to_group.get(code)
+            if group is not None:
+                model_error[group] = value
+
+    return PECube(
+        years=years,
+        gsubind_to_group=index.gsubind_to_group,
+        stats=stats,
+        model_error=model_error,
+    )
@@ -0,0 +1,291 @@
+"""
+portfolio.py  –  Universe-wide portfolio backtest of the EPS × median-PE signal
+
+The Backtest tab judges the model one ticker at a time by its directional
+hit rate.  ``simulate`` instead trades it: at every fiscal year t it buys the
+names whose model price is above their actual price (and, optionally, shorts
+those below), holds them until t + 1 and reports the portfolio's
+year-by-year return, cumulative value, turnover and drawdown – for the whole
+universe or a set of sub-industries.
+
+A ``Rule`` picks how the baskets are built:
+
+* ``weighting`` – ``"equal"``, or ``"cap"``: the Company sheet's market cap
+                  scaled back to year t by the price moves in between
+                  (constant share count assumed, as the sheet only has
+                  today's cap)
+* ``short``     – also short the names priced above the model; the long and
+                  short legs are each sized to 1 (dollar neutral)
+* ``min_gap``   – trade a name only when |model / actual − 1| is at least
+                  this (0 = every signal, as in the tab)
+* ``hold``      – rebalance every ``hold`` years; in between, the baskets
+                  formed at the last rebalance drift with prices
+
+Returns come from the Analysis sheet's actual prices, actual(t+1) / actual(t)
+− 1.  Like the hit rate, a name only counts in a year where both prices
+exist – which means names without a t + 1 price are dropped when the basket
+is formed, a survivorship bias to keep in mind.  Year t + 1 in the results
+is the year the basket formed at t is held into.
+
+The actual prices are as reported, not split-adjusted (AMZN's 20:1 split
+shows up as −97.5% in 2022, GE's 1:8 reverse split as +775% in 2021), and
+the workbook has no share counts to adjust them with.  A year in which a
+price moves by more than ``SPLIT_JUMP`` times either way is therefore
+treated as a split: the name sits that year out (``n_split_like`` counts
+them), and the year counts as flat when drifting weights and scaling market
+caps back.  The rule is blunt – genuine moves that large are dropped too,
+and smaller splits (2:1, 3:1) in a quiet year still pass as returns.
+
+Every rule is a handful of operations on the (ticker × year) matrices, so a
+full-universe run with a dozen rules takes a fraction of a second.
+
+    python -m workbench.portfolio --weightings equal cap --short --gaps 0 0.25 --hold 1 2
+"""
+
+import argparse
+import itertools
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from workbench import backtest, ingest
+
+
+MKT_CAP_COLUMN = "Mkt cap (USD Bn)"
+SPLIT_JUMP = 3.0                # yearly price ratio beyond which a move looks like a split
+WEIGHTINGS = ("equal", "cap")
+RETURN_COLUMNS = [
+    "rule", "Year", "return", "long_return", "short_return", "universe_return",
+    "cumulative", "drawdown", "turnover", "n_long", "n_short", "n_split_like",
+]
+SUMMARY_COLUMNS = [
+    "rule", "weighting", "short", "min_gap", "hold", "years", "total_return", "cagr",
+    "volatility", "sharpe", "max_drawdown", "avg_turnover", "avg_long", "avg_short",
+    "universe_cagr",
+]
+
+
+@dataclass(frozen=True)
+class Rule:
+    weighting: str = "equal"
+    short: bool = False
+    min_gap: float = 0.0
+    hold: int = 1
+
+    def __post_init__(self):
+        if self.weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting {self.weighting!r}; expected one of {WEIGHTINGS}")
+        if self.hold < 1:
+            raise ValueError(f"hold must be at least 1 year: {self.hold!r}")
+
+    @property
+    def label(self):
+        legs = "long/short" if self.short else "long"
+        return f"{self.weighting} {legs} gap≥{self.min_gap:g} hold {self.hold}y"
+
+
+# ─── Inputs ──────────────────────────────────────────────────────────────────
+@dataclass(frozen=True)
+class Market:
+    years: list
+    gap: np.ndarray             # (n, T) model / actual − 1 at formation year t
+    returns: np.ndarray         # (n, T) actual(t+1) / actual(t) − 1, 0 where invalid
+    tradable: np.ndarray        # (n, T) bool, both prices exist and no split-like jump
+    split_like: np.ndarray      # (n, T) bool, price moved more than SPLIT_JUMP×
+    level: np.ndarray           # (n, Y) log price index with split-like years flat
+    cap: np.ndarray             # (n, T) market cap at t (NaN if unknown)
+
+
+def market_arrays(tables, gsubinds=None, split_jump=SPLIT_JUMP):
+    """Align the ``ingest`` tables into a ``Market`` (optionally a few sub-industries).
+
+    ``split_jump=None`` keeps every price move, splits included.
+    """
+    company = tables["company"]
+    rows = np.arange(len(company))
+    if gsubinds:
+        rows = np.flatnonzero(company["gsubind"].isin(gsubinds).to_numpy())
+    eps, median_pe, actual = backtest.align_inputs(
+        tables["eps"].iloc[rows],
+        company["Ticker"].iloc[rows],
+        company["gsubind"].iloc[rows],
+        ingest.median_pe_lookup(tables["median_pe"]),
+        tables["actual_price"],
+    )
+    actual = np.where(actual > 0, actual, np.nan)
+    model = np.where(eps > 0, eps, np.nan) * median_pe
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gap = model[:, :-1] / actual[:, :-1] - 1
+        log_move = np.log(actual[:, 1:] / actual[:, :-1])
+    gap[np.abs(gap) < backtest.TIE_RTOL] = 0.0      # a tie, as in the backtest
+    priced = ~np.isnan(log_move)
+    split_like = np.zeros_like(priced)
+    if split_jump:
+        split_like = priced & (np.abs(np.nan_to_num(log_move)) > np.log(split_jump))
+    tradable = priced & ~split_like
+
+    # Split-free log price level; today's cap is scaled back along it:
+    # cap(t) = cap × exp(level(t) − level(latest priced year))
+    steps = np.where(tradable, log_move, 0.0)
+    level = np.hstack([np.zeros((len(steps), 1)), np.cumsum(steps, axis=1)])
+    level[np.isnan(actual)] = np.nan
+    latest = actual.shape[1] - 1 - np.argmax(~np.isnan(actual[:, ::-1]), axis=1)
+    latest_level = np.take_along_axis(level, latest[:, None], 1)
+    caps = company[MKT_CAP_COLUMN].iloc[rows].to_numpy(dtype=float)[:, None]
+    return Market(
+        years=list(tables["eps"].columns),
+        gap=gap,
+        returns=np.where(tradable, np.expm1(np.nan_to_num(log_move)), 0.0),
+        tradable=tradable,
+        split_like=split_like,
+        level=level,
+        cap=caps * np.exp(level[:, :-1] - latest_level),
+    )
+
+
+# ─── Simulation ──────────────────────────────────────────────────────────────
+def _normalise(weights):
+    """Scale every column to sum to 1 (all-zero columns stay 0)."""
+    totals = weights.sum(axis=0)
+    return np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+
+
+def _leg(market, signal, rule):
+    """``(n, T)`` weights of one leg, rebalanced every ``rule.hold`` years."""
+    n_periods = signal.shape[1]
+    size = signal * (np.nan_to_num(market.cap) if rule.weighting == "cap" else 1.0)
+    formed = _normalise(size)
+
+    # Between rebalances the weights formed at the anchor year drift with prices
+    anchor = np.arange(n_periods) // rule.hold * rule.hold
+    drift = np.exp(market.level[:, :n_periods] - market.level[:, anchor])
+    held = formed[:, anchor] * np.where(market.tradable, np.nan_to_num(drift), 0.0)
+    return _normalise(held)
+
+
+def _turnover(weights, returns):
+    """Half the absolute weight change of a leg against last year's drifted book.
+
+    1.0 means the whole leg was replaced; the first year has no prior book.
+    """
+    turnover = np.full(weights.shape[1], np.nan)
+    if weights.shape[1] > 1:
+        drifted = _normalise(weights[:, :-1] * (1 + returns[:, :-1]))
+        turnover[1:] = np.abs(weights[:, 1:] - drifted).sum(axis=0) / 2
+    return turnover
+
+
+def _drawdown(returns):
+    cumulative = np.cumprod(1 + returns)
+    return cumulative, cumulative / np.maximum.accumulate(np.maximum(cumulative, 1.0)) - 1
+
+
+def run_rule(market, rule):
+    """Year-by-year results of one rule, one row per holding year."""
+    fires = market.tradable & ~np.isnan(market.gap) & (np.abs(market.gap) >= rule.min_gap)
+    long_w = _leg(market, fires & (market.gap > 0), rule)
+    short_w = _leg(market, fires & (market.gap < 0), rule) if rule.short else np.zeros_like(long_w)
+
+    long_ret = (long_w * market.returns).sum(axis=0)
+    short_ret = (short_w * market.returns).sum(axis=0)
+    n_long, n_short = (long_w > 0).sum(axis=0), (short_w > 0).sum(axis=0)
+    returns = np.where(n_long > 0, long_ret, 0.0) - np.where(n_short > 0, short_ret, 0.0)
+    # A short squeeze can cost more than the book; it is wiped out at −100%
+    returns = np.maximum(returns, -1.0)
+    universe = _normalise(market.tradable.astype(float))
+    cumulative, drawdown = _drawdown(returns)
+
+    return pd.DataFrame(
+        {
+            "rule": rule.label,
+            "Year": market.years[1:len(returns) + 1],
+            "return": returns,
+            "long_return": np.where(n_long > 0, long_ret, np.nan),
+            "short_return": np.where(n_short > 0, short_ret, np.nan) if rule.short else np.nan,
+            "universe_return": (universe * market.returns).sum(axis=0),
+            "cumulative": cumulative,
+            "drawdown": drawdown,
+            "turnover": _turnover(long_w, market.returns) + _turnover(short_w, market.returns),
+            "n_long": n_long,
+            "n_short": n_short,
+            "n_split_like": market.split_like.sum(axis=0),
+        },
+        columns=RETURN_COLUMNS,
+    )
+
+
+def summarise(returns, rule):
+    """One summary row for the results of ``rule``."""
+    n_years = len(returns)
+    total = returns["cumulative"].iloc[-1] - 1 if n_years else np.nan
+    universe_total = (1 + returns["universe_return"]).prod() if n_years else np.nan
+    vol = returns["return"].std(ddof=1) if n_years > 1 else np.nan
+    return {
+        "rule": rule.label,
+        "weighting": rule.weighting,
+        "short": rule.short,
+        "min_gap": rule.min_gap,
+        "hold": rule.hold,
+        "years": n_years,
+        "total_return": total,
+        "cagr": (1 + total) ** (1 / n_years) - 1 if n_years else np.nan,
+        "volatility": vol,
+        "sharpe": returns["return"].mean() / vol if vol else np.nan,
+        "max_drawdown": returns["drawdown"].min() if n_years else np.nan,
+        "avg_turnover": returns["turnover"].mean(),
+        "avg_long": returns["n_long"].mean(),
+        "avg_short": returns["n_short"].mean(),
+        "universe_cagr": universe_total ** (1 / n_years) - 1 if n_years else np.nan,
+    }
+
+
+def simulate(tables=None, rules=(Rule(),), gsubinds=None, split_jump=SPLIT_JUMP):
+    """Run every rule; returns ``(returns, summary)`` frames.
+
+    ``tables`` defaults to the cached workbook (``ingest.load_tables``);
+    ``gsubinds`` restricts the universe to those sub-industries.
+    """
+    tables = tables if tables is not None else ingest.load_tables()
+    market = market_arrays(tables, gsubinds, split_jump)
+    frames = [run_rule(market, rule) for rule in rules]
+    summary = pd.DataFrame([summarise(f, r) for f, r in zip(frames, rules)], columns=SUMMARY_COLUMNS)
+    returns = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=RETURN_COLUMNS)
+    return returns, summary
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Trade the EPS × median-PE signal across the universe.")
+    parser.add_argument("--weightings", nargs="+", choices=WEIGHTINGS, default=["equal"])
+    parser.add_argument("--short", action="store_true", help="also run long/short variants")
+    parser.add_argument("--gaps", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--hold", nargs="+", type=int, default=[1], help="years between rebalances")
+    parser.add_argument("--gsubind", action="append", type=int, help="limit to a sub-industry (repeatable)")
+    parser.add_argument("--split-jump", type=float, default=SPLIT_JUMP,
+                        help="treat yearly price moves beyond this ratio as splits (0 = off)")
+    parser.add_argument("--out", help="write the year-by-year returns (.csv or .parquet)")
+    args = parser.parse_args(argv)
+
+    rules = [
+        Rule(weighting, short, gap, hold)
+        for weighting, short, gap, hold in itertools.product(
+            args.weightings, (False, True) if args.short else (False,), args.gaps, args.hold
+        )
+    ]
+    started = time.time()
+    returns, summary = simulate(rules=rules, gsubinds=args.gsubind, split_jump=args.split_jump or None)
+    elapsed = time.time() - started
+    if args.out:
+        if args.out.endswith(".parquet"):
+            returns.to_parquet(args.out, index=False)
+        else:
+            returns.to_csv(args.out, index=False)
+    print(summary.drop(columns=["weighting", "short", "min_gap", "hold"]).to_string(index=False))
+    print(f"{len(rules)} rules in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
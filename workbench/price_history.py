@@ -0,0 +1,205 @@
+"""
+price_history.py  –  Local daily-bar store for the Company Snapshot chart
+
+Each ticker's full daily history is downloaded once and kept in SQLite.  After
+that only the bars since the last stored date are requested (at most once per
+``HISTORY_REFRESH`` seconds), and every daily range the Snapshot offers –
+5 days up to "Max" – is a slice of the local table.  Switching ranges costs
+no API call at all.
+
+Prices are split/dividend adjusted by Yahoo, so a delta that carries a split
+or a dividend triggers one full re-download to keep older bars consistent.
+
+A ticker Yahoo has no bars for (delisted, mistyped) is remembered as such:
+its ``synced`` row is kept with no bars, and the download is not retried
+until ``HISTORY_EMPTY_TTL`` seconds later.
+
+Configuration (environment variables):
+
+* ``WORKBENCH_HISTORY_DB``        – SQLite file
+                                    (default ``data/.cache/price_history.sqlite``)
+* ``WORKBENCH_HISTORY_REFRESH``   – seconds between delta fetches per ticker
+                                    (default 900)
+* ``WORKBENCH_HISTORY_EMPTY_TTL`` – seconds before a ticker that came back
+                                    empty is downloaded again (default 3600)
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+import yfinance as yf
+
+from workbench import diagnostics
+
+
+log = logging.getLogger(__name__)
+
+HISTORY_DB_PATH = os.environ.get("WORKBENCH_HISTORY_DB", "data/.cache/price_history.sqlite")
+HISTORY_REFRESH = float(os.environ.get("WORKBENCH_HISTORY_REFRESH", 900))
+HISTORY_EMPTY_TTL = float(os.environ.get("WORKBENCH_HISTORY_EMPTY_TTL", 3600))
+COLUMNS = ("Open", "High", "Low", "Close", "Volume")
+
+# Snapshot period → how far back to slice; "5d" counts trading days
+PERIOD_OFFSETS = {
+    "1mo": pd.DateOffset(months=1),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "5y": pd.DateOffset(years=5),
+}
+PERIOD_BARS = {"5d": 5}
+PERIODS = ("5d", "1mo", "6mo", "ytd", "1y", "5y", "max")
+
+
+# ─── SQLite backing ──────────────────────────────────────────────────────────
+class _BarStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS bars ("
+                " ticker TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL,"
+                " volume REAL, PRIMARY KEY (ticker, date))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS synced ("
+                " ticker TEXT PRIMARY KEY, checked_at REAL)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def bars(self, ticker):
+        with self._connect() as conn:
+            frame = pd.read_sql_query(
+                "SELECT date, open, high, low, close, volume FROM bars"
+                " WHERE ticker = ? ORDER BY date",
+                conn,
+                params=(ticker,),
+            )
+        frame.columns = ["Date", *COLUMNS]
+        frame["Date"] = pd.to_datetime(frame["Date"])
+        return frame.set_index("Date")
+
+    def checked_at(self, ticker):
+        with self._connect() as conn:
+            row = conn.execute("SELECT checked_at FROM synced WHERE ticker = ?", (ticker,)).fetchone()
+        return row[0] if row else None
+
+    def write(self, ticker, bars, replace=False):
+        bars = bars.reindex(columns=list(COLUMNS))
+        rows = [
+            (ticker, day.strftime("%Y-%m-%d"), *(None if pd.isna(v) else float(v) for v in values))
+            for day, values in zip(bars.index, bars.to_numpy())
+        ]
+        with self._connect() as conn:
+            if replace:
+                conn.execute("DELETE FROM bars WHERE ticker = ?", (ticker,))
+            conn.executemany("INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            conn.execute("INSERT OR REPLACE INTO synced VALUES (?, ?)", (ticker, time.time()))
+
+
+# ─── Store ───────────────────────────────────────────────────────────────────
+def _download(ticker, start=None):
+    tkr = yf.Ticker(ticker)
+    with diagnostics.external("yahoo.history"):
+        return tkr.history(period="max") if start is None else tkr.history(start=start)
+
+
+def _normalise(bars):
+    """Tz-naive, one row per calendar day."""
+    bars = bars.copy()
+    index = pd.DatetimeIndex(bars.index)
+    bars.index = (index.tz_localize(None) if index.tz is not None else index).normalize()
+    return bars[~bars.index.duplicated(keep="last")]
+
+
+def _adjustments(bars):
+    return any(c in bars and (bars[c].fillna(0) != 0).any() for c in ("Dividends", "Stock Splits"))
+
+
+class HistoryStore:
+    """Process-wide ``ticker → daily bars`` store with incremental refresh."""
+
+    def __init__(self, db_path=HISTORY_DB_PATH, refresh_after=HISTORY_REFRESH,
+                 empty_ttl=HISTORY_EMPTY_TTL, fetch=_download):
+        self.refresh_after = refresh_after
+        self.empty_ttl = empty_ttl
+        self._fetch = fetch
+        self._store = _BarStore(db_path)
+        self._lock = threading.Lock()
+        self._ticker_locks = {}
+
+    def _ticker_lock(self, ticker):
+        with self._lock:
+            return self._ticker_locks.setdefault(ticker, threading.Lock())
+
+    def sync(self, ticker, force=False):
+        """Bring ``ticker`` up to date; return its full local bar table.
+
+        The first call downloads the whole history; later calls fetch only
+        from the last stored bar (re-fetched, as it may have been partial).
+        A failed delta fetch keeps serving the stored bars; an empty download
+        is served as empty for ``empty_ttl`` seconds.
+        """
+        ticker = ticker.upper()
+        with self._ticker_lock(ticker):
+            bars = self._store.bars(ticker)
+            checked_at = self._store.checked_at(ticker)
+            if bars.empty and checked_at is not None and not force \
+                    and time.time() - checked_at < self.empty_ttl:
+                return bars
+            if bars.empty or checked_at is None:
+                fresh = _normalise(self._fetch(ticker))
+                self._store.write(ticker, fresh, replace=True)
+                return self._store.bars(ticker)
+
+            if not force and time.time() - checked_at < self.refresh_after:
+                return bars
+            try:
+                delta = _normalise(self._fetch(ticker, start=bars.index[-1].strftime("%Y-%m-%d")))
+            except Exception as e:
+                log.warning("Delta fetch for %s failed, serving stored bars: %s", ticker, e)
+                return bars
+
+            # a split or dividend re-adjusts every earlier bar
+            new_bars = delta[delta.index > bars.index[-1]]
+            if _adjustments(new_bars):
+                self._store.write(ticker, _normalise(self._fetch(ticker)), replace=True)
+            else:
+                self._store.write(ticker, delta)
+            return self._store.bars(ticker)
+
+    def history(self, ticker, period="max"):
+        """Daily bars for one of ``PERIODS``, sliced from the local store."""
+        if period not in PERIODS:
+            raise ValueError(f"Unsupported period {period!r}; expected one of {PERIODS}")
+        bars = self.sync(ticker)
+        if bars.empty or period == "max":
+            return bars
+        if period in PERIOD_BARS:
+            return bars.iloc[-PERIOD_BARS[period]:]
+        today = pd.Timestamp.today().normalize()
+        start = pd.Timestamp(today.year, 1, 1) if period == "ytd" else today - PERIOD_OFFSETS[period]
+        return bars[bars.index >= start]
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def default_store():
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = HistoryStore()
+        return _default_store
+
+
+def get_history(ticker, period="max"):
+    return default_store().history(ticker, period)
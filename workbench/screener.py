@@ -0,0 +1,121 @@
+"""
+screener.py  –  Universe-wide undervaluation screen
+
+Applies the Valuation Advisor's rule to every company at once: implied
+low / avg / high price = latest EPS × the sub-industry's min / "median" /
+max peer P/E, and the gap = (implied avg − current price) / implied avg.
+Everything is a handful of array operations over the ``UniverseIndex`` and
+``PECube`` the pages already hold, so the full screen is cheap to rebuild.
+
+Current prices come from the shared bulk-quote cache (``market_data``), with
+the workbook's latest-year price as the fallback for tickers without a quote
+younger than ``QUOTE_MAX_AGE``; ``Price Source`` says which one was used.
+``query`` filters, sorts and slices one page, so a view only ever ships the
+visible rows.
+
+Configuration (environment variables):
+
+* ``WORKBENCH_SCREEN_QUOTE_AGE`` – oldest bulk quote, in seconds, the screen
+                                   still prefers over the workbook price
+                                   (default 86400)
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from workbench import market_data
+
+
+SCREEN_COLUMNS = [
+    "Ticker", "Company", "gsubind", "Industry", "EPS",
+    "Implied Low", "Implied Avg", "Implied High",
+    "Price", "Price Source", "Gap %", "Signal",
+]
+SORTABLE = ["Gap %", "Ticker", "Company", "Industry", "EPS", "Price", "Implied Avg"]
+QUOTE_MAX_AGE = float(os.environ.get("WORKBENCH_SCREEN_QUOTE_AGE", 86400))
+
+
+def current_prices(tickers, fallback, max_age=QUOTE_MAX_AGE):
+    """Cached bulk-quote price per ticker, else ``fallback``; plus the source."""
+    quoted = np.array(market_data.get_prices(tickers, max_age=max_age), dtype=float)
+    use_quote = ~np.isnan(quoted)
+    prices = np.where(use_quote, quoted, np.asarray(fallback, dtype=float))
+    source = np.where(use_quote, "quote", np.where(np.isnan(prices), "", "workbook"))
+    return prices, source
+
+
+def build_screen(company, eps_data, price_data, index, cube, prices=None, rows=None):
+    """One row per company for the latest fiscal year.
+
+    ``rows`` restricts the screen to those company rows (in that order);
+    ``prices`` overrides the current price lookup (one per screened row).
+    """
+    year = list(eps_data.columns)[-1]
+    col = cube.years.index(year)
+    rows = slice(None) if rows is None else np.asarray(rows, dtype=int)
+    groups = index.group_of_row[rows]
+
+    eps = eps_data[year].to_numpy(dtype=float)[rows]
+    count = cube.stats["count"][groups, col]
+    low_pe = cube.stats["min"][groups, col]
+    high_pe = cube.stats["max"][groups, col]
+    avg_pe = index.median_pe[groups, -1]
+
+    valid = (eps > 0) & (count > 0)
+    low = np.where(valid, eps * low_pe, np.nan)
+    avg = np.where(valid, eps * avg_pe, np.nan)
+    high = np.where(valid, eps * high_pe, np.nan)
+
+    if prices is None:
+        prices, source = current_prices(index.tickers[rows], price_data[year].to_numpy()[rows])
+    else:
+        prices = np.asarray(prices, dtype=float)
+        source = np.where(np.isnan(prices), "", "given")
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gap = (avg - prices) / avg * 100
+    signal = np.where(
+        np.isnan(avg) | np.isnan(prices), "",
+        np.where(avg > prices, "Undervalued", "Overvalued"),
+    )
+
+    return pd.DataFrame(
+        {
+            "Ticker": company["Ticker"].to_numpy()[rows],
+            "Company": company["conm"].to_numpy()[rows],
+            "gsubind": company["gsubind"].to_numpy()[rows],
+            "Industry": company["Industry"].to_numpy()[rows],
+            "EPS": eps,
+            "Implied Low": low,
+            "Implied Avg": avg,
+            "Implied High": high,
+            "Price": prices,
+            "Price Source": source,
+            "Gap %": gap,
+            "Signal": signal,
+        }
+    )
+
+
+def query(screen, gsubinds=None, industries=None, signal=None, sort_by="Gap %",
+          ascending=False, page=1, page_size=50):
+    """Filter, sort and return ``(page rows, number of matching rows)``.
+
+    Rows without a gap (no valid EPS / peers / price) always sort last.
+    """
+    if sort_by not in SORTABLE:
+        raise ValueError(f"Cannot sort by {sort_by!r}; choose from {SORTABLE}")
+    mask = np.ones(len(screen), dtype=bool)
+    if gsubinds:
+        mask &= screen["gsubind"].isin(gsubinds).to_numpy()
+    if industries:
+        mask &= screen["Industry"].isin(industries).to_numpy()
+    if signal:
+        mask &= (screen["Signal"] == signal).to_numpy()
+
+    matches = screen[mask]
+    ordered = matches.sort_values(sort_by, ascending=ascending, na_position="last", kind="stable")
+    start = max(page - 1, 0) * page_size
+    return ordered.iloc[start:start + page_size], len(matches)
@@ -0,0 +1,235 @@
+"""
+sweep.py  –  Parameter sweeps over the EPS × P/E direction model
+
+The Backtest tab evaluates a single configuration.  ``sweep`` evaluates a whole
+grid of them against the universe in one vectorized pass:
+
+* ``horizons``    – horizon sets to pool, e.g. ``(1,)``, ``(2,)``, ``(1, 2)``
+                    (an int means just that horizon), 1–5 years
+* ``aggregators`` – how a sub-industry's P/Es are combined per year:
+                    ``"mean"`` (the workbook's "Median PE" rule), ``"median"``,
+                    ``"trimmed_mean:<fraction>"``, ``"percentile:<q>"``
+* ``min_gaps``    – a signal fires only when |model / actual − 1| is at
+                    least this fraction (0 = always, as in the tab)
+* ``min_eps``     – EPS must exceed this to produce a model price (0 = the
+                    tab's "positive EPS" rule)
+
+Peer P/Es are restricted to the sheet's (0, 200) window for every
+aggregator.  The P/E aggregates are computed once per aggregator and the
+realised moves once per horizon, so each extra configuration is a handful of
+array comparisons.  ``workers > 1`` spreads the per-aggregator blocks over a
+process pool for very large grids.
+
+The default grid point (``(1, 2)``, ``"mean"``, 0, 0) reproduces the Backtest
+tab's global hit rate exactly.
+
+    python -m workbench.sweep --horizons 1 2 1,2 3 --aggregators mean median \\
+        trimmed_mean:0.1 percentile:25 --gaps 0 0.1 0.25 --min-eps 0 0.5
+"""
+
+import argparse
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from workbench import backtest, ingest
+from workbench.median_pe import PE_CAP, PE_FLOOR
+
+
+MAX_HORIZON = 5
+RESULT_COLUMNS = [
+    "aggregator", "min_eps", "min_gap", "horizons",
+    "signals", "hits", "total", "hit_rate", "coverage",
+]
+
+
+# ─── Inputs ──────────────────────────────────────────────────────────────────
+def parse_aggregator(spec):
+    """``"percentile:25"`` → ``("percentile", 25.0)``; validates the name."""
+    name, _, param = spec.partition(":")
+    if name not in ("mean", "median", "trimmed_mean", "percentile"):
+        raise ValueError(f"Unknown P/E aggregator {spec!r}")
+    if name in ("trimmed_mean", "percentile") and not param:
+        raise ValueError(f"{name} needs a parameter, e.g. {name}:{'0.1' if name == 'trimmed_mean' else '25'}")
+    value = float(param) if param else None
+    if name == "trimmed_mean" and not 0 <= value < 0.5:
+        raise ValueError(f"trimmed_mean cuts a fraction in [0, 0.5) from each end: {spec!r}")
+    if name == "percentile" and not 0 <= value <= 100:
+        raise ValueError(f"percentile must be in [0, 100]: {spec!r}")
+    return name, value
+
+
+def _horizon_set(spec):
+    horizons = (spec,) if isinstance(spec, int) else tuple(spec)
+    if not horizons or not all(1 <= h <= MAX_HORIZON for h in horizons):
+        raise ValueError(f"Horizons must be between 1 and {MAX_HORIZON}: {spec!r}")
+    return horizons
+
+
+def universe_arrays(tables):
+    """``(eps, price, actual, group_of_row)`` aligned in company-row order."""
+    company = tables["company"]
+    years = list(tables["eps"].columns)
+    eps = tables["eps"].to_numpy(dtype=float)
+    price = tables["price"].reindex(columns=years).to_numpy(dtype=float)
+    actual = (
+        tables["actual_price"]
+        .reindex(index=company["Ticker"].to_numpy(), columns=years)
+        .to_numpy(dtype=float)
+    )
+    _, group_of_row = np.unique(company["gsubind"].to_numpy(), return_inverse=True)
+    return eps, price, actual, group_of_row
+
+
+# ─── P/E aggregation ─────────────────────────────────────────────────────────
+def aggregate_pe(eps, price, group_of_row, spec):
+    """Per-row ``(n, Y)`` peer P/E for aggregator ``spec`` (NaN if no peers)."""
+    name, param = parse_aggregator(spec)
+    n, n_years = eps.shape
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pe = price / eps
+    valid = (pe > PE_FLOOR) & (pe < PE_CAP)
+
+    long = pd.DataFrame(
+        {
+            "group": np.repeat(group_of_row, n_years).reshape(n, n_years)[valid],
+            "col": np.tile(np.arange(n_years), (n, 1))[valid],
+            "pe": pe[valid],
+        }
+    )
+    grouped = long.groupby(["group", "col"])["pe"]
+    if name == "mean":
+        table = grouped.mean()
+    elif name == "median":
+        table = grouped.median()
+    elif name == "percentile":
+        table = grouped.quantile(param / 100)
+    else:
+        lo = grouped.transform("quantile", param)
+        hi = grouped.transform("quantile", 1 - param)
+        kept = long[(long["pe"] >= lo) & (long["pe"] <= hi)]
+        table = kept.groupby(["group", "col"])["pe"].mean()
+
+    dense = np.full((group_of_row.max() + 1 if n else 0, n_years), np.nan)
+    dense[table.index.get_level_values("group"), table.index.get_level_values("col")] = table.to_numpy()
+    return dense[group_of_row]
+
+
+# ─── Evaluation ──────────────────────────────────────────────────────────────
+def _moves(actual, horizons):
+    """``h → (realised_up, future_ok)`` for every horizon in the grid."""
+    moves = {}
+    for h in sorted({h for hs in horizons for h in hs}):
+        up = np.zeros(actual.shape, dtype=bool)
+        ok = np.zeros(actual.shape, dtype=bool)
+        if h < actual.shape[1]:
+            up[:, :-h] = actual[:, h:] > actual[:, :-h]
+            ok[:, :-h] = ~np.isnan(actual[:, h:])
+        moves[h] = up, ok
+    return moves
+
+
+def evaluate_block(eps, actual, peer_pe, aggregator, min_eps_values, min_gaps, horizons, moves=None):
+    """All (EPS filter × gap × horizon set) results for one aggregator."""
+    moves = moves or _moves(actual, horizons)
+    rows = []
+    for min_eps in min_eps_values:
+        model = np.where(eps > min_eps, eps, np.nan) * peer_pe
+        has_model = ~np.isnan(model)
+        pred_up = backtest.predicts_up(model, actual)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rel_gap = np.abs(model / actual - 1)
+        possible = {h: (has_model & moves[h][1]).sum() for h in moves}
+
+        for min_gap in min_gaps:
+            fires = has_model if min_gap == 0 else has_model & (rel_gap >= min_gap)
+            counted = {h: fires & moves[h][1] for h in moves}
+            hits = {h: (counted[h] & (pred_up == moves[h][0])).sum() for h in moves}
+            for hs in horizons:
+                total = int(sum(counted[h].sum() for h in hs))
+                n_possible = int(sum(possible[h] for h in hs))
+                rows.append(
+                    {
+                        "aggregator": aggregator,
+                        "min_eps": min_eps,
+                        "min_gap": min_gap,
+                        "horizons": ",".join(map(str, hs)),
+                        "signals": int(fires.sum()),
+                        "hits": int(sum(hits[h] for h in hs)),
+                        "total": total,
+                        "hit_rate": backtest.hit_rate(int(sum(hits[h] for h in hs)), total),
+                        "coverage": total / n_possible * 100 if n_possible else np.nan,
+                    }
+                )
+    return rows
+
+
+def _run_block(eps, price, actual, group_of_row, aggregator, min_eps_values, min_gaps, horizons):
+    peer_pe = aggregate_pe(eps, price, group_of_row, aggregator)
+    return evaluate_block(eps, actual, peer_pe, aggregator, min_eps_values, min_gaps, horizons)
+
+
+def sweep(tables=None, horizons=((1, 2),), aggregators=("mean",), min_gaps=(0.0,),
+          min_eps=(0.0,), workers=0):
+    """Evaluate every grid combination; returns one row per configuration.
+
+    ``tables`` defaults to the cached workbook (``ingest.load_tables``).
+    """
+    tables = tables if tables is not None else ingest.load_tables()
+    horizons = [_horizon_set(h) for h in horizons]
+    for spec in aggregators:
+        parse_aggregator(spec)
+    eps, price, actual, group_of_row = universe_arrays(tables)
+    block_args = [
+        (eps, price, actual, group_of_row, agg, list(min_eps), list(min_gaps), horizons)
+        for agg in aggregators
+    ]
+
+    if workers and workers > 1 and len(block_args) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(block_args))) as pool:
+            blocks = list(pool.map(_run_block, *zip(*block_args)))
+    else:
+        moves = _moves(actual, horizons)
+        blocks = [
+            evaluate_block(eps, actual, aggregate_pe(eps, price, group_of_row, agg),
+                           agg, list(min_eps), list(min_gaps), horizons, moves)
+            for agg in aggregators
+        ]
+    return pd.DataFrame(list(itertools.chain.from_iterable(blocks)), columns=RESULT_COLUMNS)
+
+
+# ─── CLI ─────────────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep backtest parameters over the universe.")
+    parser.add_argument("--horizons", nargs="+", default=["1,2"],
+                        help="horizon sets, e.g. 1 2 1,2 (pooled)")
+    parser.add_argument("--aggregators", nargs="+", default=["mean"])
+    parser.add_argument("--gaps", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--min-eps", nargs="+", type=float, default=[0.0])
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("--out", help="write the results table (.csv or .parquet)")
+    args = parser.parse_args(argv)
+
+    started = time.time()
+    results = sweep(
+        horizons=[tuple(int(h) for h in spec.split(",")) for spec in args.horizons],
+        aggregators=args.aggregators,
+        min_gaps=args.gaps,
+        min_eps=args.min_eps,
+        workers=args.workers,
+    )
+    elapsed = time.time() - started
+    if args.out:
+        if args.out.endswith(".parquet"):
+            results.to_parquet(args.out, index=False)
+        else:
+            results.to_csv(args.out, index=False)
+    print(results.sort_values("hit_rate", ascending=False).to_string(index=False))
+    print(f"{len(results)} configurations in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+ticker_search.py  –  Prefix / trigram search over ticker symbols and names
+
+Replaces shipping the whole ticker list to the browser: the sidebar sends the
+typed text, ``SearchIndex.search`` returns the best ``k`` rows and only those
+go back.  Matches are ranked in tiers, each tier served from a prebuilt
+structure so a lookup touches a handful of entries whatever the universe size:
+
+1. symbol equals / starts with the query  – bisect on the sorted symbols
+2. company name starts with the query     – bisect on the sorted names
+3. a word of the name starts with it      – bisect on the sorted name words
+4. symbol or name contains it (3+ chars)  – intersect trigram posting lists,
+                                            then confirm the substring
+
+Within the prefix tiers results are alphabetical (so "A" comes before
+"AA…"); substring matches follow in workbook order.
+Queries are case-insensitive and ignore punctuation.  Symbols are indexed
+without it, so "brk.b", "BRK-B" and "brkb" all find "BRK.B".
+"""
+
+import re
+from bisect import bisect_left
+
+import numpy as np
+
+
+_NON_ALNUM = re.compile(r"[^A-Z0-9]+")
+SCAN_BELOW = 512        # stop intersecting trigram lists once this short
+
+
+def normalise(text):
+    """Upper-case, punctuation → single spaces, trimmed."""
+    return _NON_ALNUM.sub(" ", str(text).upper()).strip()
+
+
+def _compact(text):
+    """``normalise`` without the spaces, for symbols ("BRK.B" → "BRKB")."""
+    return normalise(text).replace(" ", "")
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _prefix_range(keys, prefix):
+    """``[lo, hi)`` of the sorted ``keys`` that start with ``prefix``."""
+    lo = bisect_left(keys, prefix)
+    return lo, bisect_left(keys, prefix + "\uffff", lo)
+
+
+class SearchIndex:
+    def __init__(self, tickers, names):
+        self.symbols = [_compact(t) for t in tickers]
+        self.names = [normalise(n) if isinstance(n, str) else "" for n in names]
+
+        order = sorted(range(len(self.symbols)), key=self.symbols.__getitem__)
+        self._symbol_keys = [self.symbols[r] for r in order]
+        self._symbol_rows = order
+
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self._name_keys = [self.names[r] for r in order]
+        self._name_rows = order
+
+        words = sorted((w, r) for r, name in enumerate(self.names) for w in set(name.split()))
+        self._word_keys = [w for w, _ in words]
+        self._word_rows = [r for _, r in words]
+
+        postings = {}
+        for r, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            for gram in _trigrams(symbol) | _trigrams(name):
+                postings.setdefault(gram, []).append(r)
+        self._postings = {g: np.asarray(rows, dtype=np.int32) for g, rows in postings.items()}
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def _substring_rows(self, query):
+        """Rows containing ``query``, in workbook order (lazily confirmed)."""
+        lists = sorted((self._postings.get(g) for g in _trigrams(query)),
+                       key=lambda p: -1 if p is None else len(p))
+        if not lists or lists[0] is None:
+            return
+        rows = lists[0]
+        for other in lists[1:]:
+            if rows.size <= SCAN_BELOW:
+                break
+            rows = np.intersect1d(rows, other, assume_unique=True)
+        for start in range(0, rows.size, SCAN_BELOW):
+            for r in rows[start:start + SCAN_BELOW].tolist():
+                if query in self.symbols[r] or query in self.names[r]:
+                    yield r
+
+    def search(self, query, k=10):
+        """Row ids of the best ``k`` matches for ``query`` (best first)."""
+        query = normalise(query)
+        if not query or k <= 0:
+            return []
+        found = {}      # insertion-ordered set
+
+        def take(rows):
+            for r in rows:
+                found.setdefault(r, None)
+                if len(found) >= k:
+                    return True
+            return False
+
+        symbol_query = _compact(query)
+        lo, hi = _prefix_range(self._symbol_keys, symbol_query)
+        if take(self._symbol_rows[i] for i in range(lo, hi)):
+            return list(found)
+        lo, hi = _prefix_range(self._name_keys, query)
+        if take(self._name_rows[i] for i in range(lo, hi)):
+            return list(found)
+        lo, hi = _prefix_range(self._word_keys, query)
+        if take(self._word_rows[i] for i in range(lo, hi)):
+            return list(found)
+        if len(query) >= 3 and take(self._substring_rows(query)):
+            return list(found)
+        if len(symbol_query) >= 3 and symbol_query != query:      # "BRK B" inside a symbol
+            take(self._substring_rows(symbol_query))
+        return list(found)
+
+
+def build_index(tickers, names):
+    return SearchIndex(tickers, names)
@@ -0,0 +1,280 @@
+"""
+universe.py  –  Compact, read-only universe shared by every session
+
+``load_data`` used to go through ``st.cache_data``, which hands each rerun a
+fresh unpickled copy of every table.  ``build_universe`` instead packs the
+cached tables once per data version into:
+
+* ``company``       – Ticker / gsubind / Industry as categoricals (integer
+                      codes plus one copy of each label)
+* ``eps``, ``price``, ``actual_price`` – float64, C-contiguous and read-only,
+                      wrapped in DataFrames without copying
+* ``median_pe``     – ``{gsubind: row}`` where every row is a read-only view
+                      into one ``(G, Y)`` block, instead of one object array
+                      per sub-industry
+
+The page holds it with ``st.cache_resource``, so all sessions share the same
+object by reference; the read-only arrays (and pandas copy-on-write) keep one
+session from changing what another sees.
+
+Across processes (several server replicas on one host) ``ensure_universe``
+goes one step further: the matrices, the median-P/E block and the categorical
+codes are written once per data version as ``.npy`` files next to a
+``header.json`` (schema version, data version, years, shapes / dtypes and the
+label lists with their dtypes), and every process maps them read-only with
+``np.load(..., mmap_mode="r")``.  The OS page cache then holds a single copy of the
+matrices for all replicas (only the small label codes and names are copied
+per process), and a new worker starts without reading the workbook or parquet.
+
+Configuration (environment variables):
+
+* ``WORKBENCH_UNIVERSE_DIR``   – where the mapped files live
+                                 (default ``data/.cache/universe``)
+* ``WORKBENCH_UNIVERSE_KEEP``  – superseded versions kept next to the current
+                                 one for workers still on them (default 1)
+* ``WORKBENCH_UNIVERSE_STALE`` – seconds after which a leftover temporary
+                                 directory from a crashed writer is removed
+                                 (default 3600)
+"""
+
+import json
+import os
+import shutil
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from workbench import ingest
+
+
+CATEGORICAL_COLUMNS = ("Ticker", "gsubind", "Industry")
+MMAP_DIR = Path(os.environ.get("WORKBENCH_UNIVERSE_DIR", ingest.CACHE_DIR / "universe"))
+MMAP_SCHEMA = 3
+KEEP_VERSIONS = int(os.environ.get("WORKBENCH_UNIVERSE_KEEP", 1))
+STALE_TMP_SECONDS = float(os.environ.get("WORKBENCH_UNIVERSE_STALE", 3600))
+
+
+@dataclass(frozen=True)
+class Universe:
+    years: list
+    company: pd.DataFrame
+    eps: pd.DataFrame               # (n, Y) in company-row order
+    price: pd.DataFrame             # (n, Y)
+    actual_price: pd.DataFrame      # indexed by Ticker
+    median_pe: dict                 # gsubind → (Y,) read-only view
+
+    @property
+    def tickers(self):
+        return self.company["Ticker"]
+
+    @property
+    def gsubinds(self):
+        return self.company["gsubind"]
+
+    def as_tuple(self):
+        """The seven objects the Workbench page unpacks from ``load_data``."""
+        return (
+            self.company,
+            self.eps,
+            self.price,
+            self.tickers,
+            self.gsubinds,
+            self.median_pe,
+            self.actual_price,
+        )
+
+    def nbytes(self):
+        frames = (self.company, self.eps, self.price, self.actual_price)
+        block = next(iter(self.median_pe.values()), None)
+        return (
+            sum(int(f.memory_usage(deep=True).sum()) for f in frames)
+            + (block.base.nbytes if block is not None and block.base is not None else 0)
+        )
+
+
+def _frozen(values):
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    values.flags.writeable = False
+    return values
+
+
+def _matrix(frame, years, index=None):
+    values = _frozen(frame.reindex(columns=years).to_numpy(dtype=np.float64))
+    return pd.DataFrame(values, index=frame.index if index is None else index, columns=years, copy=False)
+
+
+def build_universe(tables):
+    """Pack the ``ingest`` tables into a ``Universe``."""
+    years = list(tables["eps"].columns)
+
+    company = tables["company"].reset_index(drop=True).copy()
+    for col in CATEGORICAL_COLUMNS:
+        company[col] = company[col].astype("category")
+
+    actual = tables["actual_price"]
+    actual_index = pd.CategoricalIndex(actual.index, name=actual.index.name)
+
+    lookup = ingest.median_pe_lookup(tables["median_pe"])
+    block = _frozen(
+        np.vstack([np.asarray(row, dtype=np.float64) for row in lookup.values()])
+        if lookup else np.empty((0, len(years)))
+    )
+
+    return Universe(
+        years=years,
+        company=company,
+        eps=_matrix(tables["eps"].reset_index(drop=True), years),
+        price=_matrix(tables["price"].reset_index(drop=True), years),
+        actual_price=_matrix(actual, years, actual_index),
+        median_pe=dict(zip(lookup, block)),
+    )
+
+
+def load_universe(cache_dir=ingest.CACHE_DIR):
+    return build_universe(ingest.read_cache(cache_dir))
+
+
+# ─── Memory-mapped files ─────────────────────────────────────────────────────
+def _labels(values):
+    """JSON-safe list (NaN → None)."""
+    return [None if pd.isna(v) else v for v in pd.Series(values, dtype=object).tolist()]
+
+
+def write_universe(u, directory, data_version):
+    """Write ``u`` as ``.npy`` arrays plus ``header.json`` into ``directory``."""
+    directory = Path(directory)
+    directory.mkdir(parents=True)
+    arrays = {}
+
+    def save(name, values):
+        values = np.ascontiguousarray(values)
+        np.save(directory / f"{name}.npy", values)
+        arrays[name] = {"dtype": values.dtype.str, "shape": list(values.shape)}
+
+    save("eps", u.eps.to_numpy())
+    save("price", u.price.to_numpy())
+    save("actual_price", u.actual_price.to_numpy())
+    save("median_pe", np.vstack(list(u.median_pe.values())) if u.median_pe else np.empty((0, len(u.years))))
+
+    # Company columns are stored by position – header names such as
+    # "P/E Ratio 2010" are not safe file names
+    categories, strings = {}, {}
+    for i, col in enumerate(u.company.columns):
+        values = u.company[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            save(f"company{i}.codes", values.cat.codes.to_numpy())
+            labels = values.cat.categories
+            categories[col] = {"dtype": str(labels.dtype), "labels": labels.tolist()}
+        elif pd.api.types.is_numeric_dtype(values):
+            save(f"company{i}", values.to_numpy())
+        else:
+            strings[col] = _labels(values)
+
+    header = {
+        "schema": MMAP_SCHEMA,
+        "data_version": data_version,
+        "years": [int(y) for y in u.years],
+        "columns": list(u.company.columns),
+        "categories": categories,
+        "strings": strings,
+        "actual_index": _labels(u.actual_price.index),
+        "median_pe_keys": [int(k) for k in u.median_pe],
+        "arrays": arrays,
+    }
+    with open(directory / "header.json", "w") as f:
+        json.dump(header, f, indent=2)
+
+
+def open_universe(directory, data_version=None):
+    """Map a written universe read-only; raises ``ValueError`` if unusable."""
+    directory = Path(directory)
+    with open(directory / "header.json") as f:
+        header = json.load(f)
+    if header.get("schema") != MMAP_SCHEMA:
+        raise ValueError(f"Universe schema {header.get('schema')} != {MMAP_SCHEMA}")
+    if data_version is not None and header["data_version"] != data_version:
+        raise ValueError(f"Universe is for data version {header['data_version']}, not {data_version}")
+
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        values = np.load(directory / f"{name}.npy", mmap_mode="r")
+        if values.dtype.str != spec["dtype"] or list(values.shape) != spec["shape"]:
+            raise ValueError(f"{name}.npy does not match the header")
+        arrays[name] = values
+
+    years = header["years"]
+    company = {}
+    for i, col in enumerate(header["columns"]):
+        if col in header["categories"]:
+            spec = header["categories"][col]
+            labels = pd.Index(spec["labels"], dtype=spec["dtype"])
+            company[col] = pd.Categorical.from_codes(arrays[f"company{i}.codes"], labels)
+        elif col in header["strings"]:
+            company[col] = pd.array(header["strings"][col], dtype="string")
+        else:
+            company[col] = arrays[f"company{i}"]
+
+    def frame(name, index=None):
+        return pd.DataFrame(arrays[name], index=index, columns=years, copy=False)
+
+    return Universe(
+        years=years,
+        company=pd.DataFrame(company, columns=header["columns"]),
+        eps=frame("eps"),
+        price=frame("price"),
+        actual_price=frame("actual_price", pd.CategoricalIndex(header["actual_index"], name="Ticker")),
+        median_pe=dict(zip(header["median_pe_keys"], arrays["median_pe"])),
+    )
+
+
+def prune_universes(mmap_dir, current, keep=KEEP_VERSIONS, stale_after=STALE_TMP_SECONDS):
+    """Remove old versions and abandoned temporary directories from ``mmap_dir``.
+
+    ``current`` and the ``keep`` most recently written other versions stay,
+    so a worker that has not reloaded yet can still open its version;
+    ``.*.tmp`` directories are removed once ``stale_after`` seconds old.
+    """
+    now = time.time()
+    versions = []
+    for path in Path(mmap_dir).iterdir():
+        try:
+            age = now - path.stat().st_mtime
+        except OSError:     # removed by another worker meanwhile
+            continue
+        if path.name.startswith("."):
+            if path.name.endswith(".tmp") and age > stale_after:
+                shutil.rmtree(path, ignore_errors=True)
+        elif path.name != current:
+            versions.append((age, path))
+    for _, path in sorted(versions)[keep:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def ensure_universe(data_version, cache_dir=ingest.CACHE_DIR, mmap_dir=MMAP_DIR):
+    """Map the universe for ``data_version``, writing its files first if needed.
+
+    Files are written to a private temporary directory and renamed into
+    place, so concurrent workers never map a half-written version; the first
+    rename wins and the others map the winner's files.  Versions beyond the
+    last ``KEEP_VERSIONS`` are then removed (see ``prune_universes``).
+    """
+    mmap_dir = Path(mmap_dir)
+    target = mmap_dir / data_version
+    try:
+        return open_universe(target, data_version)
+    except (OSError, ValueError, KeyError):
+        shutil.rmtree(target, ignore_errors=True)
+
+    tmp = mmap_dir / f".{data_version}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    write_universe(load_universe(cache_dir), tmp, data_version)
+    try:
+        os.rename(tmp, target)
+    except OSError:     # another worker published it first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    prune_universes(mmap_dir, target.name)
+    return open_universe(target, data_version)
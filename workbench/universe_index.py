@@ -0,0 +1,80 @@
+"""
+universe_index.py  –  Precomputed lookups over the ticker universe
+
+Built once per data version so per-request lookups never scan all rows:
+
+* ``ticker_to_row``  – hash map ticker → company row id (first occurrence)
+* CSR-style groups   – row ids sorted by gsubind (``group_rows``) with
+                       ``group_offsets`` so a sub-industry's members are one
+                       contiguous slice
+* ``median_pe``      – dense ``(n_groups × n_years)`` matrix, one row per
+                       gsubind group, NaN where no peer has a P/E in range
+                       that year (see ``workbench.median_pe``)
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class UniverseIndex:
+    tickers: np.ndarray             # (n,) ticker per row
+    ticker_to_row: dict             # ticker → row id
+    group_codes: np.ndarray         # (G,) sorted unique gsubind codes
+    gsubind_to_group: dict          # gsubind → group id
+    group_of_row: np.ndarray        # (n,) group id per row
+    group_rows: np.ndarray          # (n,) row ids ordered by group, stable
+    group_offsets: np.ndarray       # (G + 1,) slice bounds into group_rows
+    median_pe: np.ndarray           # (G, Y)
+
+    def row(self, ticker):
+        """Row id of ``ticker`` or None if it is not in the universe."""
+        return self.ticker_to_row.get(ticker)
+
+    def __contains__(self, ticker):
+        return ticker in self.ticker_to_row
+
+    def group_slice(self, group):
+        return self.group_rows[self.group_offsets[group]:self.group_offsets[group + 1]]
+
+    def peers(self, gsubind):
+        """Row ids of every company in ``gsubind`` (in workbook order)."""
+        group = self.gsubind_to_group.get(gsubind)
+        if group is None:
+            return np.empty(0, dtype=self.group_rows.dtype)
+        return self.group_slice(group)
+
+    def median_pe_row(self, gsubind):
+        group = self.gsubind_to_group.get(gsubind)
+        if group is None:
+            return np.full(self.median_pe.shape[1], np.nan)
+        return self.median_pe[group]
+
+
+def build_index(ticker_data, gsubind_data, gsubind_to_median_pe, n_years):
+    tickers = np.asarray(ticker_data)
+    ticker_to_row = {}
+    for row, ticker in enumerate(tickers):
+        ticker_to_row.setdefault(ticker, row)
+
+    codes, group_of_row = np.unique(np.asarray(gsubind_data), return_inverse=True)
+    group_rows = np.argsort(group_of_row, kind="stable")
+    group_offsets = np.concatenate(([0], np.cumsum(np.bincount(group_of_row, minlength=len(codes)))))
+
+    median_pe = np.full((len(codes), n_years), np.nan)
+    for group, code in enumerate(codes):
+        values = gsubind_to_median_pe.get(code)
+        if values is not None and len(values) == n_years:
+            median_pe[group] = np.asarray(values, dtype=float)
+
+    return UniverseIndex(
+        tickers=tickers,
+        ticker_to_row=ticker_to_row,
+        group_codes=codes,
+        gsubind_to_group={code: group for group, code in enumerate(codes.tolist())},
+        group_of_row=group_of_row,
+        group_rows=group_rows,
+        group_offsets=group_offsets,
+        median_pe=median_pe,
+    )